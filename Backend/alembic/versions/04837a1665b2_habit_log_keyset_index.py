@@ -0,0 +1,39 @@
+"""habit log keyset index
+
+Revision ID: 04837a1665b2
+Revises: af64745bddb4
+Create Date: 2026-10-18 18:14:00.322176
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '04837a1665b2'
+down_revision: Union[str, Sequence[str], None] = 'af64745bddb4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Cursor (record_date, id) của danh sách log admin (toàn bảng). Lịch sử của 1 user lọc qua habits.user_id
+    # nên không dùng index này: đọc từng habit bằng uq_habit_logs_habit_id_record_date (crud_habit_log.get_all_logs_by_user)
+    # Bảng habit_logs lớn -> tạo index CONCURRENTLY (không khóa ghi), phải chạy ngoài transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_habit_logs_record_date_id', 'habit_logs', ['record_date', 'id'],
+            unique=False, postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_habit_logs_record_date_id', table_name='habit_logs',
+            postgresql_concurrently=True, if_exists=True
+        )
@@ -0,0 +1,30 @@
+"""clear failed email bodies
+
+Revision ID: 5d1f8c3b92e4
+Revises: c7e2a9d41b06
+Create Date: 2026-10-18 22:05:47.104633
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d1f8c3b92e4'
+down_revision: Union[str, Sequence[str], None] = 'c7e2a9d41b06'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Tin FAILED trước đây vẫn giữ nguyên body (mail quên mật khẩu chứa mật khẩu mới dạng rõ)
+    op.execute("UPDATE email_outbox SET body = '' WHERE status = 'FAILED' AND body <> ''")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Nội dung đã xóa không khôi phục được
+    pass
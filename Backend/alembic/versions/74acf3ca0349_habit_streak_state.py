@@ -0,0 +1,79 @@
+"""habit streak state
+
+Revision ID: 74acf3ca0349
+Revises: be46a34f2ca2
+Create Date: 2026-10-18 18:08:06.408353
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '74acf3ca0349'
+down_revision: Union[str, Sequence[str], None] = 'be46a34f2ca2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('habits', sa.Column('streak_current', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('habits', sa.Column('streak_base', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('habits', sa.Column('streak_longest', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('habits', sa.Column('streak_last_date', sa.Date(), nullable=True))
+    op.add_column('habits', sa.Column('log_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Tính streak cho các habit đã có log (cùng công thức gaps-and-islands với crud_habit_streak)
+    op.execute("""
+        WITH islands AS (
+            SELECT habit_id, record_date, status,
+                   record_date - CAST(row_number() OVER (PARTITION BY habit_id ORDER BY record_date) AS integer) AS island
+            FROM habit_logs
+        ), segs AS (
+            SELECT *,
+                   count(*) FILTER (WHERE status = 'FAILED')
+                       OVER (PARTITION BY habit_id, island ORDER BY record_date) AS seg
+            FROM islands
+        ), streaks AS (
+            SELECT habit_id, record_date,
+                   count(*) FILTER (WHERE status = 'COMPLETED')
+                       OVER (PARTITION BY habit_id, island, seg ORDER BY record_date) AS streak
+            FROM segs
+        ), with_prev AS (
+            SELECT *,
+                   lag(record_date) OVER w AS prev_date,
+                   lag(streak) OVER w AS prev_streak
+            FROM streaks
+            WINDOW w AS (PARTITION BY habit_id ORDER BY record_date)
+        ), state AS (
+            SELECT habit_id,
+                   (array_agg(streak ORDER BY record_date DESC))[1] AS streak_current,
+                   (array_agg(CASE WHEN prev_date = record_date - 1 THEN prev_streak ELSE 0 END
+                              ORDER BY record_date DESC))[1] AS streak_base,
+                   max(streak) AS streak_longest,
+                   max(record_date) AS streak_last_date,
+                   count(*) AS log_count
+            FROM with_prev
+            GROUP BY habit_id
+        )
+        UPDATE habits h
+        SET streak_current = state.streak_current,
+            streak_base = state.streak_base,
+            streak_longest = state.streak_longest,
+            streak_last_date = state.streak_last_date,
+            log_count = state.log_count
+        FROM state
+        WHERE h.id = state.habit_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('habits', 'log_count')
+    op.drop_column('habits', 'streak_last_date')
+    op.drop_column('habits', 'streak_longest')
+    op.drop_column('habits', 'streak_base')
+    op.drop_column('habits', 'streak_current')
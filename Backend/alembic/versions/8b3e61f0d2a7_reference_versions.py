@@ -0,0 +1,37 @@
+"""reference versions
+
+Revision ID: 8b3e61f0d2a7
+Revises: 5d1f8c3b92e4
+Create Date: 2026-10-18 23:12:40.361925
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b3e61f0d2a7'
+down_revision: Union[str, Sequence[str], None] = '5d1f8c3b92e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('reference_versions',
+    sa.Column('resource', sa.String(), nullable=False),
+    sa.Column('version', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('resource')
+    )
+    # Tạo sẵn dòng cho từng loại (bump_version vẫn tự thêm dòng nếu thiếu)
+    op.execute("""
+        INSERT INTO reference_versions (resource, version)
+        VALUES ('categories', 0), ('roles', 0), ('motivation-quotes', 0)
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('reference_versions')
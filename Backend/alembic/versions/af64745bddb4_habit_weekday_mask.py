@@ -0,0 +1,42 @@
+"""habit weekday mask
+
+Revision ID: af64745bddb4
+Revises: 74acf3ca0349
+Create Date: 2026-10-18 18:12:16.578014
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'af64745bddb4'
+down_revision: Union[str, Sequence[str], None] = '74acf3ca0349'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('habits', sa.Column('weekday_mask', sa.SmallInteger(), server_default='127', nullable=False))
+    # frequency (2=T2 ... 8=CN) -> bit 0 = T2 ... bit 6 = CN; frequency rỗng = mỗi ngày = 127
+    op.execute("""
+        UPDATE habits
+        SET weekday_mask = CASE
+            WHEN cardinality(frequency) = 0 THEN 127
+            ELSE (
+                SELECT coalesce(bit_or(1 << (f - 2)), 0)
+                FROM unnest(frequency) AS f
+                WHERE f BETWEEN 2 AND 8
+            )
+        END
+    """)
+    op.create_index('ix_habits_user_id_created_at', 'habits', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_habits_user_id_created_at', table_name='habits')
+    op.drop_column('habits', 'weekday_mask')
@@ -0,0 +1,37 @@
+"""unique habit log per day
+
+Revision ID: b8f63f84cb94
+Revises: 12e99d621eca
+Create Date: 2026-10-18 18:01:46.881117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8f63f84cb94'
+down_revision: Union[str, Sequence[str], None] = '12e99d621eca'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Dọn các log trùng (habit_id, record_date) còn sót lại, giữ bản ghi mới nhất (id lớn nhất)
+    op.execute("""
+        DELETE FROM habit_logs a
+        USING habit_logs b
+        WHERE a.habit_id = b.habit_id
+          AND a.record_date = b.record_date
+          AND a.id < b.id
+    """)
+    # Mỗi habit chỉ có 1 log / ngày -> cho phép check-in bằng INSERT ... ON CONFLICT
+    op.create_index('uq_habit_logs_habit_id_record_date', 'habit_logs', ['habit_id', 'record_date'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_habit_logs_habit_id_record_date', table_name='habit_logs')
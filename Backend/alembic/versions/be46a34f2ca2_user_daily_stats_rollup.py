@@ -0,0 +1,40 @@
+"""user daily stats rollup
+
+Revision ID: be46a34f2ca2
+Revises: b8f63f84cb94
+Create Date: 2026-10-18 18:04:36.861999
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'be46a34f2ca2'
+down_revision: Union[str, Sequence[str], None] = 'b8f63f84cb94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Bảng bắt đầu rỗng: ngày chưa có dòng được tính trực tiếp khi đọc (dòng chỉ tạo khi ghi log)
+    # (hoặc chạy: python -m app.database.rebuild_daily_stats để dựng trước toàn bộ)
+    op.create_table('user_daily_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('scheduled', sa.Integer(), nullable=False),
+    sa.Column('completed', sa.Integer(), nullable=False),
+    sa.Column('partial', sa.Integer(), nullable=False),
+    sa.Column('skipped', sa.Integer(), nullable=False),
+    sa.Column('failed', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'date')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('user_daily_stats')
@@ -0,0 +1,45 @@
+"""daily stats completed unscheduled
+
+Revision ID: c7e2a9d41b06
+Revises: 6a44d81d6e37
+Create Date: 2026-10-18 21:40:12.518307
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e2a9d41b06'
+down_revision: Union[str, Sequence[str], None] = '6a44d81d6e37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('user_daily_stats', sa.Column('completed_unscheduled', sa.Integer(), server_default='0', nullable=False))
+    # Điền cho các dòng đã có: log COMPLETED của habit không có lịch ngày đó (cùng luật với logic.scheduled_on_sql)
+    op.execute("""
+        UPDATE user_daily_stats s
+        SET completed_unscheduled = u.completed
+        FROM (
+            SELECT h.user_id, l.record_date, count(*) AS completed
+            FROM habit_logs l
+            JOIN habits h ON h.id = l.habit_id
+            WHERE l.status = 'COMPLETED'
+              AND NOT (
+                  h.created_at < l.record_date + 1
+                  AND (h.weekday_mask & (1 << (CAST(extract(isodow FROM l.record_date) AS integer) - 1))) <> 0
+              )
+            GROUP BY h.user_id, l.record_date
+        ) u
+        WHERE s.user_id = u.user_id AND s.date = u.record_date
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('user_daily_stats', 'completed_unscheduled')
@@ -0,0 +1,51 @@
+"""trigram search indexes
+
+Revision ID: e27f3284229e
+Revises: 04837a1665b2
+Create Date: 2026-10-18 18:28:49.997896
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e27f3284229e'
+down_revision: Union[str, Sequence[str], None] = '04837a1665b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (tên index, bảng, cột): GIN + gin_trgm_ops cho tìm kiếm ILIKE '%x%' và so khớp gần đúng (%>, word_similarity)
+TRIGRAM_INDEXES = [
+    ('ix_habits_name_trgm', 'habits', 'name'),
+    ('ix_users_username_trgm', 'users', 'username'),
+    ('ix_users_email_trgm', 'users', 'email'),
+    ('ix_users_full_name_trgm', 'users', 'full_name'),
+    ('ix_motivation_quotes_quote_trgm', 'motivation_quotes', 'quote'),
+    ('ix_motivation_quotes_author_trgm', 'motivation_quotes', 'author'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # pg_trgm có sẵn trong gói contrib của Postgres (cần quyền tạo extension)
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # Bảng users / habits lớn -> tạo index CONCURRENTLY (không khóa ghi), phải chạy ngoài transaction
+    with op.get_context().autocommit_block():
+        for index_name, table_name, column_name in TRIGRAM_INDEXES:
+            op.create_index(
+                index_name, table_name, [column_name], unique=False,
+                postgresql_using='gin', postgresql_ops={column_name: 'gin_trgm_ops'},
+                postgresql_concurrently=True, if_not_exists=True
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Giữ lại extension pg_trgm (có thể đang được dùng ở chỗ khác)
+    with op.get_context().autocommit_block():
+        for index_name, table_name, _ in TRIGRAM_INDEXES:
+            op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True, if_exists=True)
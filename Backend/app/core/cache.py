@@ -0,0 +1,78 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+from app.core import invalidation
+
+
+# Cache trong bộ nhớ tiến trình: giới hạn số phần tử (LRU) + tự hết hạn theo TTL
+# Các hàm invalidate chỉ xóa ở tiến trình hiện tại, muốn báo cho mọi worker thì dùng invalidation.publish
+class TTLCache:
+    def __init__(self, maxsize: int = 1024, ttl: float = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (hết hạn lúc, value)
+        self._lock = threading.Lock()  # Route sync chạy trên nhiều thread của threadpool
+        self.hits = 0
+        self.misses = 0
+        # Tăng mỗi lần invalidate: giá trị nạp từ DB TRƯỚC lúc invalidate sẽ không được ghi đè vào cache
+        self.generation = 0
+
+    # Lấy giá trị, trả về None nếu không có hoặc đã hết hạn
+    def get(self, key: Hashable) -> Optional[Any]:
+        # Nhận tin xóa cache từ worker khác trước khi đọc (xem app/core/invalidation.py)
+        invalidation.poll()
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] <= now:
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    # Lưu giá trị (ttl riêng cho từng phần tử nếu cần, mặc định dùng self.ttl)
+    # generation: truyền self.generation đọc được trước khi query DB, bỏ qua nếu đã có invalidate xen giữa
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, generation: Optional[int] = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            # Vượt giới hạn -> bỏ phần tử ít dùng nhất
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self.generation += 1
+            self._data.pop(key, None)
+
+    # Xóa mọi key thỏa điều kiện (VD: các kỳ thống kê chứa 1 ngày vừa có log mới)
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]):
+        with self._lock:
+            self.generation += 1
+            for key in [key for key in self._data if predicate(key)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+
+    # Thống kê hit/miss để theo dõi hiệu quả cache
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+            }
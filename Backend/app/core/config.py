@@ -19,11 +19,74 @@ class Settings(BaseSettings):
     MAIL_FROM: str = "23050118@student.bdu.edu.vn"
     MAIL_PORT: int = 587
     MAIL_SERVER: str = "smtp.gmail.com"
+    MAIL_STARTTLS: bool = True          # Tắt khi thử với SMTP debug ở local
+    MAIL_USE_AUTH: bool = True
+    MAIL_TIMEOUT_SECONDS: float = 30
+
+    # Hàng đợi email (bảng email_outbox) - xem app/database/email_outbox.py
+    # Mặc định tắt (như AUTO_FAIL_SCHEDULER): chạy riêng `python -m app.database.email_outbox --loop`,
+    # hoặc bật để chạy worker gửi mail trong tiến trình API
+    EMAIL_OUTBOX_WORKER: bool = False
+    EMAIL_OUTBOX_POLL_SECONDS: float = 5    # Chu kỳ quét hàng đợi
+    EMAIL_OUTBOX_BATCH_SIZE: int = 50       # Số mail mỗi kết nối SMTP
+    EMAIL_SEND_LEASE_SECONDS: int = 300     # Thời gian giữ chỗ 1 lô (worker chết -> tin được gửi lại sau khoảng này)
+    EMAIL_MAX_ATTEMPTS: int = 6
+    EMAIL_RETRY_BASE_SECONDS: int = 60      # Thử lại sau 1, 2, 4, 8... phút
+    EMAIL_RETRY_MAX_SECONDS: int = 3600
+    EMAIL_MAX_AGE_SECONDS: int = 86400      # Tin chưa gửi được sau 1 ngày -> FAILED, xóa nội dung
 
 
     # 60 phút * 24 giờ * 14 ngày = 20160 phút
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 20160
 
+    # Cost của bcrypt (mỗi +1 = gấp đôi thời gian băm). Đổi giá trị -> hash cũ tự cập nhật khi user đăng nhập
+    BCRYPT_ROUNDS: int = 12
+    # Số tiến trình con băm mật khẩu (mỗi worker uvicorn 1 pool riêng), 0 = băm ngay trong tiến trình API
+    PASSWORD_HASH_WORKERS: int = 2
+
+    # Bật các route async (AsyncSession + asyncpg) cho các API nóng.
+    # Đặt False để quay về bản sync (psycopg2 + threadpool) khi cần so sánh A/B
+    ASYNC_DB: bool = True
+
+    # Cache user đã xác thực trong get_current_user (giây / số user tối đa mỗi worker)
+    USER_CACHE_TTL: int = 60
+    USER_CACHE_SIZE: int = 10000
+
+    # Cache kết quả thống kê admin (/admin/analytics) của các kỳ đã kết thúc (giây / số kỳ tối đa)
+    ANALYTICS_CACHE_TTL: int = 3600
+    ANALYTICS_CACHE_SIZE: int = 4096
+
+    # Số giây trình duyệt được dùng lại category / role / quote mà không hỏi lại server
+    # 0 = lần nào cũng hỏi lại bằng If-None-Match (server trả 304 không query DB nếu chưa đổi)
+    REFERENCE_CACHE_MAX_AGE: int = 0
+
+    # Báo xóa cache giữa các worker (xem app/core/invalidation.py)
+    # "local": chỉ 1 worker | "file": nhiều worker uvicorn trên cùng máy, dùng chung file CACHE_INVALIDATION_FILE
+    CACHE_INVALIDATION_BACKEND: str = "local"
+    CACHE_INVALIDATION_FILE: str = "/tmp/habit_tracker_cache_invalidation.log"
+
+    # Cache category / role (bảng nhỏ, đọc liên tục) - giây / số phần tử tối đa
+    REFERENCE_CACHE_TTL: int = 600
+    REFERENCE_CACHE_SIZE: int = 1024
+    # Cache câu nói của ngày (/motivation-quotes/daily): số phần tử tối đa (1 phần tử / user dùng personal=true)
+    DAILY_QUOTE_CACHE_SIZE: int = 10000
+
+    # Số ký tự tối thiểu của từ khóa tìm kiếm chế độ xếp hạng (search_mode=ranked, index pg_trgm cần >= 3 ký tự)
+    SEARCH_MIN_LENGTH: int = 3
+
+    # Job auto-fail (điền FAILED cho ngày có lịch nhưng chưa check-in) - xem app/database/auto_fail.py
+    AUTO_FAIL_SCHEDULER: bool = False   # Bật scheduler chạy trong tiến trình API
+    AUTO_FAIL_AT: str = "00:05"         # Giờ chạy mỗi ngày (HH:MM, giờ server)
+    AUTO_FAIL_DAYS: int = 7             # Số ngày quét lùi từ hôm qua
+    AUTO_FAIL_CHUNK_SIZE: int = 500     # Số user mỗi transaction
+
+    # Seed dữ liệu ban đầu (app/database/init_db.py) - mặc định chạy tay bằng CLI, khởi động app không ghi DB
+    SEED_ON_STARTUP: bool = False       # Bật: seed nền lúc khởi động (tiện cho máy dev / DB mới)
+
+    # Số liệu request theo route cho Prometheus (GET /metrics) - xem app/core/metrics.py
+    METRICS_ENABLED: bool = False       # Mặc định tắt: số liệu lộ danh sách route + lưu lượng
+    METRICS_TOKEN: str = ""             # Khác rỗng: scrape phải gửi header Authorization: Bearer <token>
+
     # 
     #RECOVERY_KEY_ADMIN: str
 
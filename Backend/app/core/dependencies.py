@@ -2,24 +2,26 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import db_connection, models
 from app.schemas import schemas
 
 # 👇 SỬA Ở ĐÂY: Import settings từ config thay vì lấy lẻ tẻ từ utils
 from app.core.config import settings 
+from app.core.cache import TTLCache
+from app.core import invalidation
 
 # Định nghĩa nơi lấy token
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
-# Hàm Dependency: Lấy user hiện tại từ Token
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(db_connection.get_db)):
-    
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Không thể xác thực người dùng",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    
+credentials_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Không thể xác thực người dùng",
+    headers={"WWW-Authenticate": "Bearer"},
+)
+
+# Giải mã Token -> trả về user_id (dùng chung cho bản sync và async)
+def decode_user_id(token: str) -> int:
     try:
         # 1. Giải mã Token
         # 👇 SỬA Ở ĐÂY: Dùng settings.SECRET_KEY
@@ -35,13 +37,60 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         
     except JWTError:
         raise credentials_exception
+
+    return token_data.user_id
+
+# Cache user_id -> schemas.CurrentUser, tránh SELECT bảng users ở mọi request đã đăng nhập
+# Nhớ gọi invalidate_cached_user() khi thông tin / quyền của user thay đổi
+user_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL)
+
+# Gọi sau khi commit thay đổi của user (báo cho mọi worker)
+def invalidate_cached_user(user_id: int):
+    invalidation.publish(invalidation.USER, user_id)
+
+def _on_user_changed(user_id):
+    if user_id is None:
+        user_cache.clear()
+    else:
+        user_cache.invalidate(user_id)
+
+invalidation.subscribe(invalidation.USER, _on_user_changed)
+
+# Hàm Dependency: Lấy user hiện tại từ Token
+# Trả về bản chụp schemas.CurrentUser (id, role_id, ...) chứ không phải object ORM -> muốn sửa user thì query lại
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(db_connection.get_db)):
+    user_id = decode_user_id(token)
+
+    cached_user = user_cache.get(user_id)
+    if cached_user is not None:
+        return cached_user
+    generation = user_cache.generation
     
     # 3. Tìm User trong Database
-    user = db.query(models.User).filter(models.User.id == token_data.user_id).first()
+    user = db.query(models.User).filter(models.User.id == user_id).first()
     if user is None:
         raise credentials_exception
-        
-    return user
+
+    current_user = schemas.CurrentUser.model_validate(user)
+    user_cache.set(user_id, current_user, generation=generation)
+    return current_user
+
+# Bản async của get_current_user (dùng cho các route 'async def' chạy bằng AsyncSession)
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(db_connection.get_async_db)):
+    user_id = decode_user_id(token)
+
+    cached_user = user_cache.get(user_id)
+    if cached_user is not None:
+        return cached_user
+    generation = user_cache.generation
+
+    user = await db.get(models.User, user_id)
+    if user is None:
+        raise credentials_exception
+
+    current_user = schemas.CurrentUser.model_validate(user)
+    user_cache.set(user_id, current_user, generation=generation)
+    return current_user
 
 
 ADMIN_ROLE_ID = 1 
@@ -52,4 +101,4 @@ def get_admin_user(current_user: models.User = Depends(get_current_user)):
             status_code=status.HTTP_403_FORBIDDEN, 
             detail="Bạn không có quyền truy cập (Admin only)!"
         )
-    return current_user
\ No newline at end of file
+    return current_user
@@ -0,0 +1,104 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+from passlib.context import CryptContext
+from app.core.config import settings
+
+# Băm / kiểm tra mật khẩu bcrypt trong pool tiến trình riêng
+# bcrypt tốn ~250 ms CPU mỗi lần (cost 12): chạy thẳng trong thread của API thì chiếm threadpool và giành GIL
+# với các request khác -> đẩy sang PASSWORD_HASH_WORKERS tiến trình con, API chỉ chờ kết quả (không giữ GIL)
+# PASSWORD_HASH_WORKERS = 0 -> băm ngay trong tiến trình hiện tại (như cũ)
+#
+# Đổi BCRYPT_ROUNDS: mật khẩu cũ vẫn đăng nhập được, hash được tự động tạo lại theo cost mới ở lần đăng nhập kế tiếp
+
+# Khai báo context dùng Crypt để hash mật khẩu
+# schemes=["bcrypt"]: Chọn loại lưỡi dao là bcrypt (rất mạnh).
+# deprecated="auto": Tự động bỏ qua các thuật toán cũ nếu sau này mình update.
+# bcrypt__rounds: hash có cost khác giá trị này sẽ bị coi là cần cập nhật (verify_and_update trả hash mới)
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+
+# ===== Hàm chạy trong tiến trình con (phải ở cấp module để pickle được)
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+# Trả về (khớp?, hash mới nếu cost đã đổi)
+def _verify_and_update(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(password, hashed_password)
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+# Tạo pool lần đầu cần dùng (không tạo lúc import: CLI / script không băm mật khẩu không phải sinh tiến trình)
+# Dùng "spawn": tiến trình API có nhiều thread, fork lúc đang chạy dễ kẹt khóa
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    if settings.PASSWORD_HASH_WORKERS <= 0:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=settings.PASSWORD_HASH_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+    return _pool
+
+# Tiến trình con chết đột ngột (OOM killer, kill -9...) -> pool bị hỏng vĩnh viễn, mọi lần submit sau đều lỗi
+# Bỏ pool hỏng để lần gọi sau tạo pool mới (nhiều thread cùng gặp lỗi thì chỉ 1 thread thay pool)
+def _discard_pool(broken: ProcessPoolExecutor):
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+def shutdown():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+# Chạy fn trong pool; pool hỏng thì tạo lại và thử thêm đúng 1 lần
+def _run(fn, *args):
+    pool = _get_pool()
+    if pool is None:
+        return fn(*args)
+    try:
+        return pool.submit(fn, *args).result()
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        return _get_pool().submit(fn, *args).result()
+
+async def _run_async(fn, *args):
+    pool = _get_pool()
+    if pool is None:
+        return await asyncio.to_thread(fn, *args)
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(pool, fn, *args)
+    except BrokenProcessPool:
+        _discard_pool(pool)
+        return await loop.run_in_executor(_get_pool(), fn, *args)
+
+
+# ===== Bản sync (route 'def' chạy trong threadpool, CLI seed dữ liệu)
+def hash_password(password: str) -> str:
+    return _run(_hash, password)
+
+def verify_password(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return _run(_verify_and_update, password, hashed_password)
+
+
+# ===== Bản async (route 'async def': không chiếm thread nào trong lúc chờ)
+async def hash_password_async(password: str) -> str:
+    return await _run_async(_hash, password)
+
+async def verify_password_async(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return await _run_async(_verify_and_update, password, hashed_password)
@@ -0,0 +1,89 @@
+import zlib
+from typing import Optional
+from fastapi import Request, Response
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core import invalidation
+
+# ETag cho các API dữ liệu tham chiếu (category, role, motivation quote): ít khi đổi, chỉ admin sửa
+# Mỗi loại dữ liệu có 1 số phiên bản lưu trong bảng reference_versions (chung cho mọi worker, giữ nguyên khi restart)
+# Các hàm ghi trong crud_* gọi bump_version(db, ...) TRƯỚC khi commit: phiên bản tăng trong cùng transaction với dữ liệu
+# Sau commit, kênh invalidation.REFERENCE báo mọi worker xóa cache phiên bản + cache đọc của crud
+# ETag = loại dữ liệu + phiên bản + path/query của request -> client gửi lại If-None-Match trùng thì trả 304 ngay,
+# không query dữ liệu và không serialize lại body (phiên bản cũng được cache, thường không tốn query nào)
+CATEGORIES = "categories"
+ROLES = "roles"
+MOTIVATION_QUOTES = "motivation-quotes"
+
+_PENDING_RESOURCES = "http_cache_pending_resources"
+
+# Khóa dòng của resource tới khi commit: 2 admin sửa cùng lúc không ra trùng phiên bản
+BUMP_SQL = text("""
+    INSERT INTO reference_versions (resource, version) VALUES (:resource, 1)
+    ON CONFLICT (resource) DO UPDATE SET version = reference_versions.version + 1
+""")
+READ_SQL = text("SELECT resource, version FROM reference_versions")
+
+# Bảng rất nhỏ: nạp cả bảng 1 lần, key cố định
+_ALL = "all"
+version_cache = TTLCache(maxsize=1, ttl=settings.REFERENCE_CACHE_TTL)
+
+
+def get_version(db: Session, resource: str) -> int:
+    versions = version_cache.get(_ALL)
+    if versions is None:
+        generation = version_cache.generation
+        versions = dict(db.execute(READ_SQL).tuples().all())
+        version_cache.set(_ALL, versions, generation=generation)
+    return versions.get(resource, 0)
+
+# Gọi TRƯỚC khi commit thay đổi của loại dữ liệu resource (commit cùng dữ liệu, rollback thì không đổi)
+def bump_version(db: Session, resource: str):
+    db.execute(BUMP_SQL, {"resource": resource})
+    db.info.setdefault(_PENDING_RESOURCES, set()).add(resource)
+
+@event.listens_for(Session, "after_commit")
+def _publish_after_commit(db: Session):
+    for resource in sorted(db.info.pop(_PENDING_RESOURCES, ())):
+        invalidation.publish(invalidation.REFERENCE, resource)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(db: Session):
+    db.info.pop(_PENDING_RESOURCES, None)
+
+def _on_reference_changed(resource: Optional[str]):
+    version_cache.clear()
+
+invalidation.subscribe(invalidation.REFERENCE, _on_reference_changed)
+
+
+def make_etag(request: Request, db: Session, resource: str) -> str:
+    url_hash = zlib.crc32(f"{request.url.path}?{request.url.query}".encode())
+    return f'"{resource}-{get_version(db, resource)}-{url_hash:08x}"'
+
+# So khớp If-None-Match (có thể là danh sách "a", "b", dạng W/"a" hoặc *)
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+# Gắn ETag + Cache-Control vào response; trả về Response 304 nếu client đã có bản mới nhất (route return luôn)
+# public = True cho API không cần đăng nhập (proxy / CDN được phép cache), ngược lại chỉ trình duyệt cache
+def check_not_modified(request: Request, response: Response, db: Session, resource: str,
+                       public: bool = False) -> Optional[Response]:
+    etag = make_etag(request, db, resource)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"{'public' if public else 'private'}, max-age={settings.REFERENCE_CACHE_MAX_AGE}, must-revalidate",
+    }
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,150 @@
+import json
+import os
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+from app.core.config import settings
+
+# Kênh báo "dữ liệu đã đổi" cho các cache trong bộ nhớ (user, category / role, ETag, thống kê admin)
+# Mỗi worker uvicorn có cache riêng -> worker A sửa dữ liệu thì worker B cũng phải xóa cache của mình
+#   publish(channel, message): gọi handler trong tiến trình hiện tại ngay + gửi cho các worker khác qua backend
+#   subscribe(channel, handler): đăng ký hàm xóa cache, handler(message) phải nhẹ và không ném lỗi
+#   poll(): nhận tin từ worker khác, TTLCache.get gọi trước mỗi lần đọc nên không bao giờ trả dữ liệu cũ
+#           sau khi worker kia đã commit + publish xong
+# Backend chọn bằng CACHE_INVALIDATION_BACKEND: "local" (1 worker) | "file" (nhiều worker trên cùng máy)
+
+USER = "user"              # message: user_id | None (xóa hết)
+REFERENCE = "reference"    # message: tên loại dữ liệu (http_cache.CATEGORIES / ROLES / MOTIVATION_QUOTES)
+ANALYTICS = "analytics"    # message: {"days": [...], "from": ..., "all": bool}
+
+_handlers: Dict[str, List[Callable[[Any], None]]] = defaultdict(list)
+
+
+# Giao diện backend: thay bằng Redis pub/sub, Postgres LISTEN/NOTIFY... chỉ cần cài 2 hàm này
+class InvalidationBackend:
+    # Gửi tin cho các tiến trình KHÁC (tiến trình hiện tại đã tự xử lý)
+    def send(self, channel: str, message: Any):
+        raise NotImplementedError
+
+    # Trả về các tin mới từ tiến trình khác: [(channel, message)]
+    # Trả về None nếu đã lỡ mất tin (VD: file bị xoay vòng) -> mọi cache bị xóa hết cho an toàn
+    def receive(self) -> Optional[list]:
+        raise NotImplementedError
+
+
+# Chỉ 1 tiến trình: không cần gửi đi đâu
+class LocalBackend(InvalidationBackend):
+    def send(self, channel: str, message: Any):
+        pass
+
+    def receive(self) -> Optional[list]:
+        return []
+
+
+# Nhiều worker trên cùng máy: mỗi tin là 1 dòng JSON ghi thêm (O_APPEND) vào 1 file chung
+# Tin được gắn pid người gửi (đọc lại mỗi lần: worker có thể được fork sau khi import)
+# Mỗi worker nhớ vị trí đã đọc, poll() chỉ tốn 1 lần os.stat khi không có gì mới
+# File lớn quá max_bytes thì được thay bằng file rỗng (os.replace), worker khác thấy inode đổi -> xóa hết cache
+class FileBackend(InvalidationBackend):
+    def __init__(self, path: str, max_bytes: int = 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Bắt đầu từ cuối file: tin cũ hơn lúc khởi động không liên quan (cache đang rỗng)
+        self._inode, self._offset = self._stat()
+
+    def _stat(self) -> tuple:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None, 0
+        return stat.st_ino, stat.st_size
+
+    def send(self, channel: str, message: Any):
+        line = json.dumps({"pid": os.getpid(), "channel": channel, "message": message}) + "\n"
+        # 1 lần write() với O_APPEND: các worker ghi cùng lúc không chen vào giữa dòng của nhau
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line.encode())
+            stat = os.fstat(fd)
+        finally:
+            os.close(fd)
+        if stat.st_ino != self._stat()[0]:
+            # File vừa bị worker khác xoay vòng trong lúc ghi -> ghi lại vào file mới
+            return self.send(channel, message)
+        size = stat.st_size
+        if size > self.max_bytes:
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            open(tmp_path, "w").close()
+            os.replace(tmp_path, self.path)
+
+    def receive(self) -> Optional[list]:
+        inode, size = self._stat()
+        if inode == self._inode and size == self._offset:
+            return []
+        with self._lock:
+            if inode != self._inode or size < self._offset:
+                # File mới (xoay vòng / bị xóa): có thể đã lỡ tin ở cuối file cũ
+                self._inode, self._offset = inode, 0
+                lost = True
+            else:
+                lost = False
+            messages = []
+            if inode is not None:
+                with open(self.path, "rb") as file:
+                    file.seek(self._offset)
+                    data = file.read()
+                # Chỉ xử lý tới dòng hoàn chỉnh cuối cùng, phần dở dang để lần sau
+                end = data.rfind(b"\n") + 1
+                self._offset += end
+                for line in data[:end].splitlines():
+                    try:
+                        item = json.loads(line)
+                    except ValueError:
+                        continue
+                    if item.get("pid") != os.getpid():
+                        messages.append((item["channel"], item.get("message")))
+            return None if lost else messages
+
+
+def _create_backend() -> InvalidationBackend:
+    if settings.CACHE_INVALIDATION_BACKEND == "file":
+        return FileBackend(settings.CACHE_INVALIDATION_FILE)
+    return LocalBackend()
+
+_backend = _create_backend()
+
+# Đổi backend (VD: khi test, hoặc cài backend khác)
+def set_backend(backend: InvalidationBackend):
+    global _backend
+    _backend = backend
+
+
+def subscribe(channel: str, handler: Callable[[Any], None]):
+    _handlers[channel].append(handler)
+
+def _dispatch(channel: str, message: Any):
+    for handler in _handlers.get(channel, []):
+        handler(message)
+
+# Gọi SAU KHI commit thay đổi
+def publish(channel: str, message: Any = None):
+    _dispatch(channel, message)
+    try:
+        _backend.send(channel, message)
+    except OSError as e:
+        print(f"[CACHE INVALIDATION ERROR]: {e}")
+
+def poll():
+    try:
+        messages = _backend.receive()
+    except OSError as e:
+        print(f"[CACHE INVALIDATION ERROR]: {e}")
+        return
+    if messages is None:
+        # Lỡ tin -> báo mọi kênh xóa toàn bộ (message None)
+        for channel in list(_handlers):
+            _dispatch(channel, None)
+        return
+    for channel, message in messages:
+        _dispatch(channel, message)
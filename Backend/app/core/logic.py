@@ -1,19 +1,22 @@
 from datetime import date, timedelta
-from typing import List
+from typing import List, Optional
+from sqlalchemy import and_
 from app.database import models
 
 # Hàm tính Streak (Có logic Cầu nối: SKIPPED/PARTIAL không làm gãy chuỗi)
-def calculate_current_streak(logs: List[models.HabitLog]) -> int:
+# Bản tham chiếu chạy bằng Python trên danh sách log: API đọc streak từ cột lưu sẵn / SQL (crud_habit_streak),
+# hàm này giữ lại làm chuẩn đối chiếu (tests/test_streaks.py so kết quả SQL với hàm này)
+def calculate_current_streak(logs: List[models.HabitLog], today: Optional[date] = None) -> int:
     if not logs: return 0
 
     # 1. Sắp xếp log từ Mới -> Cũ
     sorted_logs = sorted(logs, key=lambda x: x.record_date, reverse=True)
-    
+
     # 2. Map dữ liệu theo ngày (để xử lý việc 1 ngày log nhiều lần)
     # Ưu tiên status: COMPLETED > PARTIAL > SKIPPED > FAILED
     day_map = {}
     priority = {"COMPLETED": 3, "PARTIAL": 2, "SKIPPED": 2, "FAILED": 1}
-    
+
     for log in sorted_logs:
         d = log.record_date
         # Logic chọn status tốt nhất trong ngày
@@ -22,9 +25,9 @@ def calculate_current_streak(logs: List[models.HabitLog]) -> int:
 
     # 3. Thuật toán đếm ngược
     dates = sorted(day_map.keys(), reverse=True)
-    today = date.today()
+    today = today or date.today()
     yesterday = today - timedelta(days=1)
-    
+
     # Check ngày bắt đầu: Nếu log mới nhất cách xa quá 2 ngày -> Reset về 0
     if not dates or dates[0] < yesterday:
         return 0
@@ -35,14 +38,66 @@ def calculate_current_streak(logs: List[models.HabitLog]) -> int:
         if d != check_date:
             break
         status = day_map[d]
-        
+
         # --- LOGIC CỐT LÕI ---
         if status == "COMPLETED":
             streak += 1  # Cộng điểm
         elif status in ["PARTIAL", "SKIPPED"]:
             pass         # Cầu nối: Không cộng, nhưng không break loop
-        else: 
+        else:
             break        # FAILED -> Gãy chuỗi
         # Lùi ngày kiểm tra về quá khứ
         check_date = check_date - timedelta(days=1)
-    return streak
\ No newline at end of file
+    return streak
+
+
+# Luật Streak (Có logic Cầu nối: SKIPPED/PARTIAL không làm gãy chuỗi)
+# Streak tại 1 ngày tính từ streak của ngày liền trước (prev_streak) và status của ngày đó
+def next_streak(prev_streak: int, status: str) -> int:
+    if status == "COMPLETED":
+        return prev_streak + 1  # Cộng điểm
+    if status in ["PARTIAL", "SKIPPED"]:
+        return prev_streak      # Cầu nối: Không cộng, nhưng không gãy chuỗi
+    return 0                    # FAILED -> Gãy chuỗi
+
+
+# Streak hiện tại của habit (đọc từ các cột lưu sẵn trên bảng habits)
+# Nếu log mới nhất cách xa quá 2 ngày (trước hôm qua) -> Reset về 0
+def current_streak(habit: models.Habit, today: Optional[date] = None) -> int:
+    today = today or date.today()
+    yesterday = today - timedelta(days=1)
+    if habit.streak_last_date is None or habit.streak_last_date < yesterday:
+        return 0
+    return habit.streak_current
+
+
+# Lịch của habit lưu dạng bitmask (cột weekday_mask): bit 0 = T2 ... bit 6 = CN
+# frequency (2=T2 ... 8=CN) rỗng = làm mỗi ngày = 127 (đủ 7 bit)
+ALL_WEEKDAYS_MASK = 0b1111111
+
+def frequency_to_mask(frequency: Optional[List[int]]) -> int:
+    if not frequency:
+        return ALL_WEEKDAYS_MASK
+    mask = 0
+    for weekday_int in frequency:
+        if 2 <= weekday_int <= 8:
+            mask |= 1 << (weekday_int - 2)
+    return mask
+
+
+# Điều kiện (SQLAlchemy) "habit có lịch vào ngày target_date": dùng trong query ORM
+# created_at so sánh theo mốc đầu ngày hôm sau (không bọc hàm lên cột) -> dùng được index (user_id, created_at)
+def scheduled_on(target_date: date):
+    return and_(
+        models.Habit.created_at < target_date + timedelta(days=1),
+        models.Habit.weekday_mask.op("&")(1 << target_date.weekday()) != 0
+    )
+
+
+# Điều kiện SQL "habit <habit> có lịch vào ngày <day>" (cùng luật với scheduled_on)
+# Dùng trong các câu SQL thuần: habit đã được tạo trước ngày đó + bit thứ của ngày đó bật trong weekday_mask
+def scheduled_on_sql(habit: str = "h", day: str = "days.day") -> str:
+    return f"""(
+        {habit}.created_at < {day} + 1
+        AND ({habit}.weekday_mask & (1 << (CAST(extract(isodow FROM {day}) AS integer) - 1))) <> 0
+    )"""
@@ -0,0 +1,153 @@
+import asyncio
+import time
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+import anyio.to_thread
+from starlette.routing import Match
+
+# Số liệu request theo route (đọc ở GET /metrics, định dạng text của Prometheus)
+#   http_requests_total / http_request_duration_seconds: theo (method, route, status), route là path mẫu (/habits/{habit_id})
+#   http_requests_in_progress: số request đang xử lý theo (method, route)
+#   threadpool_*: threadpool chạy các route 'def' (sync) - đầy thì request sync phải xếp hàng chờ thread
+# Mọi bộ đếm chỉ được ghi từ thread event loop (middleware ASGI) nên không cần khóa
+# Số liệu là của từng tiến trình: chạy nhiều worker uvicorn thì mỗi worker có bộ đếm riêng
+
+# Ngưỡng histogram (giây), giống mặc định của client Prometheus
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Path không khớp route nào (404, quét bậy...) gộp chung 1 nhãn để không sinh vô số series
+UNMATCHED_ROUTE = "unmatched"
+# Giới hạn cache (method, path thật) -> route (path có id: /habits/1, /habits/2 ... mỗi path 1 dòng)
+ROUTE_CACHE_SIZE = 10000
+
+
+class _Histogram:
+    __slots__ = ("buckets", "sum", "count")
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)  # Ô cuối: > ngưỡng lớn nhất (+Inf)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.buckets[bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+_durations: Dict[Tuple[str, str, str], _Histogram] = {}
+_in_progress: Dict[Tuple[str, str], int] = {}
+_threadpool_saturated: Dict[Tuple[str, str], int] = {}
+# (method, path) -> (route, có phải route sync)
+_route_cache: Dict[Tuple[str, str], Tuple[str, bool]] = {}
+
+
+# Tìm route bằng đúng luật khớp của router (route đăng ký trước được ưu tiên), có cache
+def _resolve_route(app, scope) -> Tuple[str, bool]:
+    key = (scope["method"], scope["path"])
+    resolved = _route_cache.get(key)
+    if resolved is None:
+        resolved = (UNMATCHED_ROUTE, False)
+        for route in app.router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                endpoint = getattr(route, "endpoint", None)
+                resolved = (route.path, endpoint is not None and not asyncio.iscoroutinefunction(endpoint))
+                break
+            if match == Match.PARTIAL and resolved[0] == UNMATCHED_ROUTE:
+                resolved = (route.path, False)  # Sai method (405): vẫn ghi theo route
+        if len(_route_cache) >= ROUTE_CACHE_SIZE:
+            _route_cache.clear()
+        _route_cache[key] = resolved
+    return resolved
+
+
+class MetricsMiddleware:
+    # Middleware ASGI thuần (không dùng BaseHTTPMiddleware: không bọc lại request / response, không thêm task)
+    def __init__(self, app, fastapi_app):
+        self.app = app
+        self.fastapi_app = fastapi_app  # App FastAPI chứa danh sách route (self.app là middleware kế tiếp)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route, is_sync = _resolve_route(self.fastapi_app, scope)
+        method = scope["method"]
+        route_key = (method, route)
+        _in_progress[route_key] = _in_progress.get(route_key, 0) + 1
+        if is_sync:
+            limiter = anyio.to_thread.current_default_thread_limiter()
+            if limiter.borrowed_tokens >= limiter.total_tokens:
+                _threadpool_saturated[route_key] = _threadpool_saturated.get(route_key, 0) + 1
+
+        status_code = 500  # App ném lỗi trước khi gửi response -> ServerErrorMiddleware trả 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _in_progress[route_key] -= 1
+            key = (method, route, str(status_code))
+            histogram = _durations.get(key)
+            if histogram is None:
+                histogram = _durations[key] = _Histogram()
+            histogram.observe(time.perf_counter() - started)
+
+
+# ========================== XUẤT SỐ LIỆU ==========================
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def render() -> str:
+    lines: List[str] = []
+
+    def metric(name: str, kind: str, help_text: str):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    durations = sorted(_durations.items())
+
+    metric("http_requests_total", "counter", "Số request đã xử lý theo method, route, status")
+    for (method, route, status), histogram in durations:
+        lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {histogram.count}")
+
+    metric("http_request_duration_seconds", "histogram", "Thời gian xử lý request (giây)")
+    for (method, route, status), histogram in durations:
+        cumulative = 0
+        for bound, count in zip((*map(str, BUCKETS), "+Inf"), histogram.buckets):
+            cumulative += count
+            labels = _labels(method=method, route=route, status=status, le=bound)
+            lines.append(f"http_request_duration_seconds_bucket{labels} {cumulative}")
+        labels = _labels(method=method, route=route, status=status)
+        lines.append(f"http_request_duration_seconds_sum{labels} {histogram.sum}")
+        lines.append(f"http_request_duration_seconds_count{labels} {histogram.count}")
+
+    metric("http_requests_in_progress", "gauge", "Số request đang xử lý theo method, route")
+    for (method, route), count in sorted(_in_progress.items()):
+        lines.append(f"http_requests_in_progress{_labels(method=method, route=route)} {count}")
+
+    # Threadpool mặc định của anyio (FastAPI chạy route sync + dependency sync trong đây)
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    metric("threadpool_threads_total", "gauge", "Số thread tối đa của threadpool chạy code sync")
+    lines.append(f"threadpool_threads_total {int(limiter.total_tokens)}")
+    metric("threadpool_threads_in_use", "gauge", "Số thread đang bận")
+    lines.append(f"threadpool_threads_in_use {limiter.borrowed_tokens}")
+    metric("threadpool_tasks_waiting", "gauge", "Số việc đang xếp hàng chờ thread")
+    lines.append(f"threadpool_tasks_waiting {limiter.statistics().tasks_waiting}")
+    metric("threadpool_saturated_requests_total", "counter", "Số request vào route sync lúc threadpool đã hết thread")
+    for (method, route), count in sorted(_threadpool_saturated.items()):
+        lines.append(f"threadpool_saturated_requests_total{_labels(method=method, route=route)} {count}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,76 @@
+import base64
+import json
+from typing import Any, Callable, Optional, Sequence
+from fastapi import HTTPException, Response
+from sqlalchemy import text, tuple_
+from sqlalchemy.orm import Query, Session
+
+# Phân trang theo khóa (keyset / cursor): thay vì OFFSET (càng trang sau càng chậm),
+# client gửi lại cursor = khóa sắp xếp của phần tử cuối trang trước -> query "WHERE (khóa) < cursor" đi thẳng vào index
+# Body trả về giữ nguyên là list, thông tin trang nằm trong header:
+#   X-Next-Cursor: cursor của trang tiếp theo (không có = hết dữ liệu)
+#   X-Total-Estimate: tổng số dòng ƯỚC LƯỢNG (chỉ khi client gửi with_total=true)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_ESTIMATE_HEADER = "X-Total-Estimate"
+
+
+# Mã hóa khóa sắp xếp thành chuỗi base64 (client coi như chuỗi mờ, không tự tạo)
+def encode_cursor(*values: Any) -> str:
+    raw = json.dumps([str(value) for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+# Giải mã cursor, parsers = hàm chuyển từng phần tử về đúng kiểu (VD: date.fromisoformat, int)
+def decode_cursor(cursor: str, *parsers: Callable[[str], Any]) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if len(values) != len(parsers):
+            raise ValueError("cursor length")
+        return tuple(parse(value) for parse, value in zip(parsers, values))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor không hợp lệ!")
+
+
+# Áp dụng sắp xếp + phân trang cho query: có cursor (after) -> lọc theo khóa, không có -> OFFSET skip như cũ
+# order_columns phải tạo thành khóa duy nhất (VD: (record_date, id)) và có index tương ứng
+def keyset_page(query: Query, order_columns: Sequence, after: Optional[tuple], skip: int, limit: int, descending: bool = True) -> Query:
+    query = query.order_by(*[column.desc() if descending else column.asc() for column in order_columns])
+    if after is not None:
+        key = tuple_(*order_columns)
+        query = query.filter(key < tuple_(*after) if descending else key > tuple_(*after))
+    else:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+
+# Gắn header cursor trang sau: chỉ khi trang đầy (có thể còn dữ liệu)
+def set_next_cursor(response: Response, items: Sequence, limit: int, key: Callable[[Any], tuple]):
+    if items and len(items) >= limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*key(items[-1]))
+
+
+# Ước lượng số dòng của cả bảng từ thống kê của Postgres (pg_class.reltuples), không COUNT(*)
+def estimate_table_rows(db: Session, table_name: str) -> int:
+    reltuples = db.execute(
+        text("SELECT reltuples FROM pg_class WHERE oid = to_regclass(:table_name)"),
+        {"table_name": table_name}
+    ).scalar()
+    # reltuples = -1 khi bảng chưa từng được ANALYZE
+    return max(int(reltuples or 0), 0)
+
+# Ước lượng số dòng của 1 query có điều kiện lọc: lấy số dòng planner dự đoán (EXPLAIN, không chạy query)
+# Planner tính từ reltuples + thống kê cột nên rẻ như trên nhưng sát với điều kiện lọc hơn
+def estimate_query_rows(db: Session, query: Query) -> int:
+    compiled = query.statement.compile(
+        dialect=db.get_bind().dialect, compile_kwargs={"render_postcompile": True}
+    )
+    plan = db.connection().exec_driver_sql(
+        "EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+def set_total_estimate(response: Response, total: Optional[int]):
+    if total is not None:
+        response.headers[TOTAL_ESTIMATE_HEADER] = str(total)
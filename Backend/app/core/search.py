@@ -0,0 +1,34 @@
+from typing import Sequence
+from fastapi import HTTPException
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Query
+from app.core.config import settings
+
+# Tìm kiếm văn bản trên các cột có index GIN pg_trgm (xem migration trigram_search_indexes)
+#   contains: ILIKE '%x%' như cũ, giữ thứ tự / phân trang của API (từ 3 ký tự trở lên index mới dùng được)
+#   ranked:   khớp chuỗi con HOẶC gần đúng (gõ sai chính tả), xếp theo độ giống word_similarity giảm dần
+SEARCH_MODE_PATTERN = "^(contains|ranked)$"
+
+
+def contains_filter(query: Query, columns: Sequence, term: str) -> Query:
+    pattern = f"%{term}%"
+    return query.filter(or_(*[column.ilike(pattern) for column in columns]))
+
+
+# Điều kiện "term <% cột" (word_similarity >= pg_trgm.word_similarity_threshold) cũng đi qua index GIN
+# Không thể dùng keyset cursor (thứ tự theo điểm), chỉ phân trang bằng skip / limit
+def ranked_filter(query: Query, columns: Sequence, term: str, tiebreak_column) -> Query:
+    term = term.strip()
+    if len(term) < settings.SEARCH_MIN_LENGTH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Từ khóa tìm kiếm (search_mode=ranked) phải có ít nhất {settings.SEARCH_MIN_LENGTH} ký tự!"
+        )
+    pattern = f"%{term}%"
+    query = query.filter(or_(
+        *[column.ilike(pattern) for column in columns],
+        *[column.op("%>")(term) for column in columns],
+    ))
+    # Cột NULL (VD: author) cho điểm NULL, greatest() bỏ qua NULL
+    score = func.greatest(*[func.word_similarity(term, column) for column in columns])
+    return query.order_by(score.desc(), tiebreak_column)
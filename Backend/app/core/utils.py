@@ -1,19 +1,13 @@
-from passlib.context import CryptContext
 from datetime import datetime, timedelta, timezone
 from jose import jwt
 from typing import Optional
 from app.core.config import settings 
+from app.core import hashing
 import random
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-import smtplib
 import string
 
-# Khai báo context dùng Crypt để hash mật khẩu
-# CẤU HÌNH CÁI MÁY XAY
-# schemes=["bcrypt"]: Chọn loại lưỡi dao là bcrypt (rất mạnh).
-# deprecated="auto": Tự động bỏ qua các thuật toán cũ nếu sau này mình update.
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Context băm mật khẩu (bcrypt) nằm ở app/core/hashing.py, 2 hàm dưới chạy bcrypt trong pool tiến trình riêng
+pwd_context = hashing.pwd_context
 
 # Hàm kiểm tra trùng khớp mật khẩu
 def check_password(plain_password, hashed_password):
@@ -23,7 +17,7 @@ def check_password(plain_password, hashed_password):
     -> Hàm này tự động băm cái plain và so sánh với hashed.
     -> Trả về True (khớp) hoặc False (sai).
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return hashing.verify_password(plain_password, hashed_password)[0]
 
 # Hàm băm mật khẩu
 def get_password_hash(password):
@@ -31,7 +25,7 @@ def get_password_hash(password):
     - password: Mật khẩu thô user muốn đặt.
     -> Trả về chuỗi đã mã hóa để đem đi lưu vào DB.
     """
-    return pwd_context.hash(password)
+    return hashing.hash_password(password)
 
 
 ALGORITHM = "HS256" 
@@ -59,24 +53,3 @@ def generate_random_password(length=8):
     characters = string.ascii_letters + string.digits
     random_password = ''.join(random.choice(characters) for _ in range(length))
     return random_password
-
-# Hàm gửi email
-def send_email_background(to_email: str, subject: str, body: str):
-    try:
-        msg = MIMEMultipart()
-        msg['From'] = settings.MAIL_FROM
-        msg['To'] = to_email
-        msg['Subject'] = subject
-
-        msg.attach(MIMEText(body, 'plain'))
-
-        # Kết nối Server Gmail
-        server = smtplib.SMTP(settings.MAIL_SERVER, settings.MAIL_PORT)
-        server.starttls() # Bảo mật
-        server.login(settings.MAIL_USERNAME, settings.MAIL_PASSWORD)
-        text = msg.as_string()
-        server.sendmail(settings.MAIL_FROM, to_email, text)
-        server.quit()
-        print(f"Đã gửi mail thành công tới {to_email}")
-    except Exception as e:
-        print(f"Lỗi gửi mail: {e}")
@@ -0,0 +1,100 @@
+import argparse
+import asyncio
+import time
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import text
+from app.database import db_connection, models
+from app.database.crud import crud_habit_log
+from app.core.config import settings
+
+# Job auto-fail: điền FAILED cho mọi habit có lịch nhưng chưa có log, của TẤT CẢ user
+# Chạy theo từng nhóm user (chunk, mỗi chunk 1 transaction ngắn) để không giữ khóa lâu khi dữ liệu lớn
+# Chạy tay từ thư mục Backend:
+#   python -m app.database.auto_fail                      -> quét 7 ngày trước hôm nay
+#   python -m app.database.auto_fail --days 3 --chunk-size 1000 --end-date 2026-01-31
+
+# Khóa advisory cấp session: nhiều worker cùng bật scheduler thì chỉ 1 worker chạy job tại 1 thời điểm
+AUTO_FAIL_JOB_LOCK = 2
+
+
+def run_auto_fail(
+    end_date: Optional[date] = None,
+    days: int = settings.AUTO_FAIL_DAYS,
+    chunk_size: int = settings.AUTO_FAIL_CHUNK_SIZE
+) -> Optional[List[dict]]:
+    # Mặc định quét tới hôm qua (hôm nay user vẫn còn thời gian check-in)
+    end_date = end_date or datetime.now().date() - timedelta(days=1)
+    start_date = end_date - timedelta(days=days - 1)
+
+    with db_connection.engine.connect() as lock_conn:
+        got_lock = lock_conn.execute(
+            text("SELECT pg_try_advisory_lock(:lock_class, 0)"), {"lock_class": AUTO_FAIL_JOB_LOCK}
+        ).scalar()
+        lock_conn.commit()
+        if not got_lock:
+            print("[AUTO-FAIL] Job đang chạy ở tiến trình khác. Bỏ qua.")
+            return None
+
+        db = db_connection.SessionLocal()
+        try:
+            print(f"[AUTO-FAIL] Quét từ {start_date} tới {end_date}, {chunk_size} user / chunk")
+            chunks = []
+            last_user_id = 0
+            while True:
+                # Phân trang theo khóa (id > user cuối của chunk trước), không dùng OFFSET
+                user_ids = [row.id for row in db.query(models.User.id)
+                            .filter(models.User.id > last_user_id)
+                            .order_by(models.User.id)
+                            .limit(chunk_size).all()]
+                db.commit()
+                if not user_ids:
+                    break
+
+                started = time.perf_counter()
+                inserted = crud_habit_log.auto_fail_logs(db, user_ids, start_date, end_date)
+                elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+
+                chunk = {"from_user_id": user_ids[0], "to_user_id": user_ids[-1],
+                         "inserted": inserted, "elapsed_ms": elapsed_ms}
+                chunks.append(chunk)
+                print(f"[AUTO-FAIL] user {user_ids[0]}..{user_ids[-1]}: {inserted} log FAILED ({elapsed_ms} ms)")
+                last_user_id = user_ids[-1]
+
+            print(f"[AUTO-FAIL] Xong: {sum(c['inserted'] for c in chunks)} log trong {len(chunks)} chunk")
+            return chunks
+        finally:
+            db.close()
+            lock_conn.execute(
+                text("SELECT pg_advisory_unlock(:lock_class, 0)"), {"lock_class": AUTO_FAIL_JOB_LOCK}
+            )
+            lock_conn.commit()
+
+
+# Scheduler chạy trong tiến trình API (bật bằng AUTO_FAIL_SCHEDULER=True): mỗi ngày 1 lần lúc AUTO_FAIL_AT (HH:MM)
+async def auto_fail_scheduler():
+    hour, minute = (int(part) for part in settings.AUTO_FAIL_AT.split(":"))
+    while True:
+        now = datetime.now()
+        next_run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        await asyncio.sleep((next_run - now).total_seconds())
+        try:
+            # Job dùng Session sync -> chạy trong thread riêng để không chặn event loop
+            await asyncio.to_thread(run_auto_fail)
+        except Exception as e:
+            print(f"[AUTO-FAIL ERROR]: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Điền FAILED cho các ngày có lịch nhưng chưa check-in")
+    parser.add_argument("--end-date", type=date.fromisoformat, default=None, help="Ngày cuối cần quét (mặc định: hôm qua)")
+    parser.add_argument("--days", type=int, default=settings.AUTO_FAIL_DAYS, help="Số ngày quét lùi từ end-date")
+    parser.add_argument("--chunk-size", type=int, default=settings.AUTO_FAIL_CHUNK_SIZE, help="Số user mỗi transaction")
+    args = parser.parse_args()
+
+    run_auto_fail(end_date=args.end_date, days=args.days, chunk_size=args.chunk_size)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+from datetime import date, timedelta
+from typing import Iterable
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from app.core.cache import TTLCache
+from app.core import invalidation, logic
+from app.core.config import settings
+
+# Thống kê toàn hệ thống cho admin: tỉ lệ hoàn thành theo Category x (ngày | tuần)
+# Mẫu số = số lượt habit CÓ LỊCH (habit x ngày, cùng luật với logic.scheduled_on_sql), không phải số log:
+# ngày chưa được auto-fail điền FAILED hay log check-in ngoài lịch đều không làm lệch tỉ lệ
+# Tính bằng 1 câu: (generate_series các ngày x nhóm habit có lịch) GROUP BY, ghép với log của ngày có lịch GROUP BY
+# Ngày sau hôm nay chưa tính (kỳ đang diễn ra chỉ tính tới hôm nay)
+#
+# Cache: kết quả của các kỳ ĐÃ KẾT THÚC được giữ trong bộ nhớ, key = (group_by, ngày bắt đầu kỳ)
+# Mọi lần ghi log / đổi habit đều đi qua crud_user_daily_stats.refresh_* -> các hàm đó đánh dấu ngày thay đổi
+# Đổi category của habit, sửa / xóa category -> đánh dấu xóa toàn bộ
+
+GROUP_BY_DAYS = {"day": 1, "week": 7}
+
+analytics_cache = TTLCache(maxsize=settings.ANALYTICS_CACHE_SIZE, ttl=settings.ANALYTICS_CACHE_TTL)
+
+ANALYTICS_SQL = text(f"""
+    WITH days AS (
+        SELECT CAST(d AS date) AS day
+        FROM generate_series(CAST(:from_date AS date), CAST(:to_date AS date), interval '1 day') AS d
+    ),
+    -- Gộp habit cùng (category, lịch, ngày tạo): số dòng nhân với số ngày nhỏ hơn nhiều so với từng habit
+    habit_groups AS (
+        SELECT category_id, weekday_mask, CAST(created_at AS date) AS created_at, count(*) AS habits
+        FROM habits
+        WHERE created_at < CAST(:to_date AS date) + 1
+        GROUP BY 1, 2, 3
+    ),
+    scheduled AS (
+        SELECT CAST(date_trunc(:group_by, days.day) AS date) AS period, g.category_id,
+               CAST(sum(g.habits) AS integer) AS scheduled
+        FROM days
+        JOIN habit_groups g ON {logic.scheduled_on_sql("g", "days.day")}
+        GROUP BY 1, 2
+    ),
+    -- Chỉ log của ngày có lịch (check-in ngoài lịch không nằm trong mẫu số nên cũng không tính ở tử số)
+    logged AS (
+        SELECT CAST(date_trunc(:group_by, l.record_date) AS date) AS period, h.category_id,
+               count(*) AS total_logs,
+               count(*) FILTER (WHERE l.status = 'COMPLETED') AS completed,
+               count(*) FILTER (WHERE l.status = 'PARTIAL') AS partial,
+               count(*) FILTER (WHERE l.status = 'SKIPPED') AS skipped,
+               count(*) FILTER (WHERE l.status = 'FAILED') AS failed
+        FROM habit_logs l
+        JOIN habits h ON h.id = l.habit_id
+        WHERE l.record_date BETWEEN :from_date AND :to_date
+          AND {logic.scheduled_on_sql("h", "l.record_date")}
+        GROUP BY 1, 2
+    )
+    SELECT s.period,
+           c.id AS category_id,
+           c.name AS category_name,
+           s.scheduled,
+           coalesce(g.total_logs, 0) AS total_logs,
+           coalesce(g.completed, 0) AS completed,
+           coalesce(g.partial, 0) AS partial,
+           coalesce(g.skipped, 0) AS skipped,
+           coalesce(g.failed, 0) AS failed
+    FROM scheduled s
+    JOIN habit_categories c ON c.id = s.category_id
+    LEFT JOIN logged g ON g.period = s.period AND g.category_id = s.category_id
+    ORDER BY 1, 2
+""")
+
+
+# Ngày bắt đầu kỳ chứa ngày d (tuần bắt đầu từ Thứ 2, giống date_trunc('week') của Postgres)
+def period_start(d: date, group_by: str) -> date:
+    return d - timedelta(days=d.weekday()) if group_by == "week" else d
+
+def _rate(completed: int, total: int) -> float:
+    return round(completed / total * 100, 2) if total else 0.0
+
+def _empty_period(start: date) -> dict:
+    return {"period": start, "scheduled": 0, "total_logs": 0, "completed": 0, "completion_rate": 0.0, "categories": []}
+
+
+# Trả về các kỳ trong [from_date, to_date] (đã căn theo biên kỳ), kỳ đã kết thúc lấy từ cache nếu có
+def get_completion_rates(db: Session, from_date: date, to_date: date, group_by: str, today: date) -> dict:
+    step = timedelta(days=GROUP_BY_DAYS[group_by])
+    starts = []
+    current = period_start(from_date, group_by)
+    while current <= to_date:
+        starts.append(current)
+        current += step
+
+    periods = {}
+    missing = []
+    generation = analytics_cache.generation
+    for start in starts:
+        elapsed = start + step <= today
+        cached = analytics_cache.get((group_by, start)) if elapsed else None
+        if cached is not None:
+            periods[start] = cached
+        else:
+            missing.append(start)
+
+    if missing:
+        # 1 câu query cho đoạn liên tục chứa tất cả các kỳ chưa có trong cache
+        rows = db.execute(ANALYTICS_SQL, {
+            "group_by": group_by, "from_date": missing[0], "to_date": min(missing[-1] + step - timedelta(days=1), today)
+        }).mappings().all()
+
+        computed = {start: _empty_period(start) for start in missing}
+        for row in rows:
+            period = computed.get(row["period"])
+            if period is None:
+                continue  # Kỳ đã có trong cache
+            category = dict(row)
+            del category["period"]
+            category["completion_rate"] = _rate(row["completed"], row["scheduled"])
+            period["categories"].append(category)
+            period["scheduled"] += row["scheduled"]
+            period["total_logs"] += row["total_logs"]
+            period["completed"] += row["completed"]
+
+        for start, period in computed.items():
+            period["completion_rate"] = _rate(period["completed"], period["scheduled"])
+            periods[start] = period
+            if start + step <= today:
+                analytics_cache.set((group_by, start), period, generation=generation)
+
+    return {
+        "from_date": starts[0],
+        "to_date": starts[-1] + step - timedelta(days=1),
+        "group_by": group_by,
+        "cached_periods": len(starts) - len(missing),
+        "periods": [periods[start] for start in starts],
+    }
+
+
+# ========================== INVALIDATE CACHE ==========================
+# Các hàm ghi chỉ ĐÁNH DẤU thay đổi trên session (db.info); cache bị xóa SAU KHI transaction commit (ở mọi worker)
+# (xóa trước commit thì 1 request đọc xen giữa có thể nạp lại dữ liệu cũ vào cache)
+_PENDING_DAYS = "analytics_pending_days"
+_PENDING_FROM = "analytics_pending_from"
+_PENDING_ALL = "analytics_pending_all"
+
+# Log của các ngày này vừa thay đổi
+def mark_days_changed(db: Session, days: Iterable[date]):
+    db.info.setdefault(_PENDING_DAYS, set()).update(days)
+
+# Dữ liệu từ from_date trở đi thay đổi (tạo / xóa habit, đổi lịch)
+def mark_changed_from(db: Session, from_date: date):
+    pending = db.info.get(_PENDING_FROM)
+    db.info[_PENDING_FROM] = from_date if pending is None else min(pending, from_date)
+
+# Đổi category của habit, sửa / xóa category
+def mark_all_changed(db: Session):
+    db.info[_PENDING_ALL] = True
+
+
+# Quá nhiều ngày (VD: import cả năm log) thì gửi lệnh xóa hết cho gọn tin nhắn
+MAX_DAYS_PER_MESSAGE = 100
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(db: Session):
+    days = db.info.pop(_PENDING_DAYS, None)
+    from_date = db.info.pop(_PENDING_FROM, None)
+    clear_all = db.info.pop(_PENDING_ALL, False)
+    if not (days or from_date or clear_all):
+        return
+    if clear_all or (days and len(days) > MAX_DAYS_PER_MESSAGE):
+        invalidation.publish(invalidation.ANALYTICS, None)
+        return
+    invalidation.publish(invalidation.ANALYTICS, {
+        "days": sorted(d.isoformat() for d in days or []),
+        "from": from_date.isoformat() if from_date else None,
+    })
+
+# Xóa cache ở mọi worker (message None = xóa hết)
+def _on_analytics_changed(message):
+    if message is None:
+        analytics_cache.clear()
+        return
+    if message["days"]:
+        keys = {(group_by, period_start(date.fromisoformat(d), group_by))
+                for d in message["days"] for group_by in GROUP_BY_DAYS}
+        analytics_cache.invalidate_where(lambda key: key in keys)
+    if message["from"]:
+        from_date = date.fromisoformat(message["from"])
+        analytics_cache.invalidate_where(
+            lambda key: key[1] + timedelta(days=GROUP_BY_DAYS[key[0]]) > from_date
+        )
+
+invalidation.subscribe(invalidation.ANALYTICS, _on_analytics_changed)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(db: Session):
+    for key in (_PENDING_DAYS, _PENDING_FROM, _PENDING_ALL):
+        db.info.pop(key, None)
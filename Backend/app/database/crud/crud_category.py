@@ -1,6 +1,20 @@
 from sqlalchemy.orm import Session
 from app.database import models
+from app.database.crud import crud_analytics
 from app.schemas import schemas
+from app.core import http_cache, invalidation
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+# Bảng category rất nhỏ nhưng được đọc liên tục -> cache đọc (read-through) bản chụp schemas.HabitCategoryResponse
+# Các hàm ghi bên dưới gọi http_cache.bump_version trước commit -> sau commit kênh invalidation.REFERENCE xóa cache ở mọi worker
+category_cache = TTLCache(maxsize=settings.REFERENCE_CACHE_SIZE, ttl=settings.REFERENCE_CACHE_TTL)
+
+def _on_reference_changed(resource):
+    if resource is None or resource == http_cache.CATEGORIES:
+        category_cache.clear()
+
+invalidation.subscribe(invalidation.REFERENCE, _on_reference_changed)
 
 # Tạo Category mới
 def create_category(db: Session, category: schemas.HabitCategoryCreate):
@@ -10,22 +24,45 @@ def create_category(db: Session, category: schemas.HabitCategoryCreate):
         )
 
     db.add(db_category)
+    http_cache.bump_version(db, http_cache.CATEGORIES)
     db.commit()
     db.refresh(db_category)
 
     return db_category
 
-# Lấy danh sách (Read All)
+# Lấy danh sách (Read All) - trả về bản chụp từ cache
 def get_categories(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.HabitCategory).offset(skip).limit(limit).all()
+    key = ("list", skip, limit)
+    cached = category_cache.get(key)
+    if cached is not None:
+        return list(cached)
+    generation = category_cache.generation
+    categories = [schemas.HabitCategoryResponse.model_validate(category)
+                  for category in db.query(models.HabitCategory).offset(skip).limit(limit).all()]
+    category_cache.set(key, categories, generation=generation)
+    return list(categories)
 
-# Lấy chi tiết 1 cái (Read One)
+# Lấy chi tiết 1 cái (Read One) - bản chụp từ cache, muốn sửa / xóa thì dùng _get_category_row
 def get_category(db: Session, category_id: int):
+    key = ("one", category_id)
+    cached = category_cache.get(key)
+    if cached is not None:
+        return cached
+    generation = category_cache.generation
+    db_category = _get_category_row(db, category_id)
+    if db_category is None:
+        return None
+    category = schemas.HabitCategoryResponse.model_validate(db_category)
+    category_cache.set(key, category, generation=generation)
+    return category
+
+# Bản ghi ORM thật (dùng cho cập nhật / xóa)
+def _get_category_row(db: Session, category_id: int):
     return db.query(models.HabitCategory).filter(models.HabitCategory.id == category_id).first()
 
 # Cập nhật Category
 def update_category(db: Session, category_id: int, category_update: schemas.HabitCategoryUpdate):
-    db_category = get_category(db, category_id)
+    db_category = _get_category_row(db, category_id)
     # Nếu không tìm thấy category thì trả về None
     if not db_category:
         return None
@@ -39,16 +76,20 @@ def update_category(db: Session, category_id: int, category_update: schemas.Habi
         setattr(db_category, key, value)
 
     db.add(db_category)
+    crud_analytics.mark_all_changed(db)  # Tên category nằm trong kết quả /admin/analytics đã cache
+    http_cache.bump_version(db, http_cache.CATEGORIES)
     db.commit()
     db.refresh(db_category)
     return db_category
 
 # Xóa Category
 def delete_category(db: Session, category_id: int):
-    db_category = get_category(db, category_id)
+    db_category = _get_category_row(db, category_id)
     if not db_category:
         return None
 
     db.delete(db_category)
+    crud_analytics.mark_all_changed(db)
+    http_cache.bump_version(db, http_cache.CATEGORIES)
     db.commit()
     return db_category
\ No newline at end of file
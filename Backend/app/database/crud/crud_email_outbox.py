@@ -0,0 +1,80 @@
+from datetime import datetime
+from typing import List
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+from app.database import models
+
+# Hàng đợi email lưu trong DB (bảng email_outbox)
+# Request chỉ THÊM tin vào hàng đợi trong cùng transaction với thay đổi dữ liệu (VD: đổi mật khẩu)
+# -> commit thành công thì chắc chắn có mail, restart server không mất mail
+# Worker (app/database/email_outbox.py) lấy tin bằng SKIP LOCKED nên nhiều worker chạy song song không gửi trùng
+
+STATUS_PENDING = "PENDING"
+STATUS_SENT = "SENT"
+STATUS_FAILED = "FAILED"
+
+# Giữ chỗ 1 lô tin đến hạn: tăng attempts + dời next_attempt_at ra sau lease_seconds
+# Worker chết giữa chừng -> hết lease tin tự được lấy lại (tính là 1 lần thử)
+CLAIM_SQL = text("""
+    UPDATE email_outbox o
+    SET attempts = o.attempts + 1,
+        next_attempt_at = now() + make_interval(secs => :lease_seconds)
+    FROM (
+        SELECT id FROM email_outbox
+        WHERE status = 'PENDING' AND next_attempt_at <= now()
+        ORDER BY next_attempt_at, id
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    ) due
+    WHERE o.id = due.id
+    RETURNING o.id, o.to_email, o.subject, o.body, o.attempts
+""")
+
+# Tin chờ quá lâu (SMTP hỏng nhiều giờ...): bỏ hẳn, xóa trắng nội dung (mật khẩu mới không nằm mãi trong DB)
+EXPIRE_SQL = text("""
+    UPDATE email_outbox
+    SET status = 'FAILED', body = '', last_error = :error
+    WHERE status = 'PENDING' AND created_at < now() - make_interval(secs => :max_age_seconds)
+""")
+
+
+# Thêm mail vào hàng đợi (KHÔNG commit: commit cùng thay đổi của request)
+def enqueue_email(db: Session, to_email: str, subject: str, body: str) -> models.EmailOutbox:
+    message = models.EmailOutbox(to_email=to_email, subject=subject, body=body)
+    db.add(message)
+    return message
+
+# Lấy + giữ chỗ tối đa batch_size tin đến hạn (commit ngay để nhả khóa dòng trước khi gửi SMTP)
+def claim_batch(db: Session, batch_size: int, lease_seconds: int) -> List[dict]:
+    rows = db.execute(CLAIM_SQL, {"batch_size": batch_size, "lease_seconds": lease_seconds}).mappings().all()
+    db.commit()
+    return [dict(row) for row in rows]
+
+def mark_sent(db: Session, message_id: int):
+    db.query(models.EmailOutbox).filter(models.EmailOutbox.id == message_id).update({
+        models.EmailOutbox.status: STATUS_SENT,
+        models.EmailOutbox.sent_at: func.now(),
+        models.EmailOutbox.body: "",
+        models.EmailOutbox.last_error: None,
+    }, synchronize_session=False)
+
+# Gửi lỗi: hẹn lần thử sau (next_attempt_at) hoặc FAILED nếu đã hết số lần thử (xóa trắng body như khi gửi xong)
+def mark_failed(db: Session, message_id: int, error: str, retry_at: datetime = None):
+    values = {models.EmailOutbox.last_error: error[:1000]}
+    if retry_at is None:
+        values[models.EmailOutbox.status] = STATUS_FAILED
+        values[models.EmailOutbox.body] = ""
+    else:
+        values[models.EmailOutbox.next_attempt_at] = retry_at
+    db.query(models.EmailOutbox).filter(models.EmailOutbox.id == message_id).update(values, synchronize_session=False)
+
+# Chuyển tin PENDING tạo trước max_age_seconds sang FAILED (KHÔNG commit), trả về số tin
+def expire_stale(db: Session, max_age_seconds: int) -> int:
+    return db.execute(EXPIRE_SQL, {
+        "max_age_seconds": max_age_seconds, "error": f"Quá {max_age_seconds} giây chưa gửi được"
+    }).rowcount
+
+# Số tin theo trạng thái (theo dõi hàng đợi)
+def count_by_status(db: Session) -> dict:
+    rows = db.query(models.EmailOutbox.status, func.count()).group_by(models.EmailOutbox.status).all()
+    return {status: total for status, total in rows}
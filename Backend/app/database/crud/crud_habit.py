@@ -1,7 +1,10 @@
 from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import date
 from app.database import models
+from app.database.crud import crud_user_daily_stats, crud_analytics
 from app.schemas import schemas
-from app.core import utils
+from app.core import utils, logic, pagination
 
 # Tạo Habit mới 
 def create_habit(db: Session, habit: schemas.HabitCreate, user_id: int):
@@ -13,10 +16,16 @@ def create_habit(db: Session, habit: schemas.HabitCreate, user_id: int):
 
     habit = models.Habit(
         **habit.model_dump(),
-        user_id = user_id 
+        user_id = user_id,
+        weekday_mask = logic.frequency_to_mask(habit.frequency)
     )
 
+    crud_user_daily_stats.lock_user(db, user_id)
     db.add(habit)
+    db.flush()
+    db.refresh(habit) # Lấy created_at do DB sinh ra
+    # Habit mới làm thay đổi số habit cần làm từ ngày tạo trở đi
+    crud_user_daily_stats.refresh_from(db, user_id, habit.created_at.date())
     db.commit()
     db.refresh(habit)
     return habit
@@ -27,9 +36,20 @@ def get_habits_by_user(db: Session, user_id: int, skip: int = 0, limit: int = 10
     return db.query(models.Habit).filter(models.Habit.user_id == user_id).offset(skip).limit(limit).all()
 
 
-# Lấy tất cả Habit (Dành cho ADMIN)
-def get_all_habits(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Habit).offset(skip).limit(limit).all()
+# Lấy các Habit CẦN LÀM vào ngày target_date (lọc lịch ngay trong SQL bằng weekday_mask)
+def get_habits_scheduled_on(db: Session, user_id: int, target_date: date):
+    return db.query(models.Habit).filter(
+        models.Habit.user_id == user_id,
+        logic.scheduled_on(target_date)
+    ).order_by(models.Habit.id).all()
+
+
+# Lấy tất cả Habit (Dành cho ADMIN), after_id = id habit cuối trang trước (cursor)
+def get_all_habits(db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+    after = (after_id,) if after_id is not None else None
+    return pagination.keyset_page(
+        db.query(models.Habit), [models.Habit.id], after, skip, limit, descending=False
+    ).all()
 
 
 # Lấy thông tin Habit theo ID
@@ -37,6 +57,13 @@ def get_habit_by_id(db: Session, habit_id: int):
     return db.query(models.Habit).filter(models.Habit.id == habit_id).first()
 
 
+# Lấy nhiều Habit theo danh sách ID trong 1 query (dùng cho check-in hàng loạt)
+def get_habits_by_ids(db: Session, habit_ids: List[int]):
+    if not habit_ids:
+        return []
+    return db.query(models.Habit).filter(models.Habit.id.in_(habit_ids)).all()
+
+
 # Cập nhật Habit 
 def update_habit(db: Session, habit_id: int, habit_update: schemas.HabitUpdate):
     habit = get_habit_by_id(db, habit_id)
@@ -47,13 +74,25 @@ def update_habit(db: Session, habit_id: int, habit_update: schemas.HabitUpdate):
     # Nó bảo Pydantic là: "Chỉ lấy những trường mà người dùng thực sự gửi lên.
     #  Nếu người dùng không gửi trường description, thì đừng có đưa description: None vào đây".
     update_data = habit_update.model_dump(exclude_unset=True)
+    frequency_changed = "frequency" in update_data and update_data["frequency"] != habit.frequency
+    if frequency_changed:
+        crud_user_daily_stats.lock_user(db, habit.user_id)
+    if "category_id" in update_data and update_data["category_id"] != habit.category_id:
+        # Log cũ chuyển sang category khác -> thống kê admin theo category phải tính lại
+        crud_analytics.mark_all_changed(db)
 
     # Gán giá trị mới 
     for key, value in update_data.items():
         setattr(habit, key, value)
+    if "frequency" in update_data:
+        habit.weekday_mask = logic.frequency_to_mask(habit.frequency)
 
     # Lưu DB
     db.add(habit)
+    if frequency_changed:
+        # Đổi lịch -> tính lại thống kê ngày từ lúc tạo habit (cùng transaction)
+        db.flush()
+        crud_user_daily_stats.refresh_from(db, habit.user_id, habit.created_at.date())
     db.commit()
     db.refresh(habit)
     return habit
@@ -63,6 +102,9 @@ def update_habit(db: Session, habit_id: int, habit_update: schemas.HabitUpdate):
 def delete_habit(db: Session, habit_id: int):
     habit = db.query(models.Habit).filter(models.Habit.id == habit_id).first()
     if habit:
+        crud_user_daily_stats.lock_user(db, habit.user_id)
         db.delete(habit)
+        db.flush()
+        crud_user_daily_stats.refresh_from(db, habit.user_id, habit.created_at.date())
         db.commit()
     return habit
\ No newline at end of file
@@ -1,82 +1,248 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import desc, literal_column, select, text, true, tuple_
+from sqlalchemy.dialects.postgresql import insert
 from app.database import models
+from app.database.crud import crud_user_daily_stats, crud_habit_streak
 from app.schemas import schemas
+from app.core import logic, pagination
 from typing import List, Optional
 from datetime import date
 
+# Cột phụ trong RETURNING của upsert: xmax = 0 nghĩa là dòng vừa được INSERT (không phải ghi đè)
+INSERTED_FLAG = literal_column("(xmax = 0)").label("inserted")
+
 # 1. Logic Check-in: Tạo mới (hoặc Update nếu đã tồn tại)
+# Chỉ 1 câu lệnh INSERT ... ON CONFLICT DO UPDATE ... RETURNING (dựa trên unique index (habit_id, record_date))
+# -> 1 round trip, và 2 lần check-in đồng thời cùng ngày không thể tạo ra 2 log
 def create_or_update_habit_log(db: Session, log: schemas.HabitLogCreate):
-    # Tìm log cũ
-    existing_log = db.query(models.HabitLog).filter(
-        models.HabitLog.habit_id == log.habit_id,
-        models.HabitLog.record_date == log.record_date
-    ).first()
-    
     # Vì bảng HabitLog trong DB không có cột 'unit'
     log_data = log.model_dump(exclude={"unit"}) 
 
-    if existing_log:
-        # Update (Dùng log_data đã sạch)
-        for key, value in log_data.items():
-            setattr(existing_log, key, value)
-            
-        db.commit()
-        db.refresh(existing_log)
-        return existing_log
+    # Khóa user sở hữu habit trước khi ghi (để cập nhật bảng thống kê ngày không bị mất lượt)
+    user_id = crud_user_daily_stats.lock_user_by_habit(db, log.habit_id)
 
-    # Create (Dùng log_data đã sạch)
-    db_log = models.HabitLog(**log_data)
-    db.add(db_log)
+    stmt = insert(models.HabitLog).values(**log_data)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.HabitLog.habit_id, models.HabitLog.record_date],
+        set_={"status": stmt.excluded.status, "value": stmt.excluded.value}
+    ).returning(*models.HabitLog.__table__.columns, INSERTED_FLAG)
+
+    db_log = dict(db.execute(stmt).mappings().one())
+    inserted = db_log.pop("inserted")
+    crud_user_daily_stats.refresh_days(db, user_id, [log.record_date])
+    crud_habit_streak.apply_check_ins(db, log.habit_id, [(log.record_date, log.status, inserted)])
     db.commit()
-    db.refresh(db_log)
     return db_log
 
+# 1b. Check-in hàng loạt: ghi nhiều log bằng 1 câu INSERT nhiều dòng ... ON CONFLICT DO UPDATE (1 transaction)
+# Tất cả habit phải thuộc user_id (router đã kiểm tra). Trả về dict {(habit_id, record_date): log đã lưu}
+def bulk_create_or_update_habit_logs(db: Session, user_id: int, logs: List[schemas.HabitLogCreate]):
+    # ON CONFLICT không cho phép 1 câu lệnh cập nhật cùng 1 dòng 2 lần -> gộp trùng, phần tử gửi sau thắng
+    rows = {}
+    for log in logs:
+        rows[(log.habit_id, log.record_date)] = log.model_dump(exclude={"unit"})
+    if not rows:
+        return {}
+
+    crud_user_daily_stats.lock_user(db, user_id)
+
+    stmt = insert(models.HabitLog).values(list(rows.values()))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.HabitLog.habit_id, models.HabitLog.record_date],
+        set_={"status": stmt.excluded.status, "value": stmt.excluded.value}
+    ).returning(*models.HabitLog.__table__.columns, INSERTED_FLAG)
+
+    saved_logs = {}
+    check_ins_by_habit = {}
+    for row in db.execute(stmt).mappings().all():
+        row = dict(row)
+        inserted = row.pop("inserted")
+        saved_logs[(row["habit_id"], row["record_date"])] = row
+        check_ins_by_habit.setdefault(row["habit_id"], []).append((row["record_date"], row["status"], inserted))
+
+    crud_user_daily_stats.refresh_days(db, user_id, [record_date for _, record_date in rows])
+    for habit_id, check_ins in check_ins_by_habit.items():
+        crud_habit_streak.apply_check_ins(db, habit_id, check_ins)
+    db.commit()
+    return saved_logs
+
+# 1c. Auto-fail: điền FAILED cho mọi ngày có lịch nhưng chưa có log của các user trong user_ids
+# 1 câu INSERT ... SELECT ... FROM generate_series ... ON CONFLICT DO NOTHING (set-based, không lặp từng habit)
+AUTO_FAIL_SQL = text(f"""
+    WITH inserted AS (
+        INSERT INTO habit_logs (habit_id, record_date, status, value)
+        SELECT h.id, days.day, 'FAILED', 0
+        FROM habits h
+        CROSS JOIN (
+            SELECT CAST(d AS date) AS day
+            FROM generate_series(CAST(:start_date AS date), CAST(:end_date AS date), interval '1 day') AS d
+        ) days
+        WHERE h.user_id = ANY(CAST(:user_ids AS integer[]))
+          AND {logic.scheduled_on_sql("h", "days.day")}
+          AND NOT EXISTS (
+              SELECT 1 FROM habit_logs l WHERE l.habit_id = h.id AND l.record_date = days.day
+          )
+        ON CONFLICT (habit_id, record_date) DO NOTHING
+        RETURNING habit_id, record_date
+    )
+    SELECT h.user_id, inserted.habit_id, inserted.record_date
+    FROM inserted JOIN habits h ON h.id = inserted.habit_id
+""")
+
+def auto_fail_logs(db: Session, user_ids: List[int], start_date: date, end_date: date) -> int:
+    if not user_ids or start_date > end_date:
+        return 0
+
+    crud_user_daily_stats.lock_users(db, user_ids)
+    rows = db.execute(AUTO_FAIL_SQL, {
+        "user_ids": list(user_ids), "start_date": start_date, "end_date": end_date
+    }).all()
+
+    # Cập nhật bảng thống kê ngày + streak của các habit vừa bị điền FAILED (cùng transaction)
+    crud_user_daily_stats.refresh_pairs(db, [(row.user_id, row.record_date) for row in rows])
+    crud_habit_streak.recompute_many(db, [row.habit_id for row in rows])
+    db.commit()
+    return len(rows)
+
 # 2. Lấy lịch sử log của 1 Habit
+def query_logs_by_habit(
+    db: Session,
+    habit_id: int,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None
+):
+    query = db.query(models.HabitLog).filter(models.HabitLog.habit_id == habit_id)
+    
+    # Logic lọc ngày
+    if from_date:
+        query = query.filter(models.HabitLog.record_date >= from_date)
+    if to_date:
+        query = query.filter(models.HabitLog.record_date <= to_date)
+    return query
+
+# after: khóa (record_date, id) của log cuối trang trước (cursor), có thì bỏ qua skip
 def get_logs_by_habit(
     db: Session, 
     habit_id: int, 
     skip: int = 0, 
     limit: int = 30, 
     from_date: Optional[date] = None, # <--- Thêm
-    to_date: Optional[date] = None    # <--- Thêm
+    to_date: Optional[date] = None,   # <--- Thêm
+    after: Optional[tuple] = None
 ):
-    query = db.query(models.HabitLog).filter(models.HabitLog.habit_id == habit_id)
-    
-    # Logic lọc ngày
+    query = query_logs_by_habit(db, habit_id, from_date, to_date)
+    return pagination.keyset_page(
+        query, [models.HabitLog.record_date, models.HabitLog.id], after, skip, limit
+    ).all()
+
+# 3. Lấy tất cả Log của 1 User (Kèm tên Habit + đơn vị)
+# Chỉ chọn đúng các cột cần trả về (JOIN habits 1 lần) -> 1 câu query, không lazy-load log.habit từng dòng
+def query_logs_by_user(
+    db: Session,
+    user_id: int,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    habit_id: Optional[int] = None
+):
+    query = db.query(
+        models.HabitLog.id,
+        models.HabitLog.habit_id,
+        models.HabitLog.value,
+        models.Habit.unit,
+        models.HabitLog.status,
+        models.HabitLog.record_date,
+        models.HabitLog.created_at,
+        models.Habit.name.label("habit_name")
+    ).join(models.Habit, models.HabitLog.habit_id == models.Habit.id)\
+     .filter(models.Habit.user_id == user_id)
+
     if from_date:
         query = query.filter(models.HabitLog.record_date >= from_date)
     if to_date:
         query = query.filter(models.HabitLog.record_date <= to_date)
-        
-    return query.order_by(desc(models.HabitLog.record_date))\
-                .offset(skip).limit(limit).all()
-
-# 3. Lấy tất cả Log của 1 User (Kèm tên Habit)
-def get_all_logs_by_user(db: Session, user_id: int, skip: int = 0, limit: int = 100):
-    # Join bảng để lấy tên Habit
-    results = db.query(models.HabitLog, models.Habit.name)\
-        .join(models.Habit, models.HabitLog.habit_id == models.Habit.id)\
-        .filter(models.Habit.user_id == user_id)\
-        .order_by(desc(models.HabitLog.record_date))\
-        .offset(skip).limit(limit).all()
+    if habit_id:
+        query = query.filter(models.HabitLog.habit_id == habit_id)
+    return query
 
-    # Map sang Dictionary có chứa habit_name để khớp Schema mới
-    final_list = []
-    for log, h_name in results:
-        # Convert object log sang dict rồi thêm tên habit vào
-        log_dict = log.__dict__.copy() # Copy dữ liệu từ object SQLAlchemy
-        log_dict['habit_name'] = h_name
-        final_list.append(log_dict)
-        
-    return final_list
+# Trả về list dict đúng dạng HabitLogUserResponse, mới nhất trước theo (record_date, id)
+# Không sắp xếp cả lịch sử của user: với từng habit của user (LATERAL) chỉ đọc tối đa skip + limit log mới nhất
+# bằng index (habit_id, record_date) (đi lùi, dừng sớm), rồi gộp + sắp xếp <= số habit x (skip + limit) dòng
+# (mỗi habit 1 log / ngày nên thứ tự record_date trong 1 habit đã là thứ tự (record_date, id))
+def get_all_logs_by_user(
+    db: Session,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    habit_id: Optional[int] = None,
+    after: Optional[tuple] = None
+):
+    per_habit = select(
+        models.HabitLog.id,
+        models.HabitLog.habit_id,
+        models.HabitLog.value,
+        models.HabitLog.status,
+        models.HabitLog.record_date,
+        models.HabitLog.created_at
+    ).where(models.HabitLog.habit_id == models.Habit.id)
+    if from_date:
+        per_habit = per_habit.where(models.HabitLog.record_date >= from_date)
+    if to_date:
+        per_habit = per_habit.where(models.HabitLog.record_date <= to_date)
+    if after is not None:
+        # record_date <= cursor: điều kiện index dùng được; so sánh cả cặp để bỏ đúng các log đã trả
+        per_habit = per_habit.where(
+            models.HabitLog.record_date <= after[0],
+            tuple_(models.HabitLog.record_date, models.HabitLog.id) < tuple_(*after)
+        )
+    per_habit = per_habit.order_by(models.HabitLog.record_date.desc())\
+        .limit(limit if after is not None else skip + limit)\
+        .lateral("per_habit")
+
+    query = db.query(
+        per_habit.c.id,
+        per_habit.c.habit_id,
+        per_habit.c.value,
+        models.Habit.unit,
+        per_habit.c.status,
+        per_habit.c.record_date,
+        per_habit.c.created_at,
+        models.Habit.name.label("habit_name")
+    ).select_from(models.Habit)\
+     .join(per_habit, true())\
+     .filter(models.Habit.user_id == user_id)
+    if habit_id:
+        query = query.filter(models.Habit.id == habit_id)
 
-# 4. [ADMIN] Lấy tất cả (Giữ nguyên code của bạn, rất tốt)
-def get_all_logs_for_admin(db: Session, skip: int = 0, limit: int = 100):
-    results = db.query(models.HabitLog, models.Habit.name, models.User.full_name)\
+    # Cursor đã lọc bên trong LATERAL -> bên ngoài chỉ sắp xếp + OFFSET / LIMIT
+    rows = pagination.keyset_page(query, [per_habit.c.record_date, per_habit.c.id], None, 0 if after else skip, limit).all()
+    return [row._asdict() for row in rows]
+
+# Đọc toàn bộ log của user theo từng lô bằng server-side cursor (yield_per -> stream_results)
+# Bộ nhớ chỉ giữ 1 lô tại 1 thời điểm dù lịch sử dài bao nhiêu. Cũ nhất trước theo (record_date, id)
+def stream_logs_by_user(
+    db: Session,
+    user_id: int,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    habit_id: Optional[int] = None,
+    batch_size: int = 1000
+):
+    query = query_logs_by_user(db, user_id, from_date, to_date, habit_id)\
+        .order_by(models.HabitLog.record_date, models.HabitLog.id)\
+        .yield_per(batch_size)
+    for row in query:
+        yield row._asdict()
+
+# 4. [ADMIN] Lấy tất cả, sắp xếp mới nhất trước theo (record_date, id) để các trang ổn định
+def get_all_logs_for_admin(db: Session, skip: int = 0, limit: int = 100, after: Optional[tuple] = None):
+    query = db.query(models.HabitLog, models.Habit.name, models.User.full_name)\
         .join(models.Habit, models.HabitLog.habit_id == models.Habit.id)\
-        .join(models.User, models.Habit.user_id == models.User.id)\
-        .offset(skip).limit(limit).all()
+        .join(models.User, models.Habit.user_id == models.User.id)
+    results = pagination.keyset_page(
+        query, [models.HabitLog.record_date, models.HabitLog.id], after, skip, limit
+    ).all()
 
     final_list = []
     for log, h_name, u_name in results:
@@ -99,11 +265,27 @@ def update_habit_log(db: Session, log_id: int, log_update: schemas.HabitLogUpdat
     if not db_log:
         return None
     
+    # Ngày cũ và ngày mới (nếu đổi ngày / đổi habit) đều phải tính lại thống kê
+    touched = {(crud_user_daily_stats.lock_user_by_habit(db, db_log.habit_id), db_log.record_date)}
+    old_habit_id, old_record_date = db_log.habit_id, db_log.record_date
+
     update_data = log_update.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_log, key, value)
 
     db.add(db_log)
+    db.flush()
+    touched.add((crud_user_daily_stats.lock_user_by_habit(db, db_log.habit_id), db_log.record_date))
+    for user_id, record_date in touched:
+        crud_user_daily_stats.refresh_days(db, user_id, [record_date])
+
+    # Sửa log của ngày mới nhất (cùng habit, cùng ngày) -> cập nhật streak tại chỗ; còn lại là sửa quá khứ -> tính lại
+    if db_log.habit_id == old_habit_id and db_log.record_date == old_record_date:
+        crud_habit_streak.apply_check_ins(db, db_log.habit_id, [(db_log.record_date, db_log.status, False)])
+    else:
+        crud_habit_streak.recompute_by_id(db, old_habit_id)
+        if db_log.habit_id != old_habit_id:
+            crud_habit_streak.recompute_by_id(db, db_log.habit_id)
     db.commit()
     db.refresh(db_log)
     return db_log
@@ -112,13 +294,24 @@ def update_habit_log(db: Session, log_id: int, log_update: schemas.HabitLogUpdat
 def delete_habit_log(db: Session, log_id: int):
     db_log = get_log_by_id(db, log_id)
     if db_log:
+        user_id = crud_user_daily_stats.lock_user_by_habit(db, db_log.habit_id)
         db.delete(db_log)
+        db.flush()
+        crud_user_daily_stats.refresh_days(db, user_id, [db_log.record_date])
+        # Không lưu streak của các ngày trước ngày mới nhất -> xóa log nào cũng phải tính lại
+        crud_habit_streak.recompute_by_id(db, db_log.habit_id)
         db.commit()
         return db_log # Trả về log đã xóa
     return None
 
 # Xoa tất cả log liên quan đến 1 habit (Dùng khi xóa habit)
 def delete_logs_by_habit(db: Session, habit_id: int):
+    habit = db.query(models.Habit).filter(models.Habit.id == habit_id).first()
+    if habit:
+        crud_user_daily_stats.lock_user(db, habit.user_id)
     db.query(models.HabitLog).filter(models.HabitLog.habit_id == habit_id).delete()
+    if habit:
+        crud_user_daily_stats.refresh_from(db, habit.user_id, habit.created_at.date())
+        crud_habit_streak.recompute(db, habit)
     db.commit()
 
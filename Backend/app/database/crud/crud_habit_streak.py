@@ -0,0 +1,147 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import select, text
+from app.database import models
+from app.core import logic
+from typing import List, Optional, Tuple
+from datetime import date, timedelta
+
+# Streak của habit được lưu sẵn trên bảng habits (streak_current / streak_base / streak_longest / streak_last_date / log_count)
+# Check-in ngày mới nhất (hoặc sửa log của ngày mới nhất) chỉ cập nhật vài cột, không đọc lại log
+# Chỉ khi ghi / sửa / xóa log ở ngày QUÁ KHỨ mới tính lại toàn bộ (recompute)
+# Các hàm ở đây không commit: gọi trong transaction ghi log (đã giữ khóa user)
+
+# Tính trạng thái streak từ toàn bộ log (gaps-and-islands):
+# - island: chuỗi ngày liên tiếp có log (record_date - row_number không đổi)
+# - seg: trong 1 island, mỗi log FAILED mở 1 đoạn mới (streak về 0)
+# - streak tại 1 ngày = số log COMPLETED từ đầu đoạn tới ngày đó (PARTIAL / SKIPPED là cầu nối: không cộng, không gãy)
+STREAK_STATE_SQL = """
+    WITH islands AS (
+        SELECT habit_id, record_date, status,
+               record_date - CAST(row_number() OVER (PARTITION BY habit_id ORDER BY record_date) AS integer) AS island
+        FROM habit_logs
+        WHERE {habit_filter}
+    ), segs AS (
+        SELECT *,
+               count(*) FILTER (WHERE status = 'FAILED')
+                   OVER (PARTITION BY habit_id, island ORDER BY record_date) AS seg
+        FROM islands
+    ), streaks AS (
+        SELECT habit_id, record_date,
+               count(*) FILTER (WHERE status = 'COMPLETED')
+                   OVER (PARTITION BY habit_id, island, seg ORDER BY record_date) AS streak
+        FROM segs
+    ), with_prev AS (
+        SELECT *,
+               lag(record_date) OVER w AS prev_date,
+               lag(streak) OVER w AS prev_streak
+        FROM streaks
+        WINDOW w AS (PARTITION BY habit_id ORDER BY record_date)
+    )
+    SELECT habit_id,
+           CAST((array_agg(streak ORDER BY record_date DESC))[1] AS integer) AS streak_current,
+           CAST((array_agg(CASE WHEN prev_date = record_date - 1 THEN prev_streak ELSE 0 END
+                           ORDER BY record_date DESC))[1] AS integer) AS streak_base,
+           CAST(max(streak) AS integer) AS streak_longest,
+           max(record_date) AS streak_last_date,
+           CAST(count(*) AS integer) AS log_count
+    FROM with_prev
+    GROUP BY habit_id
+"""
+
+HABIT_STREAK_STATE_SQL = text(STREAK_STATE_SQL.format(habit_filter="habit_id = :habit_id"))
+
+# Streak của tất cả habit của 1 user trong 1 câu query (habit chưa có log -> 0)
+# Streak hiện tại = 0 nếu log mới nhất trước hôm qua (cùng luật với logic.current_streak)
+USER_STREAKS_SQL = text(f"""
+    WITH state AS ({STREAK_STATE_SQL.format(habit_filter="habit_id IN (SELECT id FROM habits WHERE user_id = :user_id)")})
+    SELECT h.id AS habit_id,
+           CASE WHEN state.streak_last_date >= :yesterday THEN state.streak_current ELSE 0 END AS streak,
+           coalesce(state.streak_longest, 0) AS longest_streak,
+           state.streak_last_date AS last_log_date,
+           coalesce(state.log_count, 0) AS total_logs
+    FROM habits h
+    LEFT JOIN state ON state.habit_id = h.id
+    WHERE h.user_id = :user_id
+    ORDER BY h.id
+""")
+
+# Tính lại streak của nhiều habit bằng 1 câu UPDATE (job auto-fail); habit trong danh sách phải có log
+RECOMPUTE_MANY_SQL = text(f"""
+    UPDATE habits h
+    SET streak_current = s.streak_current,
+        streak_base = s.streak_base,
+        streak_longest = s.streak_longest,
+        streak_last_date = s.streak_last_date,
+        log_count = s.log_count
+    FROM ({STREAK_STATE_SQL.format(habit_filter="habit_id = ANY(CAST(:habit_ids AS integer[]))")}) s
+    WHERE h.id = s.habit_id
+""")
+
+STREAK_FIELDS = ("streak_current", "streak_base", "streak_longest", "streak_last_date", "log_count")
+
+
+# Tính lại toàn bộ streak của 1 habit từ log (1 lần quét index (habit_id, record_date))
+def recompute(db: Session, habit: models.Habit):
+    row = db.execute(HABIT_STREAK_STATE_SQL, {"habit_id": habit.id}).mappings().first()
+    for field in STREAK_FIELDS:
+        setattr(habit, field, row[field] if row else (None if field == "streak_last_date" else 0))
+
+# Đọc lại habit từ DB và khóa dòng (FOR UPDATE), bỏ qua bản cũ trong identity map:
+# router đã nạp habit TRƯỚC khi lấy khóa user -> các cột streak trên object đó có thể đã bị request khác đổi
+def _get_habit_for_update(db: Session, habit_id: int) -> Optional[models.Habit]:
+    return db.execute(
+        select(models.Habit).where(models.Habit.id == habit_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    ).scalar_one_or_none()
+
+def recompute_by_id(db: Session, habit_id: int):
+    habit = _get_habit_for_update(db, habit_id)
+    if habit:
+        recompute(db, habit)
+
+def recompute_many(db: Session, habit_ids: List[int]):
+    if habit_ids:
+        db.execute(RECOMPUTE_MANY_SQL, {"habit_ids": sorted(set(habit_ids))})
+
+# Streak của tất cả habit của user (tính thẳng từ habit_logs, không dựa vào cột lưu sẵn)
+def get_user_streaks(db: Session, user_id: int, today: Optional[date] = None):
+    today = today or date.today()
+    return db.execute(USER_STREAKS_SQL, {"user_id": user_id, "yesterday": today - timedelta(days=1)}).mappings().all()
+
+
+# Cập nhật streak sau khi upsert các log của 1 habit
+# logs: [(record_date, status, inserted)] - inserted = True nếu là log mới (không phải ghi đè)
+def apply_check_ins(db: Session, habit_id: int, logs: List[Tuple[date, str, bool]]):
+    if not logs:
+        return
+    habit = _get_habit_for_update(db, habit_id)
+    if not habit:
+        return
+
+    logs = sorted(logs, key=lambda item: item[0])
+    # Có log trước ngày mới nhất -> lịch sử thay đổi, tính lại toàn bộ
+    if habit.streak_last_date is not None and logs[0][0] < habit.streak_last_date:
+        recompute(db, habit)
+        return
+
+    for record_date, status, inserted in logs:
+        if inserted:
+            habit.log_count += 1
+
+        last_date = habit.streak_last_date
+        if last_date is None or record_date > last_date:
+            # Ngày mới: nối tiếp nếu liền ngay sau ngày mới nhất, ngược lại bắt đầu chuỗi mới
+            habit.streak_base = habit.streak_current if last_date is not None and record_date == last_date + timedelta(days=1) else 0
+            habit.streak_last_date = record_date
+            habit.streak_current = logic.next_streak(habit.streak_base, status)
+        else:
+            # Ghi đè log của chính ngày mới nhất
+            new_streak = logic.next_streak(habit.streak_base, status)
+            if new_streak < habit.streak_current and habit.streak_current == habit.streak_longest:
+                # Streak dài nhất có thể chính là chuỗi vừa bị giảm -> không biết giá trị cũ, tính lại
+                recompute(db, habit)
+                return
+            habit.streak_current = new_streak
+
+        habit.streak_longest = max(habit.streak_longest, habit.streak_current)
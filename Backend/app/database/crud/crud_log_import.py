@@ -0,0 +1,180 @@
+import csv
+from datetime import date
+from typing import Iterable, Iterator, TextIO
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.database.crud import crud_user_daily_stats, crud_habit_streak
+from app.schemas import schemas
+
+# Import log hàng loạt từ file CSV (cột bắt buộc: habit_id, record_date, status; tùy chọn: value)
+# File xuất từ /logs/user/export?format=csv import lại được luôn (các cột thừa bị bỏ qua)
+# Các bước (1 transaction):
+#   1. Đọc file theo từng dòng, kiểm tra định dạng, đẩy thẳng vào bảng tạm bằng COPY (không giữ cả file trong RAM)
+#   2. Kiểm tra quyền sở hữu habit / ngày hợp lệ cho TẤT CẢ dòng bằng 1 câu UPDATE ... JOIN habits
+#   3. Gộp vào habit_logs bằng 1 câu INSERT ... ON CONFLICT DO UPDATE (cùng luật với check-in: mỗi habit 1 log / ngày)
+
+MAX_REJECTED_LINES = 50  # Số dòng lỗi trả chi tiết về cho client (còn lại chỉ đếm)
+
+REASON_INVALID = "Dòng không đúng định dạng (habit_id, record_date, status, value)"
+REASON_HABIT = "Thói quen không tồn tại hoặc không thuộc về bạn"
+REASON_FUTURE = "Không thể check-in cho tương lai"
+REASON_BEFORE_CREATED = "Ngày trước ngày tạo thói quen"
+REASON_DUPLICATE = "Trùng (habit_id, record_date) với dòng phía sau trong file"
+
+VALID_STATUSES = {status.value for status in schemas.HabitLogStatus}
+
+CREATE_STAGING_SQL = text("""
+    CREATE TEMP TABLE habit_log_import (
+        line_no integer PRIMARY KEY,
+        habit_id integer NOT NULL,
+        record_date date NOT NULL,
+        status text NOT NULL,
+        value double precision,
+        reject_reason text
+    ) ON COMMIT DROP
+""")
+
+# Đánh dấu lý do loại cho các dòng không hợp lệ (trùng ngày trong file: dòng sau cùng thắng)
+VALIDATE_STAGING_SQL = text("""
+    UPDATE habit_log_import s
+    SET reject_reason = checked.reason
+    FROM (
+        SELECT s.line_no,
+               CASE
+                   WHEN h.id IS NULL THEN :reason_habit
+                   WHEN s.record_date > :today THEN :reason_future
+                   WHEN s.record_date < CAST(h.created_at AS date) THEN :reason_before_created
+                   WHEN row_number() OVER (PARTITION BY s.habit_id, s.record_date ORDER BY s.line_no DESC) > 1
+                       THEN :reason_duplicate
+               END AS reason
+        FROM habit_log_import s
+        LEFT JOIN habits h ON h.id = s.habit_id AND h.user_id = :user_id
+    ) checked
+    WHERE checked.line_no = s.line_no AND checked.reason IS NOT NULL
+""")
+
+MERGE_STAGING_SQL = text("""
+    WITH merged AS (
+        INSERT INTO habit_logs (habit_id, record_date, status, value)
+        SELECT habit_id, record_date, status, value
+        FROM habit_log_import
+        WHERE reject_reason IS NULL
+        ON CONFLICT (habit_id, record_date) DO UPDATE
+            SET status = EXCLUDED.status, value = EXCLUDED.value
+        RETURNING habit_id, record_date, (xmax = 0) AS inserted
+    )
+    SELECT count(*) FILTER (WHERE inserted) AS inserted,
+           count(*) FILTER (WHERE NOT inserted) AS updated,
+           coalesce(array_agg(DISTINCT habit_id), '{}') AS habit_ids,
+           coalesce(array_agg(DISTINCT record_date), '{}') AS record_dates
+    FROM merged
+""")
+
+
+# Bọc 1 iterator chuỗi thành file-like cho COPY FROM STDIN (psycopg2 gọi read(size) nhiều lần)
+class _LineStream:
+    def __init__(self, lines: Iterable[str]):
+        self._lines = iter(lines)
+        self._buffer = ""
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._buffer) < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer += line
+        if size < 0:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+    def readline(self, size: int = -1) -> str:
+        return self.read(size)
+
+
+def import_logs_from_csv(db: Session, user_id: int, csv_file: TextIO, today: date) -> dict:
+    summary = {"total_rows": 0, "inserted": 0, "updated": 0, "rejected": 0,
+               "rejected_by_reason": {}, "rejected_lines": []}
+
+    # Dòng sai định dạng (phát hiện khi đọc file, không vào bảng tạm)
+    def reject(line_no: int, reason: str):
+        summary["rejected"] += 1
+        summary["rejected_by_reason"][reason] = summary["rejected_by_reason"].get(reason, 0) + 1
+        if len(summary["rejected_lines"]) < MAX_REJECTED_LINES:
+            summary["rejected_lines"].append({"line": line_no, "reason": reason})
+
+    # Kiểm tra dòng tiêu đề trước khi COPY (lỗi ném ra bên trong COPY sẽ bị psycopg2 bọc lại)
+    reader = csv.DictReader(csv_file)
+    try:
+        fieldnames = reader.fieldnames
+    except csv.Error as e:
+        raise ValueError(f"dòng 1: {e}")
+    missing = {"habit_id", "record_date", "status"} - set(fieldnames or [])
+    if missing:
+        raise ValueError(f"File thiếu cột: {', '.join(sorted(missing))}")
+
+    # File hỏng giữa chừng (sai mã UTF-8, ô quá dài...): ghi lại rồi dừng đọc, ném lỗi sau khi COPY trả về
+    read_errors = []
+
+    # 1. Đọc + kiểm tra định dạng từng dòng, sinh dòng CSV chuẩn cho COPY
+    def staging_lines() -> Iterator[str]:
+        try:
+            for row in reader:
+                summary["total_rows"] += 1
+                try:
+                    habit_id = int(row["habit_id"])
+                    record_date = date.fromisoformat(row["record_date"].strip())
+                    status = row["status"].strip().upper()
+                    if status not in VALID_STATUSES:
+                        raise ValueError(status)
+                    raw_value = (row.get("value") or "").strip()
+                    value = repr(float(raw_value)) if raw_value else ""
+                except (TypeError, ValueError, AttributeError):
+                    reject(reader.line_num, REASON_INVALID)
+                    continue
+                yield f"{reader.line_num},{habit_id},{record_date.isoformat()},{status},{value}\n"
+        except csv.Error as e:
+            read_errors.append(f"dòng {reader.line_num + 1}: {e}")
+        except UnicodeDecodeError as e:
+            # File được giải mã theo từng khối nên không biết chính xác dòng lỗi
+            read_errors.append(str(e))
+
+    db.execute(CREATE_STAGING_SQL)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            "COPY habit_log_import (line_no, habit_id, record_date, status, value) FROM STDIN WITH (FORMAT csv)",
+            _LineStream(staging_lines())
+        )
+    finally:
+        cursor.close()
+    if read_errors:
+        raise ValueError(read_errors[0])
+
+    # 2. Kiểm tra quyền sở hữu + ngày của tất cả dòng (giữ khóa ghi của user tới hết transaction)
+    crud_user_daily_stats.lock_user(db, user_id)
+    db.execute(VALIDATE_STAGING_SQL, {
+        "user_id": user_id, "today": today,
+        "reason_habit": REASON_HABIT, "reason_future": REASON_FUTURE,
+        "reason_before_created": REASON_BEFORE_CREATED, "reason_duplicate": REASON_DUPLICATE
+    })
+    for row in db.execute(text("""
+        SELECT reject_reason, count(*) AS total FROM habit_log_import
+        WHERE reject_reason IS NOT NULL GROUP BY reject_reason
+    """)):
+        summary["rejected"] += row.total
+        summary["rejected_by_reason"][row.reject_reason] = row.total
+    for row in db.execute(text("""
+        SELECT line_no, reject_reason FROM habit_log_import
+        WHERE reject_reason IS NOT NULL ORDER BY line_no LIMIT :max_lines
+    """), {"max_lines": MAX_REJECTED_LINES}):
+        summary["rejected_lines"].append({"line": row.line_no, "reason": row.reject_reason})
+    summary["rejected_lines"] = sorted(summary["rejected_lines"], key=lambda item: item["line"])[:MAX_REJECTED_LINES]
+
+    # 3. Gộp vào habit_logs, cập nhật thống kê ngày + streak trong cùng transaction
+    merged = db.execute(MERGE_STAGING_SQL).one()
+    summary["inserted"], summary["updated"] = merged.inserted, merged.updated
+    crud_user_daily_stats.refresh_days(db, user_id, list(merged.record_dates))
+    crud_habit_streak.recompute_many(db, list(merged.habit_ids))
+    db.commit()
+    return summary
@@ -1,6 +1,23 @@
+import hashlib
+from datetime import date, datetime, timedelta
+from typing import Optional
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from app.database import models
 from app.schemas import schemas
+from app.core import http_cache, invalidation
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+# Cache câu nói của ngày: key = (ngày, user_id | None), giữ tới hết ngày
+# Thêm / sửa / xóa quote -> http_cache.bump_version (trước commit) -> kênh invalidation.REFERENCE xóa cache ở mọi worker
+daily_quote_cache = TTLCache(maxsize=settings.DAILY_QUOTE_CACHE_SIZE, ttl=24 * 60 * 60)
+
+def _on_reference_changed(resource):
+    if resource is None or resource == http_cache.MOTIVATION_QUOTES:
+        daily_quote_cache.clear()
+
+invalidation.subscribe(invalidation.REFERENCE, _on_reference_changed)
 
 # Tạo Motivation Quote mới
 def create_motivation_quote(db: Session, quote: schemas.MotivationQuoteCreate):
@@ -10,6 +27,7 @@ def create_motivation_quote(db: Session, quote: schemas.MotivationQuoteCreate):
         )
 
     db.add(db_quote)
+    http_cache.bump_version(db, http_cache.MOTIVATION_QUOTES)
     db.commit()
     db.refresh(db_quote)
 
@@ -21,6 +39,38 @@ def get_all_motivation_quotes(db: Session):
     return db.query(models.MotivationQuote).order_by(models.MotivationQuote.id).all()
 
 
+# Câu nói của ngày (cố định trong 1 ngày, user_id != None -> mỗi user 1 câu riêng)
+# Không ORDER BY random() / không load cả bảng: băm (ngày, user) ra 1 id trong [min(id), max(id)]
+# rồi lấy quote đầu tiên có id >= giá trị đó (min / max / tìm id đều đi thẳng vào primary key)
+def get_daily_quote(db: Session, day: date, user_id: Optional[int] = None):
+    key = (day, user_id)
+    cached = daily_quote_cache.get(key)
+    if cached is not None:
+        return cached
+    generation = daily_quote_cache.generation
+
+    min_id, max_id = db.query(func.min(models.MotivationQuote.id), func.max(models.MotivationQuote.id)).one()
+    if min_id is None:
+        return None
+    digest = hashlib.sha256(f"{day.isoformat()}:{user_id}".encode()).digest()
+    target_id = min_id + int.from_bytes(digest[:8], "big") % (max_id - min_id + 1)
+    db_quote = (db.query(models.MotivationQuote)
+                .filter(models.MotivationQuote.id >= target_id)
+                .order_by(models.MotivationQuote.id)
+                .first())
+    if db_quote is None:
+        # Quote id lớn nhất vừa bị xóa sau khi đọc min / max -> quay vòng về quote đầu tiên
+        db_quote = db.query(models.MotivationQuote).order_by(models.MotivationQuote.id).first()
+        if db_quote is None:
+            return None
+
+    quote = schemas.MotivationQuoteResponse.model_validate(db_quote)
+    # Hết hạn lúc nửa đêm (ngày mới đã là key khác, TTL chỉ để giải phóng bộ nhớ)
+    seconds_left = (datetime.combine(day + timedelta(days=1), datetime.min.time()) - datetime.now()).total_seconds()
+    daily_quote_cache.set(key, quote, ttl=max(seconds_left, 1), generation=generation)
+    return quote
+
+
 # Lấy Motivation Quote theo ID
 def get_motivation_quote_by_id(db: Session, quote_id: int):
     return db.query(models.MotivationQuote).filter(models.MotivationQuote.id == quote_id).first()
@@ -38,6 +88,7 @@ def update_motivation_quote(db: Session, quote_id: int, quote_update: schemas.Mo
         setattr(db_quote, key, value)
         
     db.add(db_quote)
+    http_cache.bump_version(db, http_cache.MOTIVATION_QUOTES)
     db.commit()
     db.refresh(db_quote)
 
@@ -48,6 +99,7 @@ def delete_motivation_quote(db: Session, quote_id: int):
     db_quote = db.query(models.MotivationQuote).filter(models.MotivationQuote.id == quote_id).first()
     if db_quote:
         db.delete(db_quote)
+        http_cache.bump_version(db, http_cache.MOTIVATION_QUOTES)
         db.commit()
     return db_quote
 
@@ -1,6 +1,19 @@
 from sqlalchemy.orm import Session
 from app.database import models
 from app.schemas import schemas
+from app.core import http_cache, invalidation
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+# Cache đọc bản chụp schemas.RoleResponse theo id (bảng rất nhỏ, màn hình admin tra tên quyền liên tục)
+# Các hàm ghi bên dưới gọi http_cache.bump_version trước commit -> sau commit kênh invalidation.REFERENCE xóa cache ở mọi worker
+role_cache = TTLCache(maxsize=settings.REFERENCE_CACHE_SIZE, ttl=settings.REFERENCE_CACHE_TTL)
+
+def _on_reference_changed(resource):
+    if resource is None or resource == http_cache.ROLES:
+        role_cache.clear()
+
+invalidation.subscribe(invalidation.REFERENCE, _on_reference_changed)
 
 # Tạo Role mới
 def create_role(db: Session, role: schemas.RoleCreate):
@@ -10,6 +23,7 @@ def create_role(db: Session, role: schemas.RoleCreate):
         )
 
     db.add(db_role)
+    http_cache.bump_version(db, http_cache.ROLES)
     db.commit()
     db.refresh(db_role)
 
@@ -21,13 +35,26 @@ def get_roles(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.Role).offset(skip).limit(limit).all()
 
 
-# Lấy chi tiết 1 cái (Read One)
+# Lấy chi tiết 1 cái (Read One) - bản chụp từ cache, muốn sửa / xóa thì dùng _get_role_row
 def get_role(db: Session, role_id: int):
+    cached = role_cache.get(role_id)
+    if cached is not None:
+        return cached
+    generation = role_cache.generation
+    db_role = _get_role_row(db, role_id)
+    if db_role is None:
+        return None
+    role = schemas.RoleResponse.model_validate(db_role)
+    role_cache.set(role_id, role, generation=generation)
+    return role
+
+# Bản ghi ORM thật (dùng cho cập nhật / xóa)
+def _get_role_row(db: Session, role_id: int):
     return db.query(models.Role).filter(models.Role.id == role_id).first()
 
 # Cập nhật Role
 def update_role(db: Session, role_id: int, role_update: schemas.RoleUpdate):
-    db_role = get_role(db, role_id)
+    db_role = _get_role_row(db, role_id)
     # Nếu không tìm thấy role thì trả về None
     if not db_role:
         return None
@@ -41,6 +68,7 @@ def update_role(db: Session, role_id: int, role_update: schemas.RoleUpdate):
         setattr(db_role, key, value)
 
     db.add(db_role)
+    http_cache.bump_version(db, http_cache.ROLES)
     db.commit()
     db.refresh(db_role)
     return db_role
@@ -48,10 +76,11 @@ def update_role(db: Session, role_id: int, role_update: schemas.RoleUpdate):
 
 # Xóa Role
 def delete_role(db: Session, role_id: int):
-    db_role = get_role(db, role_id)
+    db_role = _get_role_row(db, role_id)
     if not db_role:
         return None
 
     db.delete(db_role)
+    http_cache.bump_version(db, http_cache.ROLES)
     db.commit()
     return db_role
\ No newline at end of file
@@ -1,7 +1,9 @@
 from sqlalchemy.orm import Session
 from app.database import models
+from app.database.crud import crud_analytics
 from app.schemas import schemas
-from app.core import utils
+from app.core import utils, pagination
+from typing import Optional
 
 # hàm lấy User theo username (tên đăng nhập) tránh trùng khi đăng ký
 def get_user_by_username(db: Session, username: str):
@@ -53,8 +55,11 @@ def create_user_by_admin(db:Session, user: schemas.UserCreatedByAdmin):
     return db_user
 
 # Hàm lấy danh sách các User (có phân trang)
-def get_users(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.User).offset(skip).limit(limit).all()
+def get_users(db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None):
+    after = (after_id,) if after_id is not None else None
+    return pagination.keyset_page(
+        db.query(models.User), [models.User.id], after, skip, limit, descending=False
+    ).all()
 
 # Lấy thông tin user theo ID
 def get_user_by_id(db: Session, user_id: int):
@@ -65,5 +70,7 @@ def delete_user_by_id(db: Session, user_id:int):
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if user:
         db.delete(user)
+        # Habit + log của user bị xóa theo (cascade) -> thống kê admin của mọi kỳ phải tính lại
+        crud_analytics.mark_all_changed(db)
         db.commit()
     return user
\ No newline at end of file
@@ -0,0 +1,192 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from app.database import models
+from app.core import logic
+from app.database.crud import crud_analytics
+from typing import List, Optional, Tuple
+from datetime import date
+
+# Bảng user_daily_stats: mỗi dòng = 1 user x 1 ngày
+# scheduled = số habit có lịch ngày đó, completed/partial/skipped/failed = số log theo trạng thái của các habit đó
+# completed_unscheduled = số log COMPLETED của habit KHÔNG có lịch ngày đó (heatmap vẫn tính là đã hoàn thành)
+# Các hàm ghi log / habit gọi refresh_* TRONG CÙNG transaction (trước commit) để bảng luôn khớp dữ liệu gốc
+# (refresh_* cũng đánh dấu các ngày thay đổi để xóa cache /admin/analytics sau commit)
+
+# Khóa advisory theo user (giữ tới hết transaction): các lần ghi log của cùng 1 user chạy tuần tự,
+# nên lần tính lại sau luôn thấy log mà lần trước đã commit
+USER_WRITE_LOCK = 1
+
+
+def lock_user(db: Session, user_id: int):
+    db.execute(
+        text("SELECT pg_advisory_xact_lock(:lock_class, :user_id)"),
+        {"lock_class": USER_WRITE_LOCK, "user_id": user_id}
+    )
+
+# Khóa nhiều user cùng lúc, theo thứ tự id tăng dần để không deadlock với transaction khác
+def lock_users(db: Session, user_ids: List[int]):
+    db.execute(
+        text("""
+            SELECT count(pg_advisory_xact_lock(:lock_class, u.user_id))
+            FROM (SELECT DISTINCT unnest(CAST(:user_ids AS integer[])) AS user_id ORDER BY 1) u
+        """),
+        {"lock_class": USER_WRITE_LOCK, "user_ids": list(user_ids)}
+    )
+
+# Khóa user sở hữu habit và trả về user_id (None nếu habit không tồn tại)
+def lock_user_by_habit(db: Session, habit_id: int) -> Optional[int]:
+    row = db.execute(
+        text("""
+            SELECT h.user_id, pg_advisory_xact_lock(:lock_class, h.user_id)
+            FROM habits h WHERE h.id = :habit_id
+        """),
+        {"lock_class": USER_WRITE_LOCK, "habit_id": habit_id}
+    ).first()
+    return row.user_id if row else None
+
+
+# Câu SELECT tính lại từ dữ liệu gốc cho các cặp (user_id, day) mà CTE "days" trả về
+def _recompute_sql(days_cte: str) -> str:
+    scheduled = logic.scheduled_on_sql("h", "days.day")
+    return f"""
+        WITH days AS ({days_cte})
+        SELECT days.user_id, days.day,
+               count(h.id) FILTER (WHERE {scheduled}),
+               count(l.id) FILTER (WHERE {scheduled} AND l.status = 'COMPLETED'),
+               count(l.id) FILTER (WHERE {scheduled} AND l.status = 'PARTIAL'),
+               count(l.id) FILTER (WHERE {scheduled} AND l.status = 'SKIPPED'),
+               count(l.id) FILTER (WHERE {scheduled} AND l.status = 'FAILED'),
+               count(l.id) FILTER (WHERE NOT {scheduled} AND l.status = 'COMPLETED')
+        FROM days
+        LEFT JOIN habits h ON h.user_id = days.user_id
+        LEFT JOIN habit_logs l ON l.habit_id = h.id AND l.record_date = days.day
+        GROUP BY days.user_id, days.day
+    """
+
+def _upsert_sql(days_cte: str, on_conflict: str) -> str:
+    return f"""
+        INSERT INTO user_daily_stats (user_id, date, scheduled, completed, partial, skipped, failed, completed_unscheduled)
+        {_recompute_sql(days_cte)}
+        {on_conflict}
+    """
+
+_OVERWRITE = """
+    ON CONFLICT (user_id, date) DO UPDATE SET
+        scheduled = EXCLUDED.scheduled,
+        completed = EXCLUDED.completed,
+        partial = EXCLUDED.partial,
+        skipped = EXCLUDED.skipped,
+        failed = EXCLUDED.failed,
+        completed_unscheduled = EXCLUDED.completed_unscheduled
+"""
+
+REFRESH_DAYS_SQL = text(_upsert_sql(
+    "SELECT CAST(:user_id AS integer) AS user_id, d AS day FROM unnest(CAST(:days AS date[])) AS d",
+    _OVERWRITE
+))
+
+# Tính lại nhiều cặp (user_id, ngày) của nhiều user cùng lúc (job auto-fail)
+REFRESH_PAIRS_SQL = text(_upsert_sql(
+    "SELECT * FROM unnest(CAST(:user_ids AS integer[]), CAST(:days AS date[])) AS p (user_id, day)",
+    _OVERWRITE
+))
+
+# Chỉ tính lại các dòng ĐÃ CÓ từ from_date trở đi (khi lịch / danh sách habit thay đổi)
+REFRESH_FROM_SQL = text(_upsert_sql(
+    "SELECT user_id, date AS day FROM user_daily_stats WHERE user_id = :user_id AND date >= :from_date",
+    _OVERWRITE
+))
+
+# Dựng lại toàn bộ: mỗi user từ ngày tạo habit đầu tiên tới hôm nay
+REBUILD_SQL = text(_upsert_sql(
+    """
+    SELECT f.user_id, CAST(d AS date) AS day
+    FROM (
+        SELECT user_id, min(CAST(created_at AS date)) AS first_day
+        FROM habits
+        WHERE CAST(:user_id AS integer) IS NULL OR user_id = :user_id
+        GROUP BY user_id
+    ) f, generate_series(f.first_day, CURRENT_DATE, interval '1 day') AS d
+    """,
+    _OVERWRITE
+))
+
+
+# Tính lại các ngày cụ thể của 1 user (gọi sau khi ghi log, trước commit)
+def refresh_days(db: Session, user_id: int, days: List[date]):
+    if not days:
+        return
+    db.execute(REFRESH_DAYS_SQL, {"user_id": user_id, "days": sorted(set(days))})
+    crud_analytics.mark_days_changed(db, days)
+
+# Tính lại các cặp (user_id, ngày) của nhiều user (gọi trước commit, đã giữ khóa các user đó)
+def refresh_pairs(db: Session, pairs: List[Tuple[int, date]]):
+    if not pairs:
+        return
+    pairs = sorted(set(pairs))
+    db.execute(REFRESH_PAIRS_SQL, {"user_ids": [p[0] for p in pairs], "days": [p[1] for p in pairs]})
+    crud_analytics.mark_days_changed(db, [p[1] for p in pairs])
+
+# Tính lại các dòng đã có từ from_date (gọi khi tạo / xóa habit hoặc đổi frequency, trước commit)
+def refresh_from(db: Session, user_id: int, from_date: date):
+    db.execute(REFRESH_FROM_SQL, {"user_id": user_id, "from_date": from_date})
+    crud_analytics.mark_changed_from(db, from_date)
+
+
+# Đọc thống kê theo khoảng ngày (chỉ đọc, không ghi): dòng đã lưu + tính trực tiếp các ngày chưa có dòng
+# Dòng chỉ được tạo ở phía ghi (refresh_*, đã giữ khóa user) nên GET không bao giờ lưu 1 dòng cũ
+_MISSING_DAYS = """
+    SELECT CAST(:user_id AS integer) AS user_id, CAST(d AS date) AS day
+    FROM generate_series(CAST(:start_date AS date), CAST(:end_date AS date), interval '1 day') AS d
+    WHERE NOT EXISTS (
+        SELECT 1 FROM user_daily_stats s WHERE s.user_id = :user_id AND s.date = CAST(d AS date)
+    )
+"""
+READ_RANGE_SQL = text(f"""
+    SELECT s.date, s.scheduled, s.completed, s.partial, s.skipped, s.failed, s.completed_unscheduled
+    FROM user_daily_stats s
+    WHERE s.user_id = :user_id AND s.date BETWEEN :start_date AND :end_date
+    UNION ALL
+    SELECT r.date, r.scheduled, r.completed, r.partial, r.skipped, r.failed, r.completed_unscheduled
+    FROM ({_recompute_sql(_MISSING_DAYS)})
+         AS r (user_id, date, scheduled, completed, partial, skipped, failed, completed_unscheduled)
+    ORDER BY 1
+""")
+
+# Trả về đúng 1 dòng cho mỗi ngày trong khoảng, theo thứ tự ngày (1 câu SELECT)
+def get_user_daily_stats(db: Session, user_id: int, start_date: date, end_date: date):
+    return db.execute(
+        READ_RANGE_SQL, {"user_id": user_id, "start_date": start_date, "end_date": end_date}
+    ).all()
+
+
+# [CLI] Xóa và dựng lại toàn bộ bảng (hoặc của 1 user) từ habits + habit_logs
+def rebuild(db: Session, user_id: Optional[int] = None) -> int:
+    query = db.query(models.UserDailyStats)
+    if user_id is not None:
+        query = query.filter(models.UserDailyStats.user_id == user_id)
+    query.delete(synchronize_session=False)
+
+    rows = db.execute(REBUILD_SQL, {"user_id": user_id}).rowcount
+    db.commit()
+    return rows
+
+# [CLI] So sánh dữ liệu đang lưu với kết quả tính lại từ đầu, trả về các dòng bị lệch
+def find_mismatches(db: Session, user_id: Optional[int] = None):
+    recompute_sql = _recompute_sql("""
+        SELECT user_id, date AS day FROM user_daily_stats
+        WHERE CAST(:user_id AS integer) IS NULL OR user_id = :user_id
+    """)
+    return db.execute(text(f"""
+        SELECT s.user_id, s.date,
+               s.scheduled, s.completed, s.partial, s.skipped, s.failed, s.completed_unscheduled,
+               r.scheduled AS expected_scheduled, r.completed AS expected_completed,
+               r.partial AS expected_partial, r.skipped AS expected_skipped, r.failed AS expected_failed,
+               r.completed_unscheduled AS expected_completed_unscheduled
+        FROM user_daily_stats s
+        JOIN ({recompute_sql}) AS r (user_id, date, scheduled, completed, partial, skipped, failed, completed_unscheduled)
+          ON r.user_id = s.user_id AND r.date = s.date
+        WHERE (s.scheduled, s.completed, s.partial, s.skipped, s.failed, s.completed_unscheduled)
+              IS DISTINCT FROM (r.scheduled, r.completed, r.partial, r.skipped, r.failed, r.completed_unscheduled)
+        ORDER BY s.user_id, s.date
+    """), {"user_id": user_id}).all()
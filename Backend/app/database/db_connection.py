@@ -1,4 +1,6 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -22,4 +24,27 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# ====================== KẾT NỐI BẤT ĐỒNG BỘ (ASYNC) ======================
+# Đổi driver psycopg2 -> asyncpg trên cùng một chuỗi kết nối DATABASE_URL
+def _to_async_url(url: str):
+    async_url = make_url(url).set(drivername="postgresql+asyncpg")
+    # asyncpg không hiểu tham số 'sslmode' của libpq (VD: ?sslmode=require trên Render) -> đổi sang 'ssl'
+    query = dict(async_url.query)
+    if "sslmode" in query:
+        query["ssl"] = query.pop("sslmode")
+        async_url = async_url.set(query=query)
+    return async_url
+
+async_engine = create_async_engine(_to_async_url(SQLALCHEMY_DATABASE_URL))
+
+# expire_on_commit=False: object trả về sau commit vẫn đọc được thuộc tính mà không cần query lại
+# (AsyncSession không cho phép lazy load ngầm)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+# Dependency lấy AsyncSession cho các route 'async def' (không chiếm thread trong threadpool)
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,153 @@
+import argparse
+import asyncio
+import smtplib
+import time
+from datetime import datetime, timedelta, timezone
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Optional
+from app.database import db_connection
+from app.database.crud import crud_email_outbox
+from app.core.config import settings
+
+# Worker gửi email trong hàng đợi email_outbox
+# Mỗi lô: giữ chỗ tối đa EMAIL_OUTBOX_BATCH_SIZE tin (SKIP LOCKED) -> mở 1 kết nối SMTP (STARTTLS + login 1 lần)
+# -> gửi lần lượt, ghi trạng thái từng tin ngay sau khi gửi
+# Lỗi tạm thời: thử lại sau EMAIL_RETRY_BASE_SECONDS * 2^(lần thử - 1) giây; hết EMAIL_MAX_ATTEMPTS lần -> FAILED
+# Tin đã gửi / FAILED / chờ quá EMAIL_MAX_AGE_SECONDS đều bị xóa trắng body (mail quên mật khẩu chứa mật khẩu mới)
+# Chạy tay từ thư mục Backend:
+#   python -m app.database.email_outbox                 -> gửi hết tin đến hạn rồi thoát
+#   python -m app.database.email_outbox --loop          -> chạy liên tục (thay cho worker trong tiến trình API)
+# Thử với SMTP debug ở máy local (in mail ra màn hình, không gửi thật):
+#   python -m aiosmtpd -n -l localhost:1025   (hoặc python -m smtpd -n -c DebuggingServer localhost:1025 với Python <= 3.11)
+#   MAIL_SERVER=localhost MAIL_PORT=1025 MAIL_STARTTLS=False MAIL_USE_AUTH=False python -m app.database.email_outbox
+
+
+def _build_message(message: dict) -> MIMEMultipart:
+    mime = MIMEMultipart()
+    mime['From'] = settings.MAIL_FROM
+    mime['To'] = message["to_email"]
+    mime['Subject'] = message["subject"]
+    mime.attach(MIMEText(message["body"], 'plain'))
+    return mime
+
+# Mở 1 kết nối SMTP đã xác thực, dùng chung cho cả lô
+def _connect() -> smtplib.SMTP:
+    server = smtplib.SMTP(settings.MAIL_SERVER, settings.MAIL_PORT, timeout=settings.MAIL_TIMEOUT_SECONDS)
+    try:
+        if settings.MAIL_STARTTLS:
+            server.starttls()  # Bảo mật
+        if settings.MAIL_USE_AUTH:
+            server.login(settings.MAIL_USERNAME, settings.MAIL_PASSWORD)
+    except Exception:
+        server.close()
+        raise
+    return server
+
+# Lỗi 5xx (VD: địa chỉ nhận không tồn tại) gửi lại cũng vô ích
+def _is_permanent(error: Exception) -> bool:
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    return isinstance(error, smtplib.SMTPResponseException) and 500 <= error.smtp_code < 600
+
+def _retry_at(attempts: int) -> Optional[datetime]:
+    if attempts >= settings.EMAIL_MAX_ATTEMPTS:
+        return None
+    delay = min(settings.EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.EMAIL_RETRY_MAX_SECONDS)
+    return datetime.now(timezone.utc) + timedelta(seconds=delay)
+
+
+# Gửi 1 lô, trả về số tin đã giữ chỗ / gửi được / hẹn lại / thất bại hẳn / hết hạn (không nằm trong lô)
+def deliver_batch(batch_size: int = settings.EMAIL_OUTBOX_BATCH_SIZE) -> dict:
+    result = {"claimed": 0, "sent": 0, "retry": 0, "failed": 0, "expired": 0}
+    db = db_connection.SessionLocal()
+    try:
+        result["expired"] = crud_email_outbox.expire_stale(db, settings.EMAIL_MAX_AGE_SECONDS)  # Commit cùng claim_batch
+        messages = crud_email_outbox.claim_batch(db, batch_size, settings.EMAIL_SEND_LEASE_SECONDS)
+        result["claimed"] = len(messages)
+        if not messages:
+            return result
+
+        def give_up_or_retry(message: dict, error: Exception, permanent: bool = False):
+            retry_at = None if permanent else _retry_at(message["attempts"])
+            crud_email_outbox.mark_failed(db, message["id"], f"{type(error).__name__}: {error}", retry_at)
+            result["retry" if retry_at else "failed"] += 1
+
+        processed = 0  # Số tin đầu lô đã ghi xong trạng thái (đã commit)
+        server = None
+        try:
+            server = _connect()
+            for message in messages:
+                try:
+                    server.sendmail(settings.MAIL_FROM, message["to_email"], _build_message(message).as_string())
+                    crud_email_outbox.mark_sent(db, message["id"])
+                    result["sent"] += 1
+                except smtplib.SMTPServerDisconnected:
+                    raise  # Mất kết nối -> hẹn lại tin này và các tin còn lại (xử lý bên dưới)
+                except smtplib.SMTPException as e:
+                    # Lỗi riêng của tin này (VD: địa chỉ nhận bị từ chối); lỗi mạng (OSError khác) đi ra ngoài
+                    give_up_or_retry(message, e, permanent=_is_permanent(e))
+                # Ghi trạng thái từng tin ngay: worker chết sau đó cũng không gửi trùng tin đã gửi
+                db.commit()
+                processed += 1
+        except (smtplib.SMTPException, OSError) as e:
+            print(f"[EMAIL OUTBOX ERROR]: {e}")
+            db.rollback()
+            for message in messages[processed:]:
+                give_up_or_retry(message, e)
+            db.commit()
+        finally:
+            if server is not None:
+                try:
+                    server.quit()
+                except (smtplib.SMTPException, OSError):
+                    server.close()
+        return result
+    finally:
+        db.close()
+
+
+# Gửi tới khi hết tin đến hạn
+def deliver_pending(batch_size: int = settings.EMAIL_OUTBOX_BATCH_SIZE) -> dict:
+    total = {"claimed": 0, "sent": 0, "retry": 0, "failed": 0, "expired": 0}
+    while True:
+        started = time.perf_counter()
+        result = deliver_batch(batch_size)
+        for key in total:
+            total[key] += result[key]
+        if result["claimed"] or result["expired"]:
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+            print(f"[EMAIL OUTBOX] {result['sent']} gửi, {result['retry']} hẹn lại, {result['failed']} thất bại, "
+                  f"{result['expired']} hết hạn ({elapsed_ms} ms)")
+        if result["claimed"] < batch_size:
+            return total
+
+
+# Worker chạy trong tiến trình API (bật bằng EMAIL_OUTBOX_WORKER=True): quét hàng đợi mỗi EMAIL_OUTBOX_POLL_SECONDS
+# Nhiều worker uvicorn cùng chạy vẫn an toàn (SKIP LOCKED)
+# Chờ 1 chu kỳ trước lần quét đầu: khởi động worker không phát sinh câu lệnh ghi DB nào
+async def email_outbox_worker():
+    while True:
+        await asyncio.sleep(settings.EMAIL_OUTBOX_POLL_SECONDS)
+        try:
+            # smtplib + Session sync -> chạy trong thread riêng để không chặn event loop
+            await asyncio.to_thread(deliver_pending)
+        except Exception as e:
+            print(f"[EMAIL OUTBOX ERROR]: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gửi các email trong hàng đợi email_outbox")
+    parser.add_argument("--batch-size", type=int, default=settings.EMAIL_OUTBOX_BATCH_SIZE, help="Số mail mỗi kết nối SMTP")
+    parser.add_argument("--loop", action="store_true", help="Chạy liên tục, quét hàng đợi mỗi EMAIL_OUTBOX_POLL_SECONDS")
+    args = parser.parse_args()
+
+    while True:
+        total = deliver_pending(args.batch_size)
+        if not args.loop:
+            print(f"[EMAIL OUTBOX] Xong: {total}")
+            break
+        time.sleep(settings.EMAIL_OUTBOX_POLL_SECONDS)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+import argparse
+import multiprocessing
+import random
+import time
+from datetime import date, datetime, timedelta
+from typing import Iterator, List, NamedTuple, Optional
+from sqlalchemy import text
+from app.database import db_connection
+from app.database.crud import crud_habit_streak, crud_analytics
+from app.core import logic
+from app.core.utils import get_password_hash
+
+# Sinh dữ liệu giả lập cỡ production để test tải / dung lượng (KHÔNG chạy trên DB thật)
+# N user x M habit / user, log mỗi ngày có lịch trong Y năm gần nhất (70% COMPLETED, 15% FAILED, 15% SKIPPED như init_db)
+# Dữ liệu đi thẳng vào Postgres bằng COPY (không qua ORM), chia theo nhóm user cho nhiều tiến trình con chạy song song
+# Mỗi nhóm 1 transaction: users -> habits -> habit_logs (stream, không giữ hết trong RAM) -> user_daily_stats -> streak
+# Cần chạy init_db trước (role User + category). Chạy từ thư mục Backend:
+#   python -m app.database.generate_load_data --users 1000 --habits-per-user 5 --years 1
+#   python -m app.database.generate_load_data --users 100000 --habits-per-user 5 --years 3 --workers 8   (~ 100 triệu log)
+# User sinh ra: load<id>@loadtest.local / mật khẩu LOAD_TEST_PASSWORD
+
+LOAD_TEST_PASSWORD = "loadtest123@"
+EMAIL_DOMAIN = "loadtest.local"
+
+# Lịch tập (frequency: 2=T2 ... 8=CN) và tỉ lệ xuất hiện; None = chọn ngẫu nhiên 1-6 ngày
+FREQUENCY_CHOICES = [
+    ([2, 3, 4, 5, 6, 7, 8], 45),   # Mỗi ngày
+    ([2, 3, 4, 5, 6], 20),         # Ngày làm việc
+    ([2, 4, 6], 15),               # 3 buổi / tuần
+    ([7, 8], 5),                   # Cuối tuần
+    (None, 15),
+]
+
+# (tên, đơn vị, mục tiêu, màu) - mục tiêu None = habit dạng có / không
+HABIT_TEMPLATES = [
+    ("Uống nước", "ml", 2000.0, "#3498db"),
+    ("Chạy bộ", "km", 5.0, "#e74c3c"),
+    ("Đọc sách", "trang", 20.0, "#f1c40f"),
+    ("Học từ vựng", "từ", 10.0, "#9b59b6"),
+    ("Thiền", "phút", 15.0, "#1abc9c"),
+    ("Tập gym", None, None, "#e67e22"),
+    ("Ngủ trước 23h", None, None, "#34495e"),
+    ("Tiết kiệm", "nghìn", 50.0, "#2ecc71"),
+    ("Gọi điện cho gia đình", None, None, "#ff6b81"),
+    ("Viết nhật ký", None, None, "#95a5a6"),
+]
+
+# Cấu trúc / thứ tự cột các bảng COPY vào
+COPY_USERS_SQL = "COPY users (id, username, full_name, password, email, role_id, created_at) FROM STDIN"
+COPY_HABITS_SQL = """
+    COPY habits (id, user_id, category_id, name, "desc", frequency, weekday_mask, unit, target_value, color, created_at)
+    FROM STDIN
+"""
+COPY_LOGS_SQL = "COPY habit_logs (habit_id, record_date, status, value) FROM STDIN"
+COPY_DAILY_STATS_SQL = "COPY user_daily_stats (user_id, date, scheduled, completed, partial, skipped, failed) FROM STDIN"
+
+# Dòng text COPY: cột cách nhau bằng tab, NULL = \N
+NULL = "\\N"
+
+
+class LoadChunk(NamedTuple):
+    first_user_id: int
+    user_count: int
+    first_habit_id: int
+    habits_per_user: int
+    start_date: date
+    end_date: date
+    category_ids: List[int]
+    password_hash: str
+    seed: int
+    daily_stats: bool
+
+
+# Giữ trước 1 dải id liên tiếp của bảng (khóa bảng để không request nào chen vào giữa) -> trả về id đầu tiên
+def _reserve_ids(db, table: str, count: int) -> int:
+    db.execute(text(f"LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE"))
+    first_id = db.execute(text("SELECT nextval(pg_get_serial_sequence(:table, 'id'))"), {"table": table}).scalar()
+    if count > 1:
+        db.execute(
+            text("SELECT setval(pg_get_serial_sequence(:table, 'id'), :last_id)"),
+            {"table": table, "last_id": first_id + count - 1}
+        )
+    return first_id
+
+
+def _frequency(rng: random.Random) -> List[int]:
+    frequency = rng.choices([f for f, _ in FREQUENCY_CHOICES], weights=[w for _, w in FREQUENCY_CHOICES])[0]
+    return frequency or sorted(rng.sample(range(2, 9), rng.randint(1, 6)))
+
+def _array(values: List[int]) -> str:
+    return "{" + ",".join(map(str, values)) + "}"
+
+def _text(value) -> str:
+    return NULL if value is None else str(value)
+
+
+# File-like cho cursor.copy_expert: đọc dần từ iterator các khối text (không dựng cả chuỗi trong RAM)
+class _CopyStream:
+    def __init__(self, blocks: Iterator[str]):
+        self._blocks = blocks
+        self._buffer = ""
+
+    def read(self, size: int = -1) -> str:
+        parts = [self._buffer]
+        length = len(self._buffer)
+        while size < 0 or length < size:
+            block = next(self._blocks, None)
+            if block is None:
+                break
+            parts.append(block)
+            length += len(block)
+        data = "".join(parts)
+        if size < 0:
+            self._buffer = ""
+            return data
+        self._buffer = data[size:]
+        return data[:size]
+
+
+# Chạy trong tiến trình con: sinh + COPY 1 nhóm user, trả về số dòng đã ghi
+def _load_chunk(chunk: LoadChunk) -> dict:
+    started = time.perf_counter()
+    rng = random.Random(chunk.seed)
+    days = [chunk.start_date + timedelta(days=i) for i in range((chunk.end_date - chunk.start_date).days + 1)]
+    day_texts = [d.isoformat() for d in days]
+    day_bits = [1 << d.weekday() for d in days]
+    # Habit được tạo trong 10% đầu khoảng thời gian (user "cũ" có lịch sử gần đủ Y năm)
+    created_spread = max(len(days) // 10, 1)
+
+    users, habits = [], []
+    habit_id = chunk.first_habit_id
+    for user_id in range(chunk.first_user_id, chunk.first_user_id + chunk.user_count):
+        users.append(
+            f"{user_id}\tload_user_{user_id}\tLoad Test {user_id}\t{chunk.password_hash}\t"
+            f"load{user_id}@{EMAIL_DOMAIN}\t2\t{day_texts[0]} 00:00:00\n"
+        )
+        for _ in range(chunk.habits_per_user):
+            name, unit, target, color = rng.choice(HABIT_TEMPLATES)
+            frequency = _frequency(rng)
+            habits.append({
+                "id": habit_id, "user_id": user_id, "category_id": rng.choice(chunk.category_ids),
+                "name": name, "frequency": frequency, "mask": logic.frequency_to_mask(frequency),
+                "unit": unit, "target": target, "color": color, "created": rng.randrange(created_spread),
+            })
+            habit_id += 1
+
+    # (user_id, chỉ số ngày) -> [scheduled, completed, partial, skipped, failed]; log sinh ra đúng các ngày có lịch
+    stats = {}
+
+    def log_blocks() -> Iterator[str]:
+        for habit in habits:
+            completed_value = _text(habit["target"] if habit["target"] else 1.0)
+            failed_value = "0.0" if habit["target"] else NULL
+            prefix = f"{habit['id']}\t"
+            lines = []
+            for index in range(habit["created"], len(days)):
+                if not habit["mask"] & day_bits[index]:
+                    continue
+                roll = rng.random()
+                if roll < 0.7:
+                    lines.append(f"{prefix}{day_texts[index]}\tCOMPLETED\t{completed_value}\n")
+                    column = 1
+                elif roll < 0.85:
+                    lines.append(f"{prefix}{day_texts[index]}\tFAILED\t{failed_value}\n")
+                    column = 4
+                else:
+                    lines.append(f"{prefix}{day_texts[index]}\tSKIPPED\t{NULL}\n")
+                    column = 3
+                if chunk.daily_stats:
+                    counts = stats.setdefault((habit["user_id"], index), [0, 0, 0, 0, 0])
+                    counts[0] += 1
+                    counts[column] += 1
+            yield "".join(lines)
+
+    db = db_connection.SessionLocal()
+    try:
+        # Dữ liệu test, mất khi crash cũng được -> không chờ flush WAL lúc commit
+        db.execute(text("SET LOCAL synchronous_commit = off"))
+        cursor = db.connection().connection.cursor()
+        cursor.copy_expert(COPY_USERS_SQL, _CopyStream(iter(users)))
+        cursor.copy_expert(COPY_HABITS_SQL, _CopyStream(
+            f"{h['id']}\t{h['user_id']}\t{h['category_id']}\t{h['name']}\tDữ liệu test tải\t{_array(h['frequency'])}\t"
+            f"{h['mask']}\t{_text(h['unit'])}\t{_text(h['target'])}\t{h['color']}\t{day_texts[h['created']]} 00:00:00\n"
+            for h in habits
+        ))
+        cursor.copy_expert(COPY_LOGS_SQL, _CopyStream(log_blocks()), size=1 << 20)
+        log_rows = cursor.rowcount
+
+        stats_rows = 0
+        if chunk.daily_stats:
+            # Ngày có lịch nhưng thiếu user (VD: user chỉ có habit cuối tuần) vẫn cần dòng 0 như refresh_* tạo ra
+            first_day = {}
+            for habit in habits:
+                first_day[habit["user_id"]] = min(first_day.get(habit["user_id"], len(days)), habit["created"])
+            cursor.copy_expert(COPY_DAILY_STATS_SQL, _CopyStream(
+                f"{user_id}\t{day_texts[index]}\t" + "\t".join(map(str, stats.get((user_id, index), (0, 0, 0, 0, 0)))) + "\n"
+                for user_id, start in first_day.items() for index in range(start, len(days))
+            ), size=1 << 20)
+            stats_rows = cursor.rowcount
+
+        # Cột streak lưu sẵn trên habits (dùng lại đúng câu tính của API)
+        crud_habit_streak.recompute_many(db, [h["id"] for h in habits])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    return {
+        "first_user_id": chunk.first_user_id, "users": chunk.user_count, "habits": len(habits),
+        "logs": log_rows, "daily_stats": stats_rows, "elapsed": time.perf_counter() - started,
+    }
+
+
+# end_date: ngày log cuối cùng (mặc định hôm nay). Cố định end_date + seed -> cùng bộ dữ liệu dù sinh vào ngày nào
+def generate(users: int, habits_per_user: int, years: float, workers: int, chunk_size: int,
+             seed: int, daily_stats: bool = True, end_date: Optional[date] = None) -> dict:
+    end_date = end_date or datetime.now().date()
+    start_date = end_date - timedelta(days=max(int(years * 365), 1) - 1)
+
+    db = db_connection.SessionLocal()
+    try:
+        category_ids = [row[0] for row in db.execute(text("SELECT id FROM habit_categories ORDER BY id"))]
+        if not category_ids or not db.execute(text("SELECT 1 FROM roles WHERE id = 2")).first():
+            raise SystemExit("[LOAD ERROR]: Chưa có role / category, chạy python -m app.database.init_db trước")
+        first_user_id = _reserve_ids(db, "users", users)
+        first_habit_id = _reserve_ids(db, "habits", users * habits_per_user)
+        db.commit()
+    finally:
+        db.close()
+
+    # Mọi user dùng chung 1 hash (bcrypt cho từng user sẽ tốn hàng giờ)
+    password_hash = get_password_hash(LOAD_TEST_PASSWORD)
+    chunks = [
+        LoadChunk(
+            first_user_id=first_user_id + offset,
+            user_count=min(chunk_size, users - offset),
+            first_habit_id=first_habit_id + offset * habits_per_user,
+            habits_per_user=habits_per_user,
+            start_date=start_date,
+            end_date=end_date,
+            category_ids=category_ids,
+            password_hash=password_hash,
+            seed=seed + offset,
+            daily_stats=daily_stats,
+        )
+        for offset in range(0, users, chunk_size)
+    ]
+
+    print(f"[LOAD] {users} user x {habits_per_user} habit, {start_date} -> {end_date}, "
+          f"{len(chunks)} nhóm / {workers} tiến trình (user id {first_user_id} - {first_user_id + users - 1})")
+    started = time.perf_counter()
+    total = {"users": 0, "habits": 0, "logs": 0, "daily_stats": 0}
+    # "spawn" như pool băm mật khẩu: mỗi tiến trình con tự tạo engine / kết nối riêng
+    with multiprocessing.get_context("spawn").Pool(workers) as pool:
+        for result in pool.imap_unordered(_load_chunk, chunks):
+            for key in total:
+                total[key] += result[key]
+            print(f"[LOAD] user {result['first_user_id']}+{result['users']}: {result['logs']} log "
+                  f"({round(result['elapsed'], 1)} s) - tổng {total['logs']} log")
+
+    db = db_connection.SessionLocal()
+    try:
+        # Cập nhật thống kê cho planner (bảng vừa tăng đột biến) + xóa cache /admin/analytics
+        db.execute(text("ANALYZE users, habits, habit_logs, user_daily_stats"))
+        crud_analytics.mark_all_changed(db)
+        db.commit()
+    finally:
+        db.close()
+
+    elapsed = time.perf_counter() - started
+    total["elapsed_s"] = round(elapsed, 1)
+    total["logs_per_second"] = round(total["logs"] / elapsed) if elapsed else 0
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sinh dữ liệu giả lập lớn (users, habits, habit_logs) bằng COPY")
+    parser.add_argument("--users", type=int, required=True, help="Số user sinh thêm")
+    parser.add_argument("--habits-per-user", type=int, default=5)
+    parser.add_argument("--years", type=float, default=1.0, help="Số năm lịch sử log (tính lùi từ --end-date)")
+    parser.add_argument("--end-date", type=date.fromisoformat, default=None, help="Ngày log cuối cùng YYYY-MM-DD (mặc định hôm nay)")
+    parser.add_argument("--workers", type=int, default=max(multiprocessing.cpu_count() - 1, 1), help="Số tiến trình COPY song song")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Số user mỗi transaction")
+    parser.add_argument("--seed", type=int, default=42, help="Seed ngẫu nhiên (cùng seed -> cùng dữ liệu)")
+    parser.add_argument("--no-daily-stats", action="store_true", help="Không ghi user_daily_stats (để API tự tính khi đọc)")
+    args = parser.parse_args()
+
+    total = generate(args.users, args.habits_per_user, args.years, args.workers, args.chunk_size,
+                     args.seed, daily_stats=not args.no_daily_stats, end_date=args.end_date)
+    print(f"[LOAD] Xong: {total}")
+
+if __name__ == "__main__":
+    main()
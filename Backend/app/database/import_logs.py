@@ -0,0 +1,32 @@
+import argparse
+import json
+from datetime import datetime
+from app.database import db_connection
+from app.database.crud import crud_log_import
+
+# Import log từ file CSV cho 1 user (cùng luật với POST /logs/user/import)
+# Chạy từ thư mục Backend:
+#   python -m app.database.import_logs --user-id 3 logs.csv
+
+def main():
+    parser = argparse.ArgumentParser(description="Import habit logs từ file CSV")
+    parser.add_argument("--user-id", type=int, required=True, help="User sở hữu các habit trong file")
+    parser.add_argument("file", help="Đường dẫn file CSV (habit_id, record_date, status, value)")
+    args = parser.parse_args()
+
+    db = db_connection.SessionLocal()
+    try:
+        with open(args.file, encoding="utf-8-sig", newline="") as csv_file:
+            summary = crud_log_import.import_logs_from_csv(
+                db, args.user_id, csv_file, today=datetime.now().date()
+            )
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+    except Exception as e:
+        print(f"[IMPORT ERROR]: {e}")
+        db.rollback()
+        raise SystemExit(1)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,205 +1,184 @@
-from sqlalchemy.orm import Session
+import argparse
+import time
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
 from app.database import models, db_connection
+from app.database.crud import crud_habit_streak, crud_analytics
 from app.core.utils import get_password_hash
+from app.core import logic, http_cache
 from datetime import datetime, timedelta, date
-import random
 
-def seed_data():
-    # 1. Tự lấy session DB thủ công
-    db = next(db_connection.get_db())
-    
+# Dữ liệu ban đầu (role, category, quote, admin, user demo có habit + log 30 ngày)
+# KHÔNG còn chạy lúc import main.py: mỗi worker uvicorn (kể cả mỗi lần reload) phải chờ seed xong mới phục vụ được
+# Chạy tay từ thư mục Backend (chạy lại nhiều lần vẫn an toàn, phần nào có rồi thì bỏ qua):
+#   python -m app.database.init_db
+#   python -m app.database.init_db --no-demo      -> không tạo user demo
+# Hoặc đặt SEED_ON_STARTUP=True để app tự seed lúc khởi động (chạy nền, không chặn request)
+# Mọi bước nằm trong 1 transaction, mỗi bảng 1 câu INSERT theo tập hợp (không add từng dòng)
+
+ROLES_DATA = [
+    {"id": 1, "name": "Admin", "desc": "Quản trị viên hệ thống"},
+    {"id": 2, "name": "User", "desc": "Người dùng cơ bản"},
+]
+
+CATEGORIES_DATA = [
+    {"name": "Sức Khỏe", "desc": "Tập luyện, ăn uống, ngủ nghỉ"},
+    {"name": "Học Tập", "desc": "Nâng cao kiến thức, đọc sách"},
+    {"name": "Công Việc", "desc": "Kỹ năng mềm, năng suất"},
+    {"name": "Tài Chính", "desc": "Tiết kiệm, đầu tư"},
+    {"name": "Tinh Thần", "desc": "Thiền, giải trí, thư giãn"},
+    {"name": "Gia Đình", "desc": "Kết nối người thân"}
+]
+
+QUOTES_DATA = [
+    {"quote": "Không có việc gì khó. Chỉ sợ lòng không bền. Đào núi và lấp biển. Quyết chí ắt làm nên", "author": "Hồ Chí Minh"},
+    {"quote": "Không bao giờ là quá muộn để trở thành người bạn muốn.", "author": "George Eliot"},
+    {"quote": "Kỷ luật là cầu nối giữa mục tiêu và thành tựu.", "author": "Jim Rohn"},
+    {"quote": "Cách tốt nhất để dự đoán tương lai là tạo ra nó.", "author": "Abraham Lincoln"},
+    {"quote": "Đừng đếm ngày, hãy làm cho mỗi ngày đều đáng giá.", "author": "Muhammad Ali"}
+]
+
+ADMIN_EMAIL = "23050118@student.bdu.edu.vn"
+TEST_EMAIL = "anhnguyentaun@gmail.com"
+
+DEMO_HABITS_DATA = [
+    {"name": "Uống 2 lít nước", "category_id": 1, "frequency": [2,3,4,5,6,7,8], "unit": "ml", "target_value": 2000, "color": "#3498db"},
+    {"name": "Chạy bộ buổi sáng", "category_id": 1, "frequency": [2, 4, 6, 8], "unit": "km", "target_value": 5, "color": "#e74c3c"},
+    {"name": "Đọc sách 30p", "category_id": 2, "frequency": [2,3,4,5,6,7,8], "unit": "phút", "target_value": 30, "color": "#f1c40f"},
+    {"name": "Học từ vựng T.Anh", "category_id": 2, "frequency": [3, 5, 7], "unit": "từ", "target_value": 10, "color": "#9b59b6"}
+]
+
+# Category theo tên chưa có mới thêm (bảng không có unique trên name)
+INSERT_CATEGORIES_SQL = text("""
+    INSERT INTO habit_categories (name, "desc")
+    SELECT v.name, v."desc"
+    FROM unnest(CAST(:names AS varchar[]), CAST(:descs AS varchar[])) AS v(name, "desc")
+    WHERE NOT EXISTS (SELECT 1 FROM habit_categories c WHERE c.name = v.name)
+""")
+
+# Quote chỉ seed khi bảng đang rỗng
+INSERT_QUOTES_SQL = text("""
+    INSERT INTO motivation_quotes (quote, author)
+    SELECT v.quote, v.author
+    FROM unnest(CAST(:quotes AS varchar[]), CAST(:authors AS varchar[])) AS v(quote, author)
+    WHERE NOT EXISTS (SELECT 1 FROM motivation_quotes)
+""")
+
+# Log giả 30 ngày gần nhất cho các ngày có lịch của habit demo, 1 câu INSERT ... SELECT:
+# 70% COMPLETED (value = target hoặc 1), 15% FAILED (value = 0 nếu có target), 15% SKIPPED
+INSERT_DEMO_LOGS_SQL = text("""
+    INSERT INTO habit_logs (habit_id, record_date, status, value)
+    SELECT r.habit_id, r.record_date,
+           CASE WHEN r.roll < 0.7 THEN 'COMPLETED' WHEN r.roll < 0.85 THEN 'FAILED' ELSE 'SKIPPED' END,
+           CASE WHEN r.roll < 0.7 THEN CASE WHEN r.target_value > 0 THEN r.target_value ELSE 1.0 END
+                WHEN r.roll < 0.85 AND r.target_value > 0 THEN 0.0
+           END
+    FROM (
+        SELECT h.id AS habit_id, CAST(d AS date) AS record_date, h.target_value, random() AS roll
+        FROM habits h
+        CROSS JOIN generate_series(CAST(:start_date AS date), CAST(:end_date AS date), interval '1 day') AS d
+        WHERE h.id = ANY(CAST(:habit_ids AS integer[]))
+          AND (h.weekday_mask >> (CAST(extract(isodow FROM d) AS integer) - 1)) & 1 = 1
+    ) r
+""")
+
+
+def _seed_demo_user(db):
+    if db.query(models.User.id).filter(models.User.email == TEST_EMAIL).first():
+        print("[SEED] Test User already exists. Skipping.")
+        return
+
+    print("[SEED] Creating Test User with Habits & Logs...")
+    test_user_id = db.execute(insert(models.User).values(
+        email=TEST_EMAIL,
+        username="Test User",
+        full_name="Nguyen Van Test",
+        password=get_password_hash("test123@"),
+        role_id=2,
+    ).returning(models.User.id)).scalar_one()
+
+    # 👇 NGÀY TẠO QUÁ KHỨ (25/10 năm nay, 00:00:00)
+    past_created_at = datetime(datetime.now().year, 10, 25, 0, 0, 0)
+    habit_ids = db.execute(insert(models.Habit).values([
+        {
+            "user_id": test_user_id,
+            "category_id": h["category_id"],
+            "name": h["name"],
+            "desc": f"Mô tả cho {h['name']}",
+            "frequency": h["frequency"],
+            "weekday_mask": logic.frequency_to_mask(h["frequency"]),
+            "unit": h["unit"],
+            "target_value": h["target_value"],
+            "color": h["color"],
+            "created_at": past_created_at,  # 👈 ÉP NGÀY TẠO VỀ QUÁ KHỨ
+        }
+        for h in DEMO_HABITS_DATA
+    ]).returning(models.Habit.id)).scalars().all()
+
+    # Tạo LOGS giả trong 30 ngày qua (Để vẽ biểu đồ)
+    today = date.today()
+    inserted = db.execute(INSERT_DEMO_LOGS_SQL, {
+        "habit_ids": habit_ids, "start_date": today - timedelta(days=29), "end_date": today
+    }).rowcount
+    crud_analytics.mark_changed_from(db, today - timedelta(days=29))
+    # Streak lưu sẵn trên habits (thống kê ngày tự tạo khi đọc lần đầu)
+    crud_habit_streak.recompute_many(db, habit_ids)
+    print(f"[SEED] Test User ready: {TEST_EMAIL} / test123@ ({len(habit_ids)} habits, {inserted} logs)")
+
+
+def seed_data(demo: bool = True):
+    started = time.perf_counter()
+    db = db_connection.SessionLocal()
     try:
         print("========== BẮT ĐẦU SEED DATA ==========")
 
-        # ====================================================
-        # PHẦN 1: TẠO ROLE (QUYỀN)
-        # ====================================================
-        if not db.query(models.Role).filter(models.Role.id == 1).first():
-            print("[SEED] Creating Roles...")
-            db.add(models.Role(id=1, name="Admin", desc="Quản trị viên hệ thống"))
-            db.add(models.Role(id=2, name="User", desc="Người dùng cơ bản"))
-            db.commit()
-
-        # ====================================================
-        # PHẦN 2: TẠO CATEGORIES
-        # ====================================================
-        categories_data = [
-            {"name": "Sức Khỏe", "desc": "Tập luyện, ăn uống, ngủ nghỉ"},
-            {"name": "Học Tập", "desc": "Nâng cao kiến thức, đọc sách"},
-            {"name": "Công Việc", "desc": "Kỹ năng mềm, năng suất"},
-            {"name": "Tài Chính", "desc": "Tiết kiệm, đầu tư"},
-            {"name": "Tinh Thần", "desc": "Thiền, giải trí, thư giãn"},
-            {"name": "Gia Đình", "desc": "Kết nối người thân"}
-        ]
-        
-        for cat in categories_data:
-            if not db.query(models.HabitCategory).filter(models.HabitCategory.name == cat["name"]).first():
-                db.add(models.HabitCategory(name=cat["name"], desc=cat["desc"]))
-        db.commit()
-        print("[SEED] Categories synced.")
-
-        # ====================================================
-        # PHẦN 3: TẠO QUOTES (CÂU NÓI ĐỘNG LỰC)
-        # ====================================================
-        quotes_data = [
-            {"quote": "Không có việc gì khó. Chỉ sợ lòng không bền. Đào núi và lấp biển. Quyết chí ắt làm nên", "author": "Hồ Chí Minh"},
-            {"quote": "Không bao giờ là quá muộn để trở thành người bạn muốn.", "author": "George Eliot"},
-            {"quote": "Kỷ luật là cầu nối giữa mục tiêu và thành tựu.", "author": "Jim Rohn"},
-            {"quote": "Cách tốt nhất để dự đoán tương lai là tạo ra nó.", "author": "Abraham Lincoln"},
-            {"quote": "Đừng đếm ngày, hãy làm cho mỗi ngày đều đáng giá.", "author": "Muhammad Ali"}
-        ]
-        
-        if db.query(models.MotivationQuote).count() == 0:
-            print("[SEED] Creating Quotes...")
-            for q in quotes_data:
-                db.add(models.MotivationQuote(quote=q["quote"], author=q["author"]))
-            db.commit()
-
-        # ====================================================
-        # PHẦN 4: TẠO USER & DATA MẪU (QUAN TRỌNG)
-        # ====================================================
-        
-        # 4.1 Tạo Admin
-        if not db.query(models.User).filter(models.User.role_id == 1).first():
-            hashed_pwd = get_password_hash("admin123@") 
-            super_admin = models.User(
-                email="23050118@student.bdu.edu.vn",
+        # PHẦN 1: ROLE (QUYỀN)
+        db.execute(insert(models.Role).values(ROLES_DATA).on_conflict_do_nothing(index_elements=["id"]))
+
+        # PHẦN 2: CATEGORIES
+        db.execute(INSERT_CATEGORIES_SQL, {
+            "names": [c["name"] for c in CATEGORIES_DATA], "descs": [c["desc"] for c in CATEGORIES_DATA]
+        })
+
+        # PHẦN 3: QUOTES (CÂU NÓI ĐỘNG LỰC)
+        db.execute(INSERT_QUOTES_SQL, {
+            "quotes": [q["quote"] for q in QUOTES_DATA], "authors": [q["author"] for q in QUOTES_DATA]
+        })
+
+        # PHẦN 4: ADMIN (chỉ băm mật khẩu khi thật sự cần tạo)
+        if not db.query(models.User.id).filter(models.User.role_id == 1).first():
+            db.execute(insert(models.User).values(
+                email=ADMIN_EMAIL,
                 username="Admin Nguyen Anh",
                 full_name="Nguyễn Tuấn Anh",
-                password=hashed_pwd,
+                password=get_password_hash("admin123@"),
                 role_id=1,
-            )
-            db.add(super_admin)
-            db.commit()
-            print("[SEED] Admin created: 23050118@student.bdu.edu.vn / admin123")
-
-        # 4.2 Tạo User Test (Có dữ liệu mẫu để Demo)
-        test_email = "anhnguyentaun@gmail.com"
-        test_user = db.query(models.User).filter(models.User.email == test_email).first()
-        
-        if not test_user:
-            print("[SEED] Creating Test User with Habits & Logs...")
-            
-            # Tạo User
-            test_user = models.User(
-                email=test_email,
-                username="Test User",
-                full_name="Nguyen Van Test",
-                password=get_password_hash("test123@"),
-                role_id=2,
-            )
-            db.add(test_user)
-            db.commit()
-            db.refresh(test_user)
-
-            # 👇 ĐỊNH NGHĨA NGÀY TẠO QUÁ KHỨ (25/10 năm nay)
-            current_year = datetime.now().year
-            # Tạo ngày 25/10 lúc 00:00:00
-            past_created_at = datetime(current_year, 10, 25, 0, 0, 0)
-
-            habits_data = [
-                {
-                    "name": "Uống 2 lít nước", 
-                    "category_id": 1, 
-                    "frequency": [2,3,4,5,6,7,8], 
-                    "unit": "ml", "target_value": 2000, "color": "#3498db"
-                },
-                {
-                    "name": "Chạy bộ buổi sáng", 
-                    "category_id": 1, 
-                    "frequency": [2, 4, 6, 8],    
-                    "unit": "km", "target_value": 5, "color": "#e74c3c"
-                },
-                {
-                    "name": "Đọc sách 30p", 
-                    "category_id": 2, 
-                    "frequency": [2,3,4,5,6,7,8], 
-                    "unit": "phút", "target_value": 30, "color": "#f1c40f"
-                },
-                {
-                    "name": "Học từ vựng T.Anh", 
-                    "category_id": 2, 
-                    "frequency": [3, 5, 7],       
-                    "unit": "từ", "target_value": 10, "color": "#9b59b6"
-                }
-            ]
-
-            created_habits = []
-            for h in habits_data:
-                habit = models.Habit(
-                    user_id=test_user.id,
-                    category_id=h["category_id"],
-                    name=h["name"],
-                    desc=f"Mô tả cho {h['name']}",
-                    frequency=h["frequency"],
-                    unit=h["unit"],
-                    target_value=h["target_value"],
-                    color=h["color"],
-                    created_at=past_created_at # 👈 ÉP NGÀY TẠO VỀ QUÁ KHỨ
-                )
-                db.add(habit)
-                created_habits.append(habit)
-            
-            db.commit()
-            for h in created_habits: db.refresh(h)
-
-            # Tạo LOGS giả trong 30 ngày qua (Để vẽ biểu đồ)
-            print("   -> Tạo seed logs trong 30 ngày qua...")
-            today = date.today()
-            
-            for i in range(30): # Duyệt qua 30 ngày gần nhất
-                current_date = today - timedelta(days=i)
-                weekday = current_date.weekday() + 2 # 2=Monday, 8=Sunday
-
-                for habit in created_habits:
-                    # Kiểm tra xem hôm đó có lịch tập không
-                    if weekday in habit.frequency:
-                        rand = random.random()
-                        
-                        status = "SKIPPED"
-                        val = 0
-                        
-                        # Logic kiểm tra định lượng
-                        has_target = habit.target_value and habit.target_value > 0
-
-                        if rand < 0.7: # 70% là HOÀN THÀNH
-                            status = "COMPLETED"
-                            # Nếu có target thì lấy target, ko thì lấy 1 (boolean)
-                            val = habit.target_value if has_target else 1.0
-                            
-                        elif rand < 0.85: # 15% là THẤT BẠI
-                            status = "FAILED"
-                            # 👇 LOGIC MỚI BẠN YÊU CẦU:
-                            if has_target:
-                                val = 0.0 # Có định lượng -> 0
-                            else:
-                                val = None # Không định lượng -> Null
-                                
-                        else: # 15% là BỎ QUA (SKIPPED)
-                            status = "SKIPPED"
-                            val = None # Skipped nên để None hoặc 0 tùy logic, ở đây để None cho sạch
-                        
-                        # Tạo log
-                        log = models.HabitLog(
-                            habit_id=habit.id,
-                            value=val,
-                            status=status,
-                            record_date=current_date
-                        )
-                        db.add(log)
-            
-            db.commit()
-            print(f"[SEED] Test User ready: {test_email} / 123456")
-        else:
-            print("[SEED] Test User already exists. Skipping.")
-
-        print("========== SEED DATA HOÀN TẤT ==========")
-            
+            ))
+            print(f"[SEED] Admin created: {ADMIN_EMAIL} / admin123@")
+
+        # PHẦN 5: USER DEMO (có habit + log mẫu)
+        if demo:
+            _seed_demo_user(db)
+
+        # Role / category / quote có thể vừa được thêm: đổi ETag + xóa cache ở mọi worker (như các API ghi)
+        for resource in (http_cache.ROLES, http_cache.CATEGORIES, http_cache.MOTIVATION_QUOTES):
+            http_cache.bump_version(db, resource)
+        db.commit()
+        print(f"========== SEED DATA HOÀN TẤT ({round((time.perf_counter() - started) * 1000, 1)} ms) ==========")
+
     except Exception as e:
         print(f"[SEED ERROR]: {e}")
         db.rollback()
     finally:
         db.close()
 
+
+def main():
+    parser = argparse.ArgumentParser(description="Tạo dữ liệu ban đầu (role, category, quote, admin, user demo)")
+    parser.add_argument("--no-demo", action="store_true", help="Không tạo user demo (habit + log mẫu)")
+    args = parser.parse_args()
+
+    seed_data(demo=not args.no_demo)
+
 if __name__ == "__main__":
-    seed_data()
\ No newline at end of file
+    main()
@@ -1,8 +1,8 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Date, Float
+from sqlalchemy import Column, Integer, SmallInteger, String, Text, ForeignKey, DateTime, Date, Float, Index
 # Import ARRAY từ dialect của Postgres để đảm bảo tương thích tốt nhất
 from sqlalchemy.dialects.postgresql import ARRAY 
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from .db_connection import Base
 
 # --- BẢNG ROLE ---
@@ -32,6 +32,13 @@ class User(Base):
     habits = relationship("Habit", back_populates="user", cascade="all, delete-orphan")
     tokens = relationship("UserTokens", back_populates="user", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Tìm kiếm user theo username / email / tên (ILIKE '%x%' + chế độ xếp hạng, cần extension pg_trgm)
+        Index("ix_users_username_trgm", "username", postgresql_using="gin", postgresql_ops={"username": "gin_trgm_ops"}),
+        Index("ix_users_email_trgm", "email", postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}),
+        Index("ix_users_full_name_trgm", "full_name", postgresql_using="gin", postgresql_ops={"full_name": "gin_trgm_ops"}),
+    )
+
 # --- BẢNG TOKEN ---
 class UserTokens(Base):
     __tablename__ = "user_tokens"
@@ -67,17 +74,34 @@ class Habit(Base):
     
     # Mảng số nguyên lưu thứ trong tuần (0=Mon, 6=Sun) hoặc (2=Mon, 8=Sun tùy quy ước)
     frequency = Column(ARRAY(Integer), nullable=False)  
+    # frequency chuẩn hóa thành bitmask (bit 0 = T2 ... bit 6 = CN, 127 = mỗi ngày) để lọc "có lịch ngày D" ngay trong SQL
+    # Luôn cập nhật cùng frequency (xem logic.frequency_to_mask)
+    weekday_mask = Column(SmallInteger, nullable=False, default=127, server_default="127")
     
     unit = Column(String, nullable=True)         # VD: km, trang, ly
     target_value = Column(Float, nullable=True)  # VD: 5.0, 10.5
     color = Column(String, nullable=True)        # VD: #FF5733
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    # Trạng thái streak lưu sẵn (cập nhật khi ghi / sửa / xóa log) -> đọc streak không cần quét log
+    streak_current = Column(Integer, nullable=False, default=0, server_default="0")  # Streak tính tới streak_last_date
+    streak_base = Column(Integer, nullable=False, default=0, server_default="0")     # Streak tính tới ngày trước streak_last_date (0 nếu ngày đó không có log)
+    streak_longest = Column(Integer, nullable=False, default=0, server_default="0")
+    streak_last_date = Column(Date, nullable=True)                                    # Ngày log mới nhất
+    log_count = Column(Integer, nullable=False, default=0, server_default="0")
+
     user = relationship("User", back_populates="habits")
     category = relationship("HabitCategory", back_populates="habits")
     # Cascade: Xóa Habit -> Xóa sạch Log của Habit đó
     habit_logs = relationship("HabitLog", back_populates="habit", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Lấy habit của user đã được tạo trước ngày D (habits/today, thống kê, auto-fail)
+        Index("ix_habits_user_id_created_at", "user_id", "created_at"),
+        # Tìm kiếm habit theo tên (pg_trgm)
+        Index("ix_habits_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+    )
+
 # --- BẢNG HABIT LOG ---
 class HabitLog(Base):
     __tablename__ = "habit_logs"
@@ -93,10 +117,68 @@ class HabitLog(Base):
 
     habit = relationship("Habit", back_populates="habit_logs")
 
+    __table_args__ = (
+        # Mỗi habit chỉ có 1 log / ngày (dùng làm đích ON CONFLICT khi check-in)
+        Index("uq_habit_logs_habit_id_record_date", "habit_id", "record_date", unique=True),
+        # Phân trang theo cursor (record_date, id) cho danh sách log của admin (thứ tự toàn bảng)
+        # Lịch sử log của 1 user đọc theo từng habit bằng index (habit_id, record_date) ở trên
+        Index("ix_habit_logs_record_date_id", "record_date", "id"),
+    )
+
+# --- BẢNG THỐNG KÊ THEO NGÀY CỦA USER (cập nhật cùng transaction với mỗi lần ghi log / đổi habit) ---
+class UserDailyStats(Base):
+    __tablename__ = "user_daily_stats"
+
+    # Khóa chính (user_id, date) -> đọc 1 khoảng ngày của user chỉ là 1 lần quét index
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    date = Column(Date, primary_key=True)
+
+    scheduled = Column(Integer, nullable=False, default=0)  # Số habit có lịch ngày đó
+    completed = Column(Integer, nullable=False, default=0)
+    partial = Column(Integer, nullable=False, default=0)
+    skipped = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    # Log COMPLETED của habit không có lịch ngày đó (không tính vào completed / scheduled, heatmap cộng thêm)
+    completed_unscheduled = Column(Integer, nullable=False, default=0, server_default="0")
+
+# --- BẢNG HÀNG ĐỢI EMAIL (gửi bởi worker app/database/email_outbox.py, không gửi trong request) ---
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    to_email = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(Text, nullable=False)        # Xóa trắng khi SENT / FAILED (có thể chứa mật khẩu)
+    status = Column(String, nullable=False, default="PENDING", server_default="PENDING")  # PENDING, SENT, FAILED
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    # Thời điểm được gửi (lại): đang gửi thì = hết hạn giữ chỗ, worker chết giữa chừng -> tin tự quay lại hàng đợi
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Worker lấy tin PENDING đến hạn theo thứ tự (index chỉ chứa tin chưa gửi -> luôn nhỏ)
+        Index("ix_email_outbox_pending", "next_attempt_at", "id", postgresql_where=text("status = 'PENDING'")),
+    )
+
+# --- BẢNG PHIÊN BẢN DỮ LIỆU THAM CHIẾU (ETag, xem app/core/http_cache.py) ---
+class ReferenceVersion(Base):
+    __tablename__ = "reference_versions"
+
+    resource = Column(String, primary_key=True)   # http_cache.CATEGORIES / ROLES / MOTIVATION_QUOTES
+    version = Column(Integer, nullable=False, default=0, server_default="0")
+
 # --- BẢNG MOTIVATION QUOTE (Đã sửa tên Class) ---
 class MotivationQuote(Base):
     __tablename__ = "motivation_quotes"
 
     id = Column(Integer, primary_key=True, index=True)
     quote = Column(String, nullable=False)
-    author = Column(String, nullable=True)
\ No newline at end of file
+    author = Column(String, nullable=True)
+
+    __table_args__ = (
+        # Tìm kiếm quote theo nội dung / tác giả (pg_trgm)
+        Index("ix_motivation_quotes_quote_trgm", "quote", postgresql_using="gin", postgresql_ops={"quote": "gin_trgm_ops"}),
+        Index("ix_motivation_quotes_author_trgm", "author", postgresql_using="gin", postgresql_ops={"author": "gin_trgm_ops"}),
+    )
\ No newline at end of file
@@ -0,0 +1,37 @@
+import argparse
+from app.database import db_connection
+from app.database.crud import crud_user_daily_stats
+
+# Dựng lại / kiểm tra bảng user_daily_stats từ habits + habit_logs
+# Chạy từ thư mục Backend:
+#   python -m app.database.rebuild_daily_stats            -> dựng lại toàn bộ
+#   python -m app.database.rebuild_daily_stats --user-id 3
+#   python -m app.database.rebuild_daily_stats --check    -> chỉ in các dòng bị lệch, không sửa
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild user_daily_stats")
+    parser.add_argument("--user-id", type=int, default=None, help="Chỉ xử lý 1 user")
+    parser.add_argument("--check", action="store_true", help="So sánh với dữ liệu gốc, không ghi")
+    args = parser.parse_args()
+
+    db = db_connection.SessionLocal()
+    try:
+        if args.check:
+            mismatches = crud_user_daily_stats.find_mismatches(db, user_id=args.user_id)
+            for row in mismatches:
+                print(
+                    f"[MISMATCH] user={row.user_id} date={row.date} "
+                    f"stored=({row.scheduled},{row.completed},{row.partial},{row.skipped},{row.failed},"
+                    f"{row.completed_unscheduled}) "
+                    f"expected=({row.expected_scheduled},{row.expected_completed},{row.expected_partial},"
+                    f"{row.expected_skipped},{row.expected_failed},{row.expected_completed_unscheduled})"
+                )
+            print(f"[CHECK] {len(mismatches)} dòng bị lệch")
+        else:
+            rows = crud_user_daily_stats.rebuild(db, user_id=args.user_id)
+            print(f"[REBUILD] Đã dựng lại {rows} dòng")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
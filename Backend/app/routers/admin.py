@@ -0,0 +1,59 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import date, datetime, timedelta
+from app.database import db_connection, models
+from app.database.crud import crud_analytics, crud_email_outbox
+from app.schemas import schemas
+from app.core.dependencies import get_admin_user
+from app.core import invalidation
+
+router = APIRouter(
+    prefix = "/admin",
+    tags = ["Admin"]
+)
+
+MAX_ANALYTICS_DAYS = 366
+
+
+# API thống kê tỉ lệ hoàn thành theo Category x ngày / tuần (toàn hệ thống)
+# Mặc định: 30 ngày gần nhất. Kỳ đã kết thúc được cache, chỉ kỳ hiện tại (hoặc kỳ vừa có log thay đổi) mới query lại
+@router.get("/analytics", response_model = schemas.AnalyticsResponse)
+def get_analytics(
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    group_by: str = Query("day", pattern = "^(day|week)$"),
+    db: Session = Depends(db_connection.get_db),
+    current_user: models.User = Depends(get_admin_user)
+):
+    today = datetime.now().date()
+    to_date = to_date or today
+    from_date = from_date or to_date - timedelta(days = 29)
+    if from_date > to_date:
+        raise HTTPException(status_code = 400, detail = "from_date phải trước hoặc bằng to_date!")
+    if (to_date - from_date).days + 1 > MAX_ANALYTICS_DAYS:
+        raise HTTPException(status_code = 400, detail = f"Chỉ thống kê tối đa {MAX_ANALYTICS_DAYS} ngày mỗi lần!")
+
+    return crud_analytics.get_completion_rates(db, from_date, to_date, group_by, today = today)
+
+
+# API xem tình trạng cache thống kê
+@router.get("/analytics/cache")
+def get_analytics_cache_stats(current_user: models.User = Depends(get_admin_user)):
+    return crud_analytics.analytics_cache.stats()
+
+
+# API xóa cache thống kê (VD: sau khi sửa dữ liệu trực tiếp trong DB)
+@router.delete("/analytics/cache")
+def clear_analytics_cache(current_user: models.User = Depends(get_admin_user)):
+    invalidation.publish(invalidation.ANALYTICS, None)
+    return {"message": "Đã xóa cache thống kê!"}
+
+
+# API xem tình trạng hàng đợi email (số mail theo trạng thái PENDING / SENT / FAILED)
+@router.get("/email-outbox")
+def get_email_outbox_stats(
+    db: Session = Depends(db_connection.get_db),
+    current_user: models.User = Depends(get_admin_user)
+):
+    return crud_email_outbox.count_by_status(db)
@@ -1,12 +1,23 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 # Import cái Form chuẩn của FastAPI
 from fastapi.security import OAuth2PasswordRequestForm 
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import db_connection, models
-from app.core.utils import check_password, create_access_token 
+from app.core.utils import create_access_token 
+from app.core import hashing
 from app.schemas import schemas
 
 router = APIRouter(tags=["Authentication"])
+# Bản async của /login (đăng ký trước router sync khi ASYNC_DB=True): chờ bcrypt mà không chiếm thread nào
+async_router = APIRouter(tags=["Authentication"])
+
+invalid_login_exception = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Email hoặc mật khẩu không chính xác",
+    headers={"WWW-Authenticate": "Bearer"},
+)
 
 # API Đăng nhập (Quay lại dùng Form Data để khớp với Swagger)
 @router.post("/login", response_model=schemas.Token)
@@ -19,13 +30,16 @@ def login_for_access_token(
     # Vì hệ thống mình dùng Email đăng nhập, nên ta lấy form_data.username đem so với cột Email trong DB
     user = db.query(models.User).filter(models.User.email == form_data.username).first()
     
-    # 2. Kiểm tra
-    if not user or not check_password(form_data.password, user.password):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Email hoặc mật khẩu không chính xác",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    # 2. Kiểm tra (bcrypt chạy trong pool tiến trình riêng, xem app/core/hashing.py)
+    if not user:
+        raise invalid_login_exception
+    valid, new_hash = hashing.verify_password(form_data.password, user.password)
+    if not valid:
+        raise invalid_login_exception
+    # Hash cũ theo cost khác BCRYPT_ROUNDS -> lưu hash mới (chỉ lúc này mới có mật khẩu gốc)
+    if new_hash:
+        user.password = new_hash
+        db.commit()
     
     # 3. Tạo Token
     access_token = create_access_token(
@@ -35,4 +49,23 @@ def login_for_access_token(
     return {
         "access_token": access_token, 
         "token_type": "bearer"
-    }
\ No newline at end of file
+    }
+
+
+@async_router.post("/login", response_model=schemas.Token)
+async def login_for_access_token_async(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: AsyncSession = Depends(db_connection.get_async_db)
+):
+    user = (await db.execute(select(models.User).where(models.User.email == form_data.username))).scalars().first()
+    if not user:
+        raise invalid_login_exception
+    valid, new_hash = await hashing.verify_password_async(form_data.password, user.password)
+    if not valid:
+        raise invalid_login_exception
+    if new_hash:
+        user.password = new_hash
+        await db.commit()
+
+    access_token = create_access_token(data={"sub": str(user.id)})
+    return {"access_token": access_token, "token_type": "bearer"}
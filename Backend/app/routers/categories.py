@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
 
@@ -8,6 +8,7 @@ from app.schemas import schemas
 from typing import List
 from app.core.dependencies import get_current_user, get_admin_user
 from app.database import models
+from app.core import http_cache
 
 # Tạo router cho category
 router = APIRouter(
@@ -25,16 +26,22 @@ def create_category(
     return crud_category.create_category(db = db, category = category)
 
 
-# API Xem danh sách Category
+# API Xem danh sách Category (có ETag: client gửi If-None-Match trùng -> 304, không query DB)
 @router.get("/", response_model=List[schemas.HabitCategoryResponse])
-def read_all_categories(skip: int = 0, limit: int = 100, db: Session = Depends(db_connection.get_db)):
+def read_all_categories(request: Request, response: Response, skip: int = 0, limit: int = 100, db: Session = Depends(db_connection.get_db)):
+    not_modified = http_cache.check_not_modified(request, response, db, http_cache.CATEGORIES, public = True)
+    if not_modified:
+        return not_modified
     list_categories = crud_category.get_categories(db = db, skip = skip, limit = limit )
     return list_categories
 
 
 # API Xem chi tiet Category
 @router.get("/{category_id}",response_model = schemas.HabitCategoryResponse)
-def read_category(category_id: int, db: Session = Depends(db_connection.get_db)):
+def read_category(category_id: int, request: Request, response: Response, db: Session = Depends(db_connection.get_db)):
+    not_modified = http_cache.check_not_modified(request, response, db, http_cache.CATEGORIES, public = True)
+    if not_modified:
+        return not_modified
     category = crud_category.get_category(db = db, category_id = category_id)
     if category is None:
         raise HTTPException(status_code = 404, detail = "Không tìm thấy danh mục thói quen!")
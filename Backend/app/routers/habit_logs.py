@@ -1,15 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, File, HTTPException, Query, Response, UploadFile, status
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import models
 from app.database import db_connection
 from app.schemas import schemas
-from app.database.crud import crud_habit_log, crud_habit
-from app.core.dependencies import get_current_user, get_admin_user
+from app.database.crud import crud_habit_log, crud_habit, crud_user_daily_stats, crud_log_import
+from app.core.dependencies import get_current_user, get_current_user_async, get_admin_user
+from app.core import pagination
 from datetime import date, datetime, timedelta
 from calendar import monthrange
-from collections import defaultdict
+import csv
+import io
+import json
 
 
 router = APIRouter(
@@ -17,6 +24,12 @@ router = APIRouter(
     tags = ["Habit-logs"]
 )
 
+# Router chứa bản async của các API nóng (đăng ký trước router sync trong main.py khi bật ASYNC_DB)
+async_router = APIRouter(
+    prefix = "/logs",
+    tags = ["Habit-logs"]
+)
+
 
 # =================================================================
 # API CHECK-IN THÓI QUEN 
@@ -58,16 +71,105 @@ def check_in_habit(
     return crud_habit_log.create_or_update_habit_log(db=db, log=log)
 
 
+# Bản async của API check-in
+@async_router.post("/", response_model=schemas.HabitLogResponse)
+async def check_in_habit_async(
+    log: schemas.HabitLogCreate,
+    db: AsyncSession = Depends(db_connection.get_async_db),
+    current_user: models.User = Depends(get_current_user_async)
+):
+    today = datetime.now().date()
+    if log.record_date > today:
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Không thể check-in cho tương lai! Hôm nay là {today}"
+        )
+
+    habit = await db.get(models.Habit, log.habit_id)
+    if not habit:
+        raise HTTPException(status_code=404, detail="Thói quen không tồn tại")
+
+    if habit.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, 
+            detail="Bạn chỉ có thể check-in thói quen của chính mình!"
+        )
+
+    if log.record_date < habit.created_at.date():
+         raise HTTPException(
+            status_code=400, 
+            detail=f"Thói quen này được tạo ngày {habit.created_at.date()}. Không thể check-in cho quá khứ trước đó!"
+        )
+
+    # Dùng lại hàm crud sync qua run_sync (vẫn chạy trên kết nối asyncpg, không chặn event loop)
+    return await db.run_sync(crud_habit_log.create_or_update_habit_log, log)
+
+
+# =================================================================
+# API CHECK-IN HÀNG LOẠT (NHIỀU THÓI QUEN / NHIỀU NGÀY TRONG 1 REQUEST)
+# =================================================================
+# Số log tối đa mỗi request (cả lô nằm trong 1 transaction, giữ khóa ghi của user) - nhiều hơn thì tách request / dùng import CSV
+MAX_BATCH_LOGS = 500
+
+@router.post("/batch", response_model=List[schemas.HabitLogBatchResult])
+def check_in_habits_batch(
+    logs: List[schemas.HabitLogCreate] = Body(..., max_length=MAX_BATCH_LOGS),
+    db: Session = Depends(db_connection.get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Check-in nhiều log cùng lúc: kiểm tra quyền sở hữu + ngày của tất cả habit bằng 1 query,
+    ghi toàn bộ log hợp lệ bằng 1 câu upsert. Phần tử lỗi được báo riêng, không làm hỏng các phần tử khác.
+    """
+    today = datetime.now().date()
+    habits = {h.id: h for h in crud_habit.get_habits_by_ids(db, list({log.habit_id for log in logs}))}
+
+    # Kiểm tra từng phần tử với cùng luật như API check-in đơn lẻ
+    errors = {}
+    valid_logs = []
+    for index, log in enumerate(logs):
+        habit = habits.get(log.habit_id)
+        if log.record_date > today:
+            errors[index] = f"Không thể check-in cho tương lai! Hôm nay là {today}"
+        elif not habit:
+            errors[index] = "Thói quen không tồn tại"
+        elif habit.user_id != current_user.id:
+            errors[index] = "Bạn chỉ có thể check-in thói quen của chính mình!"
+        elif log.record_date < habit.created_at.date():
+            errors[index] = f"Thói quen này được tạo ngày {habit.created_at.date()}. Không thể check-in cho quá khứ trước đó!"
+        else:
+            valid_logs.append(log)
+
+    saved_logs = crud_habit_log.bulk_create_or_update_habit_logs(db, current_user.id, valid_logs)
+
+    results = []
+    for index, log in enumerate(logs):
+        if index in errors:
+            results.append({
+                "habit_id": log.habit_id, "record_date": log.record_date,
+                "success": False, "detail": errors[index]
+            })
+        else:
+            results.append({
+                "habit_id": log.habit_id, "record_date": log.record_date,
+                "success": True, "log": saved_logs[(log.habit_id, log.record_date)]
+            })
+    return results
+
+
 # =================================================================
 # API XEM LỊCH SỬ (HISTORY)
 # =================================================================
 @router.get("/habit/{habit_id}", response_model=List[schemas.HabitLogResponse])
 def get_history_by_habit(
+    response: Response,
     habit_id: int, 
     skip: int = 0, 
     limit: int = 30,
     from_date: Optional[date] = None,
     to_date: Optional[date] = None,
+    cursor: Optional[str] = None,   # Lấy từ header X-Next-Cursor của trang trước (có thì bỏ qua skip)
+    with_total: bool = False,       # Trả thêm header X-Total-Estimate (ước lượng, không COUNT)
     db: Session = Depends(db_connection.get_db),
     current_user: models.User = Depends(get_current_user)
 ):
@@ -82,53 +184,168 @@ def get_history_by_habit(
             detail="Bạn không có quyền xem lịch sử thói quen này!"
         )
 
-    return crud_habit_log.get_logs_by_habit(
+    after = pagination.decode_cursor(cursor, date.fromisoformat, int) if cursor else None
+    logs = crud_habit_log.get_logs_by_habit(
         db, habit_id=habit_id, skip=skip, limit=limit, 
-        from_date=from_date, to_date=to_date
+        from_date=from_date, to_date=to_date, after=after
     )
 
+    pagination.set_next_cursor(response, logs, limit, key=lambda log: (log.record_date, log.id))
+    if with_total:
+        pagination.set_total_estimate(response, pagination.estimate_query_rows(
+            db, crud_habit_log.query_logs_by_habit(db, habit_id, from_date, to_date)
+        ))
+    return logs
+
 
 # =================================================================
 # API XEM TẤT CẢ LOG CỦA USER (CHO MÀN HÌNH STATS)
 # =================================================================
 @router.get("/user/history", response_model=List[schemas.HabitLogUserResponse]) 
 def get_all_logs_by_user(
+    response: Response,
     skip: int = 0, 
     limit: int = 100, 
     from_date: Optional[date] = None,
     to_date: Optional[date] = None,
     habit_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    with_total: bool = False,
     db: Session = Depends(db_connection.get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    query = db.query(models.HabitLog).join(models.Habit).filter(
-        models.Habit.user_id == current_user.id
+    if with_total:
+        pagination.set_total_estimate(response, pagination.estimate_query_rows(
+            db, crud_habit_log.query_logs_by_user(db, current_user.id, from_date, to_date, habit_id)
+        ))
+
+    # 1 câu query JOIN habits, chỉ lấy các cột cần trả về (không lazy-load log.habit từng dòng)
+    after = pagination.decode_cursor(cursor, date.fromisoformat, int) if cursor else None
+    logs = crud_habit_log.get_all_logs_by_user(
+        db, user_id=current_user.id, skip=skip, limit=limit,
+        from_date=from_date, to_date=to_date, habit_id=habit_id, after=after
     )
+    pagination.set_next_cursor(response, logs, limit, key=lambda log: (log["record_date"], log["id"]))
+    return logs
 
-    if from_date:
-        query = query.filter(models.HabitLog.record_date >= from_date)
-    if to_date:
-        query = query.filter(models.HabitLog.record_date <= to_date)
-    if habit_id:
-        query = query.filter(models.HabitLog.habit_id == habit_id)
 
-    query = query.order_by(models.HabitLog.record_date.desc())
-    logs = query.offset(skip).limit(limit).all()
-    
-    # Map dữ liệu thủ công để đảm bảo frontend nhận đủ info
-    result = []
-    for log in logs:
-        result.append({
-            "id": log.id,
-            "habit_id": log.habit_id,
-            "value": log.value,
-            "unit": log.habit.unit if log.habit else "",
-            "status": log.status,
-            "record_date": log.record_date,
-            "created_at": log.created_at,
-            "habit_name": log.habit.name if log.habit else "Đã xóa"
-        })
-    return result
+# =================================================================
+# API XUẤT TOÀN BỘ LỊCH SỬ LOG (CSV / NDJSON, STREAMING)
+# =================================================================
+EXPORT_COLUMNS = ["id", "habit_id", "habit_name", "record_date", "status", "value", "unit", "created_at"]
+EXPORT_BATCH_SIZE = 1000
+
+@router.get("/user/export")
+def export_logs_by_user(
+    export_format: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    habit_id: Optional[int] = None,
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Xuất toàn bộ log của user (không giới hạn limit), cùng bộ lọc với /logs/user/history.
+    Dữ liệu được đọc theo lô từ server-side cursor và gửi dần về client -> bộ nhớ không tăng theo số dòng.
+    """
+    user_id = current_user.id
+
+    def generate():
+        # Session riêng cho lúc stream (response được gửi sau khi handler đã return)
+        db = db_connection.SessionLocal()
+        try:
+            rows = crud_habit_log.stream_logs_by_user(
+                db, user_id, from_date, to_date, habit_id, batch_size=EXPORT_BATCH_SIZE
+            )
+            if export_format == "csv":
+                yield from _csv_chunks(rows)
+            else:
+                yield from _ndjson_chunks(rows)
+        finally:
+            db.close()
+
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    filename = f"habit_logs_{user_id}.{export_format}"
+    return StreamingResponse(
+        generate(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+# Gom mỗi EXPORT_BATCH_SIZE dòng thành 1 chunk để không gửi từng dòng nhỏ
+def _csv_chunks(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow([_export_value(row[column]) for column in EXPORT_COLUMNS])
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def _ndjson_chunks(rows):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({column: _export_value(row[column]) for column in EXPORT_COLUMNS}, ensure_ascii=False))
+        if len(lines) == EXPORT_BATCH_SIZE:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+def _export_value(value):
+    # date / datetime -> chuỗi ISO
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+
+# =================================================================
+# API IMPORT LOG TỪ FILE CSV (COPY VÀO BẢNG TẠM RỒI GỘP 1 LẦN)
+# =================================================================
+@router.post("/user/import", response_model=schemas.HabitLogImportSummary)
+def import_logs_by_user(
+    file: UploadFile = File(...),
+    db: Session = Depends(db_connection.get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """
+    Import log từ file CSV (cột: habit_id, record_date, status, value - file export CSV dùng lại được).
+    Cùng luật với check-in: chỉ habit của mình, không ngày tương lai / trước ngày tạo habit,
+    mỗi habit 1 log / ngày (trùng thì ghi đè). Trả về số dòng thêm mới / ghi đè / bị loại kèm lý do.
+    """
+    csv_file = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        return crud_log_import.import_logs_from_csv(
+            db, current_user.id, csv_file, today=datetime.now().date()
+        )
+    except (ValueError, UnicodeDecodeError) as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"File CSV không hợp lệ: {e}")
+    finally:
+        csv_file.detach()
+
+
+# =================================================================
+# [ADMIN] API XEM TẤT CẢ LOG (KÈM TÊN HABIT + TÊN USER)
+# =================================================================
+@router.get("/admin/all", response_model=List[schemas.HabitLogAdminResponse])
+def get_all_logs_admin(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    with_total: bool = False,
+    db: Session = Depends(db_connection.get_db),
+    current_user: models.User = Depends(get_admin_user)
+):
+    after = pagination.decode_cursor(cursor, date.fromisoformat, int) if cursor else None
+    logs = crud_habit_log.get_all_logs_for_admin(db, skip=skip, limit=limit, after=after)
+
+    pagination.set_next_cursor(response, logs, limit, key=lambda log: (log["record_date"], log["id"]))
+    if with_total:
+        pagination.set_total_estimate(response, pagination.estimate_table_rows(db, "habit_logs"))
+    return logs
 
 
 # =================================================================
@@ -153,7 +370,12 @@ def update_log_detail(
     if log_update.record_date and log_update.record_date > datetime.now().date():
          raise HTTPException(status_code=400, detail="Không thể chuyển nhật ký sang ngày tương lai!")
 
-    updated_log = crud_habit_log.update_habit_log(db, log_id=log_id, log_update=log_update)
+    try:
+        updated_log = crud_habit_log.update_habit_log(db, log_id=log_id, log_update=log_update)
+    except IntegrityError:
+        # Vi phạm unique (habit_id, record_date): ngày đích đã có nhật ký khác
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Thói quen này đã có nhật ký cho ngày đó!")
     return {"message": "Cập nhật thành công", "log": jsonable_encoder(updated_log)}
 
 
@@ -194,29 +416,31 @@ def get_daily_stats_overall(
     Logic: Chỉ tính những Habit đã tồn tại vào ngày target_date.
     """
     target_date = date_str if date_str else (datetime.now()).date()
-    weekday_int = target_date.weekday() + 2 # (2=T2 ... 8=CN)
-
-    # Lấy tất cả habit 
-    all_habits = crud_habit.get_habits_by_user(db, user_id=current_user.id, limit=9999)
-
-    # Lọc ra các Habit cần làm hôm đó
-    habits_today = []
-    for h in all_habits:
-        # Chỉ lấy các habit đã được tạo ở đúng thời điểm
-        # habit đã tạo trước mới hiển hị ở ngày đó
-        if h.created_at.date() > target_date:
-            continue
-
-        # kiểm tra lịch đã lên của habit với ngày trong tuần của Target date
-        if not h.frequency: # Empty = Mỗi ngày
-            habits_today.append(h)
-        elif isinstance(h.frequency, list) and weekday_int in h.frequency:
-            habits_today.append(h)
-        elif isinstance(h.frequency, str) and str(weekday_int) in h.frequency: # Fallback nếu DB lưu string
-            habits_today.append(h)
-    
+
+    # Đọc dòng thống kê của ngày đó trong bảng user_daily_stats (đã tính sẵn khi ghi log)
+    day_stats = crud_user_daily_stats.get_user_daily_stats(db, current_user.id, target_date, target_date)[0]
+    return _build_daily_stats(target_date, day_stats)
+
+
+# Bản async của API thống kê ngày
+@async_router.get("/stats/today")
+async def get_daily_stats_overall_async(
+    date_str: Optional[date] = None,
+    db: AsyncSession = Depends(db_connection.get_async_db),
+    current_user: models.User = Depends(get_current_user_async)
+):
+    target_date = date_str if date_str else (datetime.now()).date()
+
+    day_stats = (await db.run_sync(
+        crud_user_daily_stats.get_user_daily_stats, current_user.id, target_date, target_date
+    ))[0]
+    return _build_daily_stats(target_date, day_stats)
+
+
+# Tính % hoàn thành từ dòng thống kê của ngày (scheduled = số habit cần làm)
+def _build_daily_stats(target_date: date, day_stats: models.UserDailyStats):
     # Nếu không có habit nào hôm đó
-    if not habits_today:
+    if day_stats.scheduled == 0:
         return {
             "date": target_date,
             "total_habits": 0,
@@ -224,19 +448,8 @@ def get_daily_stats_overall(
             "completion_rate": 0.0
         }
 
-    # Lấy log hoàn thành trong ngày
-    habit_ids_today = [h.id for h in habits_today]
-
-    completed_logs = db.query(models.HabitLog).filter(
-        models.HabitLog.habit_id.in_(habit_ids_today),
-        models.HabitLog.record_date == target_date,
-        models.HabitLog.status == "COMPLETED"
-    ).all()
-
-    # Dùng set để tránh trùng lặp habit_id
-    unique_completed_habits = set([log.habit_id for log in completed_logs])
-    completed_count = len(unique_completed_habits)
-    total_assigned = len(habits_today)
+    completed_count = day_stats.completed
+    total_assigned = day_stats.scheduled
     rate = (completed_count / total_assigned) * 100 if total_assigned > 0 else 0.0
     rate = round(rate, 2)
 
@@ -273,6 +486,26 @@ def get_logs_by_date(
     return todays_logs
 
 
+# Bản async của API lấy log trong ngày
+@async_router.get("/today", response_model=List[schemas.HabitLogResponse])
+async def get_logs_by_date_async(
+    date_str: Optional[date] = None,
+    db: AsyncSession = Depends(db_connection.get_async_db),
+    current_user: models.User = Depends(get_current_user_async)
+):
+    target_date = date_str if date_str else (datetime.now()).date()
+
+    result = await db.execute(
+        select(models.HabitLog)
+        .join(models.Habit, models.HabitLog.habit_id == models.Habit.id)
+        .where(
+            models.Habit.user_id == current_user.id,
+            models.HabitLog.record_date == target_date
+        )
+    )
+    return result.scalars().all()
+
+
 # =================================================================
 # API TỰ ĐỘNG ĐIỀN FAILED CHO NHỮNG THÓI QUEN KHÔNG ĐƯỢC CHECK-IN
 # =================================================================
@@ -283,64 +516,17 @@ def auto_mark_failed_logs(
     current_user: models.User = Depends(get_current_user)
 ):
     current_date = date_str if date_str else datetime.now().date()
-    all_habits = crud_habit.get_habits_by_user(db, user_id=current_user.id, limit=9999)
+    has_habit = db.query(models.Habit.id).filter(models.Habit.user_id == current_user.id).first()
     
-    if not all_habits:
+    if not has_habit:
         return {"message": "User chưa có thói quen nào"}
 
-    logs_added = 0
-    
-    # Quét 7 ngày quá khứ
-    for i in range(1, 8): 
-        check_date = current_date - timedelta(days=i)
-        weekday_int = check_date.weekday() + 2 # (2=T2 ... 8=CN)
-        
-        habits_need_log = []
-        
-        for h in all_habits:
-            # Chỉ xét nếu Habit đã được tạo ra TẠI hoặc TRƯỚC ngày check_date
-            if h.created_at.date() > check_date:
-                continue # Habit chưa sinh ra vào ngày này -> Bỏ qua
-
-            # Check lịch (Frequency)
-            is_scheduled = False
-            if not h.frequency: # Empty = Mỗi ngày
-                is_scheduled = True
-            elif isinstance(h.frequency, list) and weekday_int in h.frequency:
-                is_scheduled = True
-            elif isinstance(h.frequency, str) and str(weekday_int) in h.frequency: # Fallback nếu DB lưu string
-                is_scheduled = True
-            
-            if is_scheduled:
-                habits_need_log.append(h)
-        
-        if not habits_need_log:
-            continue
-
-        habit_ids = [h.id for h in habits_need_log]
-
-        # Tìm log đã tồn tại
-        existing_logs = db.query(models.HabitLog).filter(
-            models.HabitLog.habit_id.in_(habit_ids),
-            models.HabitLog.record_date == check_date
-        ).all()
-        
-        done_ids = {log.habit_id for log in existing_logs}
-        
-        # Điền FAILED cho những cái chưa có log
-        for h in habits_need_log:
-            if h.id not in done_ids:
-                failed_log = models.HabitLog(
-                    habit_id=h.id,
-                    record_date=check_date,
-                    status="FAILED",
-                    value=0
-                )
-                db.add(failed_log)
-                logs_added += 1
-    
-    if logs_added > 0:
-        db.commit()
+    # Quét 7 ngày quá khứ: dùng chung câu INSERT set-based với job auto-fail (chỉ cho user hiện tại)
+    logs_added = crud_habit_log.auto_fail_logs(
+        db, [current_user.id],
+        start_date=current_date - timedelta(days=7),
+        end_date=current_date - timedelta(days=1)
+    )
         
     return {"message": "Đã chạy auto-fail", "logs_added": logs_added}
 
@@ -365,58 +551,31 @@ def get_monthly_heatmap_stats(
     except:
         raise HTTPException(status_code=400, detail="Ngày tháng không hợp lệ")
     
-    all_habit = crud_habit.get_habits_by_user(db, user_id=current_user.id, limit=9999)
-    
-    # Lấy Logs trong tháng
-    logs = db.query(models.HabitLog).join(models.Habit).filter(
-        models.Habit.user_id == current_user.id,
-        models.HabitLog.record_date >= start_date,
-        models.HabitLog.record_date <= end_date,
-        models.HabitLog.status == "COMPLETED" # Chỉ tính completed cho heatmap
-    ).all()
-
-    logs_map = defaultdict(set)
-    for log in logs:
-        logs_map[log.record_date].add(log.habit_id)
+    # Đọc thống kê từng ngày trong tháng từ bảng user_daily_stats (1 lần quét theo khóa chính)
+    month_stats = crud_user_daily_stats.get_user_daily_stats(
+        db, user_id=current_user.id, start_date=start_date, end_date=end_date
+    )
 
     heatmap_data = []
-    current = start_date
-    
-    # Loop qua từng ngày trong tháng
-    while current <= end_date:
+    for day_stats in month_stats:
+        current = day_stats.date
+        total_task_in_day = day_stats.scheduled
+        # Giống trước đây: mọi habit có log COMPLETED trong ngày đều tính là hoàn thành, kể cả ngày không có lịch
+        completed_in_day = day_stats.completed + day_stats.completed_unscheduled
         # Nếu ngày đang xét là tương lai -> Bỏ qua không tính toán
         if current > now.date():
              # Option: Trả về data rỗng để render ô trống
              heatmap_data.append({
                 "date": current, "total": 0, "completed": 0, "rate": 0, "level": 0
             })
-             current += timedelta(days=1)
              continue
 
-        weekday_int = current.weekday() + 2
-        total_task_in_day = 0
-        
-        for h in all_habit:
-            # Chỉ tính habit nếu nó ĐÃ TỒN TẠI vào ngày 'current'
-            if h.created_at.date() > current:
-                continue 
-
-            # Check lịch
-            is_scheduled = False
-            if not h.frequency:
-                is_scheduled = True
-            elif isinstance(h.frequency, list) and weekday_int in h.frequency:
-                is_scheduled = True
-            
-            if is_scheduled:
-                total_task_in_day += 1
-        
         completed_count = 0
         rate = 0.0
         level = 0
 
         if total_task_in_day > 0:
-            completed_count = len(logs_map.get(current, []))
+            completed_count = completed_in_day
             rate = round((completed_count / total_task_in_day) * 100, 2)
             
             if rate == 0: level = 0
@@ -432,9 +591,4 @@ def get_monthly_heatmap_stats(
             "rate": rate,
             "level": level
         })
-        current += timedelta(days=1)
     return heatmap_data
-        
-            
-
-
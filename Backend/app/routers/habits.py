@@ -1,20 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from app.database import models, db_connection
-from app.database.crud import crud_habit, crud_habit_log
+from app.database.crud import crud_habit, crud_habit_log, crud_habit_streak
 from app.schemas import schemas
-from app.core import logic
+from app.core import logic, pagination
+from app.core import search as search_utils
 from datetime import date, datetime, timedelta
 # Import dependency lấy user từ token
-from app.core.dependencies import get_current_user 
+from app.core.dependencies import get_current_user, get_current_user_async
 
 router = APIRouter(
     prefix="/habits",
     tags=["Habits"]
 )
 
+# Router chứa bản async của các API nóng (đăng ký trước router sync trong main.py khi bật ASYNC_DB)
+async_router = APIRouter(
+    prefix="/habits",
+    tags=["Habits"]
+)
+
 # ========================= API QUAN TRỌNG NHẤT (ĐẶT LÊN ĐẦU) =========================
 
 # API lấy danh sách thói quen CẦN LÀM trong ngày hôm nay
@@ -31,36 +40,35 @@ def get_habits_by_date(
     # 1. Xác định ngày cần lấy (Ưu tiên client gửi, nếu ko thì lấy server time)
     target_date = date_str if date_str else (datetime.now()).date()
     
-    # 2. Tính thứ trong tuần của ngày đó (0=T2 ... 6=CN) -> Convert sang hệ (2=T2...8=CN)
-    weekday_int = target_date.weekday() + 2 
-
-    # 3. Lấy tất cả Habit của user
-    all_habits = crud_habit.get_habits_by_user(db, user_id=current_user.id, limit=9999)
-
-    habits_filtered = []
-    for habit in all_habits:
-        # Nếu ngày tạo thói quen sau ngày target_date thì bỏ qua
-        if habit.created_at.date() > target_date:
-            continue
-        # Logic lọc: Nếu frequency rỗng (làm mỗi ngày) HOẶC frequency chứa thứ của target_date
-        if not habit.frequency: 
-             habits_filtered.append(habit)
-        else:
-            # Xử lý an toàn dù DB lưu dạng List hay String
-            if isinstance(habit.frequency, list):
-                if weekday_int in habit.frequency:
-                    habits_filtered.append(habit)
-            elif str(weekday_int) in str(habit.frequency):
-                 habits_filtered.append(habit)
-    
-    return habits_filtered
+    # 2. Lấy các habit có lịch vào ngày target_date (lọc ngay trong SQL)
+    return crud_habit.get_habits_scheduled_on(db, user_id=current_user.id, target_date=target_date)
+
+
+# Bản async của /habits/today (AsyncSession, không chiếm thread trong threadpool)
+@async_router.get("/today", response_model=List[schemas.HabitResponse])
+async def get_habits_by_date_async(
+    date_str: Optional[date] = None,
+    db: AsyncSession = Depends(db_connection.get_async_db),
+    current_user: models.User = Depends(get_current_user_async)
+):
+    target_date = date_str if date_str else (datetime.now()).date()
+
+    result = await db.execute(
+        select(models.Habit)
+        .where(models.Habit.user_id == current_user.id, logic.scheduled_on(target_date))
+        .order_by(models.Habit.id)
+    )
+    return result.scalars().all()
 
 
 # ========================= API DÀNH CHO ADMIN =========================
 @router.get("/all_habit_by_admin", response_model=List[schemas.HabitResponse])
 def read_all_habits_admin(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,   # Lấy từ header X-Next-Cursor của trang trước
+    with_total: bool = False,
     db: Session = Depends(db_connection.get_db),
     current_user: models.User = Depends(get_current_user)
 ):
@@ -69,7 +77,12 @@ def read_all_habits_admin(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Bạn không có quyền truy cập vào tài nguyên này."
         )
-    list_habits = crud_habit.get_all_habits(db=db, skip=skip, limit=limit)
+    after_id = pagination.decode_cursor(cursor, int)[0] if cursor else None
+    list_habits = crud_habit.get_all_habits(db=db, skip=skip, limit=limit, after_id=after_id)
+
+    pagination.set_next_cursor(response, list_habits, limit, key=lambda habit: (habit.id,))
+    if with_total:
+        pagination.set_total_estimate(response, pagination.estimate_table_rows(db, "habits"))
     return list_habits
 
 
@@ -91,6 +104,7 @@ def read_all_habit_user(
     limit: int = 100, 
     category_id: Optional[int] = None, 
     search: Optional[str] = None,      
+    search_mode: str = Query("contains", pattern=search_utils.SEARCH_MODE_PATTERN),
     db: Session = Depends(db_connection.get_db),
     current_user: models.User = Depends(get_current_user)
 ):
@@ -100,11 +114,25 @@ def read_all_habit_user(
         query = query.filter(models.Habit.category_id == category_id)
 
     if search:
-        query = query.filter(models.Habit.name.ilike(f"%{search}%"))
+        # ranked: tìm gần đúng (gõ sai chính tả), habit giống nhất lên đầu
+        if search_mode == "ranked":
+            query = search_utils.ranked_filter(query, [models.Habit.name], search, models.Habit.id)
+        else:
+            query = search_utils.contains_filter(query, [models.Habit.name], search)
 
     return query.offset(skip).limit(limit).all()
 
 
+# API Streak của tất cả habit (Dùng cho Dashboard) - phải khai báo trước "/{habit_id}"
+@router.get("/streaks", response_model=List[schemas.HabitStatsResponse])
+def read_all_habit_streaks(
+    db: Session = Depends(db_connection.get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    # Tính streak hiện tại + dài nhất của mọi habit bằng 1 câu SQL (window function) trên habit_logs
+    return crud_habit_streak.get_user_streaks(db, user_id=current_user.id)
+
+
 @router.get("/{habit_id}", response_model=schemas.HabitResponse)
 def read_habit(
     habit_id: int, 
@@ -179,11 +207,11 @@ def get_habit_streak(
     if habit.user_id != current_user.id and current_user.role_id != 1:
         raise HTTPException(status_code=403, detail="Không được xem thống kê của người khác!")
 
-    all_logs = crud_habit_log.get_logs_by_habit(db, habit_id=habit_id, limit=1000) 
-    current_streak = logic.calculate_current_streak(all_logs)
-    
+    # Streak đã lưu sẵn trên dòng habit -> không cần đọc log
     return {
         "habit_id": habit.id,
-        "streak": current_streak,
-        "total_logs": len(all_logs)
-    }
\ No newline at end of file
+        "streak": logic.current_streak(habit),
+        "longest_streak": habit.streak_longest,
+        "last_log_date": habit.streak_last_date,
+        "total_logs": habit.log_count
+    }
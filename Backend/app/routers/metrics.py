@@ -0,0 +1,28 @@
+import secrets
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from app.core import metrics
+from app.core.config import settings
+
+router = APIRouter(tags=["Metrics"])
+
+# Số liệu request cho Prometheus (scrape GET /metrics). Chỉ có khi METRICS_ENABLED=True
+# Không dùng đăng nhập user: đặt METRICS_TOKEN (Prometheus: authorization.credentials) hoặc chỉ mở trong mạng nội bộ
+async def verify_metrics_token(authorization: Optional[str] = Header(default=None)):
+    if not settings.METRICS_TOKEN:
+        return
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), settings.METRICS_TOKEN.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Sai token metrics!",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+
+# 'async def' (cả dependency): chạy trên event loop, cùng thread với middleware ghi số liệu
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False,
+            dependencies=[Depends(verify_metrics_token)])
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,13 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
 from app.database.crud import crud_motivation_quote
 from app.database import db_connection
 from app.schemas import schemas
 from typing import List, Optional
-from sqlalchemy import or_
+from datetime import datetime
 from app.database import models
 from app.core.dependencies import get_current_user, get_admin_user
+from app.core import http_cache
+from app.core import search as search_utils
 
 
 # Tạo router cho motivation quotes
@@ -28,35 +30,60 @@ def create_motivation_quote(
     return crud_motivation_quote.create_motivation_quote(db = db, quote = quote)
 
 
-# API Xem danh sách tất cả Motivation Quotes
+# API Xem danh sách tất cả Motivation Quotes (có ETag)
 @router.get("/", response_model = List[schemas.MotivationQuoteResponse])
 def read_all_motivation_quotes(
+    request: Request,
+    response: Response,
     skip: int = 0, 
     limit: int = 100,
     db: Session = Depends(db_connection.get_db),
     current_user: models.User = Depends(get_current_user),
-    search: Optional[str] = None
+    search: Optional[str] = None,
+    search_mode: str = Query("contains", pattern = search_utils.SEARCH_MODE_PATTERN)
     ):
-    
+    not_modified = http_cache.check_not_modified(request, response, db, http_cache.MOTIVATION_QUOTES)
+    if not_modified:
+        return not_modified
+
     list_quotes = db.query(models.MotivationQuote)
     if search:
-        search_fmt = f"%{search}%"
-        list_quotes = list_quotes.filter(
-            or_(
-                models.MotivationQuote.quote.ilike(search_fmt),
-                models.MotivationQuote.author.ilike(search_fmt)
-            )
-        )
+        search_columns = [models.MotivationQuote.quote, models.MotivationQuote.author]
+        if search_mode == "ranked":
+            list_quotes = search_utils.ranked_filter(list_quotes, search_columns, search, models.MotivationQuote.id)
+        else:
+            list_quotes = search_utils.contains_filter(list_quotes, search_columns, search)
     return list_quotes.offset(skip).limit(limit).all()
 
 
+# API Câu nói động lực của ngày (đặt TRƯỚC /{quote_id})
+# personal = True -> mỗi user 1 câu riêng trong ngày, ngược lại cả hệ thống chung 1 câu
+@router.get("/daily", response_model = schemas.MotivationQuoteResponse)
+def read_daily_motivation_quote(
+    personal: bool = False,
+    db: Session = Depends(db_connection.get_db),
+    current_user: models.User = Depends(get_current_user)
+    ):
+    quote = crud_motivation_quote.get_daily_quote(
+        db = db, day = datetime.now().date(), user_id = current_user.id if personal else None
+    )
+    if quote is None:
+        raise HTTPException(status_code = 404, detail = "Chưa có câu nói động lực nào!")
+    return quote
+
+
 # API Xem chi tiết Motivation Quote theo ID
 @router.get("/{quote_id}",response_model = schemas.MotivationQuoteResponse)
 def read_motivation_quote(
     quote_id: int, 
+    request: Request,
+    response: Response,
     db: Session = Depends(db_connection.get_db),
     current_user: models.User = Depends(get_admin_user)
     ):
+    not_modified = http_cache.check_not_modified(request, response, db, http_cache.MOTIVATION_QUOTES)
+    if not_modified:
+        return not_modified
     quote = crud_motivation_quote.get_motivation_quote_by_id(db = db, quote_id = quote_id)
     if quote is None:
         raise HTTPException(status_code = 404, detail = "Không tìm thấy câu nói động lực!")
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
 from app.database.crud import crud_role
@@ -7,6 +7,7 @@ from app.schemas import schemas
 from typing import List
 from app.database import models
 from app.core.dependencies import get_current_user, get_admin_user
+from app.core import http_cache
 
 
 # Tạo router cho role
@@ -26,14 +27,18 @@ def create_role(
     return crud_role.create_role(db = db, role = role)
 
 
-# API xem danh sách tất cả quyền
+# API xem danh sách tất cả quyền (có ETag)
 @router.get("/", response_model = List[schemas.RoleResponse])
 def read_all_roles(
+    request: Request,
+    response: Response,
     skip: int = 0, limit: int = 100, 
     db: Session = Depends(db_connection.get_db),
     current_user: models.User = Depends(get_admin_user)
     ):
-    
+    not_modified = http_cache.check_not_modified(request, response, db, http_cache.ROLES)
+    if not_modified:
+        return not_modified
     return crud_role.get_roles(db = db)
 
 
@@ -41,9 +46,14 @@ def read_all_roles(
 @router.get("/{role_id}", response_model = schemas.RoleResponse)
 def read_role(
     role_id: int, 
+    request: Request,
+    response: Response,
     db: Session = Depends(db_connection.get_db),
     current_user: models.User = Depends(get_admin_user)
     ):
+    not_modified = http_cache.check_not_modified(request, response, db, http_cache.ROLES)
+    if not_modified:
+        return not_modified
     db_role = crud_role.get_role(role_id = role_id, db = db)
     if db_role is None: 
         raise HTTPException(status_code = 404, detail = "Không tìm thấy quyền (vai trò)!")
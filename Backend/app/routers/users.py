@@ -1,14 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
-from app.database.crud import crud_user, crud_habit, crud_habit_log
+from app.database.crud import crud_user, crud_habit, crud_habit_log, crud_email_outbox
 from app.database import db_connection
 from app.schemas import schemas
 from typing import List, Optional
-from sqlalchemy import or_
 from app.database import models
-from app.core.dependencies import ADMIN_ROLE_ID, get_current_user, get_admin_user
-from app.core.utils import check_password, get_password_hash, generate_random_password, send_email_background
+from app.core.dependencies import ADMIN_ROLE_ID, get_current_user, get_admin_user, invalidate_cached_user, user_cache
+from app.core import pagination
+from app.core import search as search_utils
+from app.core.utils import check_password, get_password_hash, generate_random_password
 
 
 # Tạo router cho user
@@ -99,6 +100,8 @@ def delete_user(
 
     # Thực hiện xóa
     crud_user.delete_user_by_id(db=db, user_id=user_id)
+    # Token cũ của user này không còn được chấp nhận từ cache
+    invalidate_cached_user(user_id)
     
     # Trả về kết quả
     return {
@@ -112,32 +115,38 @@ def update_user_me(
     db: Session = Depends(db_connection.get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    # Dùng chính current_user để update -> Không sợ sửa nhầm của người khác
+    # current_user chỉ là bản chụp trong cache -> lấy bản ghi thật theo chính id của mình để update
+    # (vẫn không sợ sửa nhầm của người khác)
+    db_user = crud_user.get_user_by_id(db, user_id=current_user.id)
+    if db_user is None:
+        raise HTTPException(status_code=404, detail="User không tồn tại!")
+
     if user_update.full_name:
-        current_user.full_name = user_update.full_name
+        db_user.full_name = user_update.full_name
     
     if user_update.email:
         # Nếu đổi email, cần check xem email mới có trùng ai ko
         existing_email = crud_user.get_user_by_email(db, email=user_update.email)
-        if existing_email and existing_email.id != current_user.id:
+        if existing_email and existing_email.id != db_user.id:
             raise HTTPException(status_code=400, detail="Email này đã được sử dụng!")
-        current_user.email = user_update.email
+        db_user.email = user_update.email
     
     if user_update.username:
         # Nếu đổi username, cần check xem username mới có trùng ai ko
         existing_user = crud_user.get_user_by_username(db, username=user_update.username)
-        if existing_user and existing_user.id != current_user.id:
+        if existing_user and existing_user.id != db_user.id:
             raise HTTPException(status_code=400, detail="Username này đã tồn tại!")
-        current_user.username = user_update.username
+        db_user.username = user_update.username
 
     if user_update.password:
         # Hash lại mật khẩu
         hashed_password = get_password_hash(user_update.password)
-        current_user.password = hashed_password
+        db_user.password = hashed_password
 
     db.commit()
-    db.refresh(current_user)
-    return current_user
+    db.refresh(db_user)
+    invalidate_cached_user(db_user.id)
+    return db_user
 
 # ========================= API DÀNH CHO ADMIN =========================
 # API tạo user 
@@ -170,10 +179,14 @@ def create_user_by_admin(
 # API lấy danh sách user (có phân trang, lọc theo tên, email)
 @router.get("/", response_model=List[schemas.UserResponse])
 def read_users(
+    response: Response,
     skip: int = 0, 
     limit: int = 100,
     search: Optional[str] = None,   # <--- Thêm tìm kiếm
+    search_mode: str = Query("contains", pattern=search_utils.SEARCH_MODE_PATTERN),  # <--- ranked: xếp theo độ giống
     role_id: Optional[int] = None,  # <--- Thêm lọc quyền
+    cursor: Optional[str] = None,   # <--- Phân trang theo cursor (header X-Next-Cursor)
+    with_total: bool = False,       # <--- Header X-Total-Estimate (ước lượng)
     db: Session = Depends(db_connection.get_db),
     current_user: models.User = Depends(get_admin_user)
 ):
@@ -185,19 +198,28 @@ def read_users(
         query = query.filter(models.User.role_id == role_id)
     
     # 2. Tìm kiếm (Username hoặc Email hoặc Tên thật)
-    if search:
-        search_fmt = f"%{search}%"
-        # Dùng ilike để tìm không phân biệt hoa thường (Postgres)
-        query = query.filter(
-            or_(
-                models.User.username.ilike(search_fmt),
-                models.User.email.ilike(search_fmt),
-                models.User.full_name.ilike(search_fmt)
-            )
-        )
+    # Dùng ilike để tìm không phân biệt hoa thường (Postgres), index GIN pg_trgm trên cả 3 cột
+    search_columns = [models.User.username, models.User.email, models.User.full_name]
+    # Chế độ xếp hạng: user giống từ khóa nhất lên đầu, phân trang bằng skip / limit (không có cursor)
+    ranked = bool(search) and search_mode == "ranked"
+    if ranked:
+        if cursor:
+            raise HTTPException(status_code=400, detail="Không dùng cursor với search_mode=ranked!")
+        query = search_utils.ranked_filter(query, search_columns, search, models.User.id)
+    elif search:
+        query = search_utils.contains_filter(query, search_columns, search)
     
-    # 3. Phân trang & Trả về
-    return query.offset(skip).limit(limit).all()
+    if with_total:
+        pagination.set_total_estimate(response, pagination.estimate_query_rows(db, query))
+
+    if ranked:
+        return query.offset(skip).limit(limit).all()
+
+    # 3. Phân trang theo id & Trả về
+    after = pagination.decode_cursor(cursor, int) if cursor else None
+    users = pagination.keyset_page(query, [models.User.id], after, skip, limit, descending=False).all()
+    pagination.set_next_cursor(response, users, limit, key=lambda user: (user.id,))
+    return users
 
 
 # 2.  API Admin update User (Để Admin đổi Role, reset thông tin user khác)
@@ -236,15 +258,24 @@ def update_user_by_admin(
     
     db.commit()
     db.refresh(db_user)
+    # Đổi quyền / thông tin -> bỏ bản chụp cũ trong cache để request sau đọc lại từ DB
+    invalidate_cached_user(user_id)
     return db_user
 
 
+# API xem hiệu quả cache user của get_current_user (hit/miss) trên worker hiện tại
+@router.get("/admin/cache-stats")
+def read_user_cache_stats(current_user: models.User = Depends(get_admin_user)):
+    return user_cache.stats()
+
+
 
 #============================= API chức năng =============================
 # 1. API Xác nhận mật khẩu (Trước khi cho phép update profile)
 @router.post("/verify-password")
 def verify_current_password(
     req: schemas.VerifyPasswordRequest,
+    db: Session = Depends(db_connection.get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """
@@ -252,7 +283,9 @@ def verify_current_password(
     Nếu đúng -> Trả về OK (Frontend sẽ chuyển sang màn hình Update).
     Nếu sai -> Báo lỗi.
     """
-    if not check_password(req.password, current_user.password):
+    # Cache user không giữ mật khẩu đã hash -> đọc từ DB
+    db_user = crud_user.get_user_by_id(db, user_id=current_user.id)
+    if db_user is None or not check_password(req.password, db_user.password):
         raise HTTPException(status_code=400, detail="Mật khẩu không chính xác!")
     
     return {"message": "Xác thực thành công. Bạn có thể cập nhật thông tin."}
@@ -262,7 +295,6 @@ def verify_current_password(
 @router.post("/forgot_password")
 def forgot_password(
     req: schemas.ForgotPasswordRequest,
-    background_tasks: BackgroundTasks, # Dùng để gửi mail ngầm
     db: Session = Depends(db_connection.get_db)
 ):
     """
@@ -283,7 +315,6 @@ def forgot_password(
     
     # 3. Lưu vào DB (Nhớ Hash nhé!)
     user.password = get_password_hash(new_raw_password)
-    db.commit()
     
     # 4. Soạn nội dung mail
     subject = "Habit Tracker - Cấp lại mật khẩu mới"
@@ -296,7 +327,8 @@ def forgot_password(
     Vui lòng đăng nhập và đổi lại mật khẩu ngay nhé!
     """
     
-    # 5. Đẩy việc gửi mail vào background (để API trả về nhanh)
-    background_tasks.add_task(send_email_background, user.email, subject, body)
+    # 5. Đưa mail vào hàng đợi email_outbox, commit CÙNG mật khẩu mới (worker gửi sau, restart không mất mail)
+    crud_email_outbox.enqueue_email(db, user.email, subject, body)
+    db.commit()
 
     return {"message": "Mật khẩu mới đã được gửi vào email của bạn. Vui lòng kiểm tra!"}
\ No newline at end of file
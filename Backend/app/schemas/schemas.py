@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import date, datetime
 from enum import Enum
 
@@ -49,6 +49,10 @@ class UserResponse(BaseModel):
     class Config:
         from_attributes = True
 
+# Thông tin user đã xác thực mà get_current_user trả về (lưu trong cache, không gắn với Session DB)
+class CurrentUser(UserResponse):
+    pass
+
 # Schema dùng để xác minh mật khẩu (Khi user đổi mật khẩu)
 class VerifyPasswordRequest(BaseModel):
     password: str
@@ -146,10 +150,33 @@ class HabitLogResponse(HabitLogBase):
     class Config:
         from_attributes = True
 
+# Kết quả của từng phần tử trong API check-in hàng loạt (POST /logs/batch)
+class HabitLogBatchResult(BaseModel):
+    habit_id: int
+    record_date: date
+    success: bool
+    detail: Optional[str] = None           # Lý do lỗi nếu success = False
+    log: Optional[HabitLogResponse] = None # Log đã lưu nếu success = True
+
+# Kết quả import log từ file CSV (POST /logs/user/import)
+class HabitLogImportRejectedLine(BaseModel):
+    line: int       # Số dòng trong file (dòng tiêu đề là dòng 1)
+    reason: str
+
+class HabitLogImportSummary(BaseModel):
+    total_rows: int
+    inserted: int   # Log mới
+    updated: int    # Ghi đè log đã có cùng ngày
+    rejected: int
+    rejected_by_reason: Dict[str, int]
+    rejected_lines: List[HabitLogImportRejectedLine]  # Tối đa 50 dòng lỗi đầu tiên
+
 # Habit Log response dành cho code logic 
 class HabitStatsResponse(BaseModel):
     habit_id: int
     streak: int                 # Chuỗi hiện tại
+    longest_streak: int         # Chuỗi dài nhất từ trước tới nay
+    last_log_date: Optional[date] = None  # Ngày có log mới nhất
     total_logs: int             # Tổng số lần check-in
 
 # Schema cho User xem list log của mình (Kèm tên Habit)
@@ -190,6 +217,34 @@ class MotivationQuoteResponse(MotivationQuoteBase):
         from_attributes = True
 
 
+# ====================== SCHEMA CHO THỐNG KÊ ADMIN (/admin/analytics)
+class AnalyticsCategoryStats(BaseModel):
+    category_id: int
+    category_name: str
+    scheduled: int          # Số lượt habit có lịch (habit x ngày)
+    total_logs: int         # Số lượt có lịch đã có log
+    completed: int
+    partial: int
+    skipped: int
+    failed: int
+    completion_rate: float  # % lượt có lịch được COMPLETED
+
+class AnalyticsPeriodStats(BaseModel):
+    period: date  # Ngày bắt đầu kỳ (ngày | thứ 2 của tuần)
+    scheduled: int
+    total_logs: int
+    completed: int
+    completion_rate: float
+    categories: List[AnalyticsCategoryStats]
+
+class AnalyticsResponse(BaseModel):
+    from_date: date
+    to_date: date
+    group_by: str
+    cached_periods: int  # Số kỳ lấy từ cache (không query DB)
+    periods: List[AnalyticsPeriodStats]
+
+
 #=============================== SCHEMA CHO BẢNG TOKEN
 # Schema này dùng để trả về cho Frontend ngay sau khi Login thành công
 class Token(BaseModel):
@@ -0,0 +1,309 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import threading
+import time
+from datetime import date, datetime
+
+# Benchmark các API chính trên bộ dữ liệu giả lập cố định (app/database/generate_load_data.py)
+# App chạy ngay trong tiến trình benchmark (ASGI, có lifespan), không cần uvicorn -> đếm được số câu SQL mỗi request
+# Mỗi route đo riêng 1 lượt: --requests request, --concurrency request đồng thời, user chọn ngẫu nhiên trong --sessions user
+# Kết quả (p50 / p95 / p99, request / giây, SQL / request) ghi ra file JSON kèm commit để so giữa các lần sửa code
+# Bộ dữ liệu không bị đổi sau mỗi lần đo: các route đọc dùng ngày cố định DATASET["end_date"],
+# POST /logs/ check-in vào 1 habit nháp của mỗi user (tạo / xóa qua API ngay trong lần chạy)
+# Chạy từ thư mục Backend (DB local, KHÔNG chạy trên DB thật):
+#   python -m benchmarks.bench_api --prepare                              -> sinh bộ dữ liệu (nếu chưa đủ) rồi đo
+#   python -m benchmarks.bench_api --concurrency 16 --requests 500 --output before.json
+#   python -m benchmarks.bench_api --routes habits_today logs_history --output after.json --compare before.json
+#   python -m benchmarks.bench_api --url http://localhost:8000            -> đo server đang chạy (không đếm được SQL)
+
+# Bộ dữ liệu cố định (cùng seed + cùng ngày kết thúc -> cùng habit / log, dù sinh vào ngày nào)
+DATASET = {"users": 1000, "habits_per_user": 5, "years": 1, "seed": 42, "end_date": "2026-10-18"}
+END_DATE = date.fromisoformat(DATASET["end_date"])
+SCRATCH_HABIT_NAME = "Bench check-in"
+
+# Tắt các worker nền trong lúc đo (đặt trước khi import app)
+os.environ.setdefault("EMAIL_OUTBOX_WORKER", "False")
+os.environ.setdefault("AUTO_FAIL_SCHEDULER", "False")
+os.environ.setdefault("SEED_ON_STARTUP", "False")
+
+# (tên, method, hàm tạo (path, kwargs) từ phiên user)
+ROUTES = [
+    ("login", "POST", lambda s, rng: ("/login", {"data": {"username": s["email"], "password": s["password"]}})),
+    ("habits_today", "GET", lambda s, rng: ("/habits/today", {"params": {"date_str": END_DATE.isoformat()}})),
+    ("check_in", "POST", lambda s, rng: ("/logs/", {"json": _check_in_body(s)})),
+    ("stats_today", "GET", lambda s, rng: ("/logs/stats/today", {"params": {"date_str": END_DATE.isoformat()}})),
+    ("stats_heatmap", "GET", lambda s, rng: ("/logs/stats/heatmap", {"params": {"year": END_DATE.year, "month": END_DATE.month}})),
+    ("logs_history", "GET", lambda s, rng: ("/logs/user/history", {"params": {"limit": 50, "to_date": END_DATE.isoformat()}})),
+    ("habit_streaks", "GET", lambda s, rng: (f"/habits/{rng.choice(s['habits'])['id']}/streaks", {})),
+]
+
+
+# Check-in hôm nay vào habit nháp (habit nháp tạo hôm nay nên chỉ check-in được từ hôm nay)
+def _check_in_body(session: dict) -> dict:
+    return {
+        "habit_id": session["scratch_habit_id"],
+        "record_date": datetime.now().date().isoformat(),
+        "status": "COMPLETED",
+        "value": 1.0,
+    }
+
+
+# ========================== ĐẾM CÂU SQL ==========================
+class StatementCounter:
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def _on_execute(self, *args):
+        with self._lock:
+            self.count += 1
+
+    def attach(self):
+        from sqlalchemy import event
+        from app.database.db_connection import engine, async_engine
+        for target in (engine, async_engine.sync_engine):
+            event.listen(target, "before_cursor_execute", self._on_execute)
+
+
+# ========================== DỮ LIỆU ==========================
+def _dataset_info(prepare: bool) -> dict:
+    from sqlalchemy import text
+    from app.database import db_connection, generate_load_data
+
+    def count_load_users():
+        with db_connection.engine.connect() as conn:
+            return conn.execute(
+                text("SELECT count(*) FROM users WHERE email LIKE :pattern"),
+                {"pattern": f"%@{generate_load_data.EMAIL_DOMAIN}"}
+            ).scalar()
+
+    missing = DATASET["users"] - count_load_users()
+    if missing > 0:
+        if not prepare:
+            raise SystemExit(f"[BENCH] Thiếu {missing} user giả lập, chạy lại với --prepare")
+        generate_load_data.generate(missing, DATASET["habits_per_user"], DATASET["years"],
+                                    workers=max(os.cpu_count() - 1, 1), chunk_size=500, seed=DATASET["seed"],
+                                    end_date=END_DATE)
+
+    with db_connection.engine.connect() as conn:
+        # Ước lượng từ thống kê của planner (đếm chính xác bảng log trăm triệu dòng mất cả phút)
+        sizes = dict(conn.execute(text("""
+            SELECT relname, CAST(reltuples AS bigint) FROM pg_class
+            WHERE relname IN ('users', 'habits', 'habit_logs', 'user_daily_stats')
+        """)).all())
+    return {"load_users": count_load_users(), "approx_rows": sizes, **DATASET}
+
+
+async def _open_sessions(client, count: int, seed: int) -> list:
+    from sqlalchemy import text
+    from app.database import db_connection, generate_load_data
+
+    with db_connection.engine.connect() as conn:
+        rows = conn.execute(text("""
+            SELECT u.id, u.email, json_agg(json_build_object('id', h.id, 'target_value', h.target_value)) AS habits
+            FROM (SELECT id, email FROM users WHERE email LIKE :pattern ORDER BY id LIMIT :count) u
+            JOIN habits h ON h.user_id = u.id AND h.name <> :scratch_name
+            GROUP BY u.id, u.email
+        """), {
+            "pattern": f"%@{generate_load_data.EMAIL_DOMAIN}", "count": count, "scratch_name": SCRATCH_HABIT_NAME
+        }).mappings().all()
+    if not rows:
+        raise SystemExit("[BENCH] Chưa có user giả lập, chạy lại với --prepare")
+
+    sessions = [
+        {"user_id": row["id"], "email": row["email"], "password": generate_load_data.LOAD_TEST_PASSWORD,
+         "habits": row["habits"]}
+        for row in rows
+    ]
+    random.Random(seed).shuffle(sessions)
+    for session in sessions:
+        response = await client.post("/login", data={"username": session["email"], "password": session["password"]})
+        response.raise_for_status()
+        session["headers"] = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    return sessions
+
+
+# Habit nháp cho route check_in: tạo qua API trước khi đo, xóa qua API sau khi đo
+async def _create_scratch_habits(client, sessions: list):
+    from sqlalchemy import text
+    from app.database import db_connection
+
+    with db_connection.engine.connect() as conn:
+        category_id = conn.execute(text("SELECT id FROM habit_categories ORDER BY id LIMIT 1")).scalar()
+    for session in sessions:
+        response = await client.post("/habits/create", headers=session["headers"], json={
+            "category_id": category_id, "name": SCRATCH_HABIT_NAME, "frequency": [2, 3, 4, 5, 6, 7, 8],
+        })
+        response.raise_for_status()
+        session["scratch_habit_id"] = response.json()["id"]
+
+async def _delete_scratch_habits(client, sessions: list):
+    from sqlalchemy import text
+    from app.database import db_connection
+
+    for session in sessions:
+        if "scratch_habit_id" in session:
+            response = await client.delete(f"/habits/delete/{session.pop('scratch_habit_id')}", headers=session["headers"])
+            response.raise_for_status()
+    # Dòng user_daily_stats sau END_DATE chỉ do các lần check-in trên tạo ra (GET không ghi) -> xóa để DB như cũ
+    with db_connection.engine.begin() as conn:
+        conn.execute(
+            text("DELETE FROM user_daily_stats WHERE user_id = ANY(:user_ids) AND date > :end_date"),
+            {"user_ids": [session["user_id"] for session in sessions], "end_date": END_DATE}
+        )
+
+
+# ========================== ĐO ==========================
+def _percentile(sorted_values: list, percent: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(percent / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+async def _run_route(client, route, sessions, requests: int, concurrency: int, seed: int, counter) -> dict:
+    _, method, build = route
+    rng = random.Random(seed)
+    jobs = []
+    for _ in range(requests):
+        session = rng.choice(sessions)
+        path, kwargs = build(session, rng)
+        jobs.append((path, {"headers": session["headers"], **kwargs}))
+
+    latencies, errors = [], 0
+    queue = iter(jobs)
+
+    async def worker():
+        nonlocal errors
+        for path, kwargs in queue:
+            started = time.perf_counter()
+            response = await client.request(method, path, **kwargs)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    statements_before = counter.count if counter else 0
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "method": method,
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": round(_percentile(latencies, 50), 2),
+        "p95_ms": round(_percentile(latencies, 95), 2),
+        "p99_ms": round(_percentile(latencies, 99), 2),
+        "mean_ms": round(sum(latencies) / len(latencies), 2),
+        "throughput_rps": round(requests / elapsed, 1),
+        "db_statements_per_request": round((counter.count - statements_before) / requests, 2) if counter else None,
+    }
+
+
+async def run(args) -> dict:
+    import httpx
+
+    counter = None
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=120)
+        lifespan = None
+    else:
+        import main
+        counter = StatementCounter()
+        counter.attach()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench", timeout=120)
+        lifespan = main.app.router.lifespan_context(main.app)
+
+    routes = [route for route in ROUTES if not args.routes or route[0] in args.routes]
+    results = {}
+    async with client:
+        if lifespan:
+            await lifespan.__aenter__()
+        sessions = []
+        try:
+            sessions = await _open_sessions(client, args.sessions, args.seed)
+            if any(route[0] == "check_in" for route in routes):
+                await _create_scratch_habits(client, sessions)
+            for index, route in enumerate(routes):
+                # Lượt làm nóng (cache, pool kết nối, JIT của planner) không tính
+                if args.warmup:
+                    await _run_route(client, route, sessions, args.warmup, args.concurrency, args.seed - index - 1, None)
+                results[route[0]] = await _run_route(client, route, sessions, args.requests, args.concurrency, args.seed + index, counter)
+                r = results[route[0]]
+                print(f"[BENCH] {route[0]:<15} p50 {r['p50_ms']:>8.2f} ms  p95 {r['p95_ms']:>8.2f} ms  "
+                      f"p99 {r['p99_ms']:>8.2f} ms  {r['throughput_rps']:>8.1f} req/s  "
+                      f"SQL/req {r['db_statements_per_request']}  lỗi {r['errors']}")
+        finally:
+            if any("scratch_habit_id" in session for session in sessions):
+                await _delete_scratch_habits(client, sessions)
+            if lifespan:
+                await lifespan.__aexit__(None, None, None)
+    return results
+
+
+def _git_commit() -> str:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout.strip()
+        return f"{commit}-dirty" if dirty else commit
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+# In chênh lệch so với 1 file kết quả cũ (âm = nhanh hơn / ít SQL hơn)
+def compare(base: dict, current: dict):
+    print(f"[BENCH] So với {base['commit']} ({base['timestamp']})")
+    for name, result in current["routes"].items():
+        old = base["routes"].get(name)
+        if not old:
+            continue
+        parts = []
+        for key in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps", "db_statements_per_request"):
+            if old.get(key) and result.get(key) is not None:
+                parts.append(f"{key} {(result[key] - old[key]) / old[key] * 100:+.1f}%")
+        print(f"  {name:<15} " + "  ".join(parts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark các API chính (latency p50/p95/p99, throughput, SQL / request)")
+    parser.add_argument("--requests", type=int, default=200, help="Số request đo mỗi route")
+    parser.add_argument("--warmup", type=int, default=20, help="Số request làm nóng mỗi route (không tính)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Số request đồng thời")
+    parser.add_argument("--sessions", type=int, default=50, help="Số user giả lập đăng nhập sẵn để gửi request")
+    parser.add_argument("--routes", nargs="+", choices=[route[0] for route in ROUTES], help="Chỉ đo các route này")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--prepare", action="store_true", help="Sinh bộ dữ liệu giả lập nếu chưa đủ")
+    parser.add_argument("--url", default=None, help="Đo server đang chạy thay vì chạy app trong tiến trình")
+    parser.add_argument("--output", default=None, help="File JSON kết quả (mặc định bench_api-<commit>.json)")
+    parser.add_argument("--compare", default=None, help="File JSON kết quả cũ để so sánh")
+    args = parser.parse_args()
+
+    from app.core.config import settings
+    report = {
+        "commit": _git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "mode": "url" if args.url else "asgi",
+        "settings": {
+            "requests": args.requests, "warmup": args.warmup, "concurrency": args.concurrency,
+            "sessions": args.sessions, "seed": args.seed, "async_db": settings.ASYNC_DB,
+        },
+        "dataset": None if args.url else _dataset_info(args.prepare),
+    }
+    report["routes"] = asyncio.run(run(args))
+
+    output = args.output or f"bench_api-{report['commit']}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"[BENCH] Đã ghi {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import multiprocessing
+from passlib.context import CryptContext
+
+# Benchmark số lần kiểm tra mật khẩu (~ số lần đăng nhập) mỗi giây theo số tiến trình băm
+# Chạy từ thư mục Backend:
+#   python -m benchmarks.bench_login                          -> bcrypt trực tiếp: inline vs pool 1, 2, 4 tiến trình
+#   python -m benchmarks.bench_login --workers 0 2 4 8 --rounds 10 --requests 200
+#   python -m benchmarks.bench_login --url http://localhost:8000 --email a@b.c --password xyz
+#                                                             -> gọi POST /login của server đang chạy (HTTP)
+# workers = 0: băm ngay trong thread gọi (cách cũ, các thread giành GIL của nhau)
+
+
+def _verify(args):
+    rounds, password, hashed = args
+    return CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds).verify(password, hashed)
+
+
+def bench_direct(workers: int, rounds: int, requests: int, concurrency: int) -> float:
+    hashed = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds).hash("benchmark")
+    job = (rounds, "benchmark", hashed)
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) if workers else None
+    try:
+        if pool:
+            list(pool.map(_verify, [job] * workers))  # Khởi động trước các tiến trình con
+        # concurrency thread giả lập các thread của threadpool API cùng xử lý /login
+        call = (lambda _: pool.submit(_verify, job).result()) if pool else (lambda _: _verify(job))
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as threads:
+            assert all(threads.map(call, range(requests)))
+        return requests / (time.perf_counter() - started)
+    finally:
+        if pool:
+            pool.shutdown()
+
+
+def bench_http(url: str, email: str, password: str, requests: int, concurrency: int) -> float:
+    import httpx
+    with httpx.Client(base_url=url, timeout=60) as client:
+        def login(_):
+            response = client.post("/login", data={"username": email, "password": password})
+            return response.status_code == 200
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as threads:
+            results = list(threads.map(login, range(requests)))
+        elapsed = time.perf_counter() - started
+    if not all(results):
+        print(f"[BENCH] {results.count(False)} / {requests} lần đăng nhập thất bại")
+    return requests / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark đăng nhập / giây (bcrypt) theo số tiến trình băm")
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4], help="Số tiến trình băm cần đo (0 = inline)")
+    parser.add_argument("--rounds", type=int, default=12, help="Cost bcrypt (BCRYPT_ROUNDS)")
+    parser.add_argument("--requests", type=int, default=64, help="Số lần kiểm tra mật khẩu mỗi lượt đo")
+    parser.add_argument("--concurrency", type=int, default=16, help="Số request đồng thời")
+    parser.add_argument("--url", default=None, help="Đo qua HTTP POST /login của server đang chạy")
+    parser.add_argument("--email", default=None)
+    parser.add_argument("--password", default=None)
+    args = parser.parse_args()
+
+    if args.url:
+        rate = bench_http(args.url, args.email, args.password, args.requests, args.concurrency)
+        print(f"[BENCH] {args.url}/login: {rate:.1f} lần đăng nhập / giây ({args.concurrency} đồng thời)")
+        return
+
+    print(f"[BENCH] bcrypt cost {args.rounds}, {args.requests} lần, {args.concurrency} đồng thời")
+    for workers in args.workers:
+        rate = bench_direct(workers, args.rounds, args.requests, args.concurrency)
+        print(f"[BENCH] workers={workers}: {rate:.1f} lần / giây")
+
+if __name__ == "__main__":
+    main()
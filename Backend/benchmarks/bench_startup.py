@@ -0,0 +1,64 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Benchmark thời gian khởi động app: import main + chạy lifespan + trả được request đầu tiên (GET /)
+# Mỗi lần đo là 1 tiến trình Python mới (giống 1 worker uvicorn vừa spawn / reload)
+# Chạy từ thư mục Backend:
+#   python -m benchmarks.bench_startup                     -> khởi động như mặc định (không seed)
+#   python -m benchmarks.bench_startup --seed              -> thêm 1 lần seed_data() (như khi bật SEED_ON_STARTUP / code cũ seed lúc import)
+#   python -m benchmarks.bench_startup --runs 10
+# Cột "SQL" = số câu lệnh gửi tới DB trong lúc khởi động (mặc định phải là 0)
+
+CHILD_CODE = """
+import json, time
+started = time.perf_counter()
+from sqlalchemy import event
+from app.database.db_connection import engine
+statements = []
+event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+import main
+imported = time.perf_counter()
+if SEED:
+    from app.database.init_db import seed_data
+    seed_data()
+seeded = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    assert client.get("/").status_code == 200
+    ready = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "seed_ms": (seeded - imported) * 1000,
+    "ready_ms": (ready - started) * 1000,
+    "statements": len(statements),
+}))
+"""
+
+
+def run_once(seed: bool) -> dict:
+    # Không ghi đè cấu hình: đo đúng những gì 1 worker chạy với settings mặc định / .env
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD_CODE.replace("SEED", str(seed))],
+        capture_output=True, text=True, check=True
+    ).stdout
+    # Dòng cuối là kết quả (seed_data có in log phía trên)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo thời gian khởi động app (tiến trình mới mỗi lần)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--seed", action="store_true", help="Gọi seed_data() trong lúc khởi động")
+    args = parser.parse_args()
+
+    results = [run_once(args.seed) for _ in range(args.runs)]
+    print(f"[BENCH] startup ({'có' if args.seed else 'không'} seed, {args.runs} lần, median)")
+    for key, label in [("import_ms", "import main"), ("seed_ms", "seed_data"), ("ready_ms", "tới request đầu tiên")]:
+        print(f"  {label:<22}{statistics.median(r[key] for r in results):>10.1f} ms")
+    print(f"  {'SQL':<22}{statistics.median(r['statements'] for r in results):>10.0f}")
+
+if __name__ == "__main__":
+    main()
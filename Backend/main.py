@@ -1,19 +1,44 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.routers import habits
 from app.database import models, db_connection
 from app.schemas import schemas
 from app.database.db_connection import engine
-from app.routers import users, roles, categories, habits, habit_logs, motivation_quotes, auth # import router con để đăng ký vào app chính
+from app.routers import users, roles, categories, habits, habit_logs, motivation_quotes, auth, admin, metrics # import router con để đăng ký vào app chính
 from app.database.init_db import seed_data
+from app.database.auto_fail import auto_fail_scheduler
+from app.database.email_outbox import email_outbox_worker
 from fastapi.middleware.cors import CORSMiddleware
 
 # Import settings để load biến môi trường
 from app.core.config import settings
+from app.core import hashing
+from app.core.metrics import MetricsMiddleware
 
-seed_data()  # Gọi hàm khởi tạo dữ liệu ban đầu
+# Seed dữ liệu ban đầu KHÔNG chạy lúc import nữa: python -m app.database.init_db (hoặc bật SEED_ON_STARTUP)
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Seed chạy nền trong thread riêng: app nhận request ngay, không chờ seed xong
+    seed_task = asyncio.create_task(asyncio.to_thread(seed_data)) if settings.SEED_ON_STARTUP else None
+    # Scheduler auto-fail hằng ngày (tắt mặc định, có thể chạy bằng CLI / cron thay thế)
+    scheduler_task = asyncio.create_task(auto_fail_scheduler()) if settings.AUTO_FAIL_SCHEDULER else None
+    # Worker gửi mail trong hàng đợi email_outbox
+    email_task = asyncio.create_task(email_outbox_worker()) if settings.EMAIL_OUTBOX_WORKER else None
+    yield
+    if scheduler_task:
+        scheduler_task.cancel()
+    if email_task:
+        email_task.cancel()
+    if seed_task:
+        await seed_task
+    # Dừng các tiến trình con băm mật khẩu
+    hashing.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # ==========================================
 # CẤU HÌNH CORS (DÙNG BIẾN MÔI TRƯỜNG)
@@ -28,9 +53,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],   # Cho phép tất cả các method: POST, GET, PUT, DELETE...
     allow_headers=["*"],   # Cho phép gửi token qua header
+    # Cho phép frontend đọc header phân trang (cursor trang sau + tổng ước lượng) và ETag
+    expose_headers=["X-Next-Cursor", "X-Total-Estimate", "ETag"],
 )
 
+# Đo số request / thời gian xử lý theo route (thêm sau cùng = lớp ngoài cùng, đo cả CORS)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, fastapi_app=app)
+
 # bỏ router con vào app chính
+# Router async đăng ký TRƯỚC router sync để được ưu tiên khớp cùng path (POST /logs/, GET /habits/today...)
+# Tắt ASYNC_DB thì các route sync cũ tự động được dùng lại (so sánh A/B)
+if settings.ASYNC_DB:
+    app.include_router(habits.async_router)
+    app.include_router(habit_logs.async_router)
+    app.include_router(auth.async_router)
+
 app.include_router(roles.router)
 app.include_router(users.router)
 app.include_router(categories.router)
@@ -38,6 +76,9 @@ app.include_router(habits.router)
 app.include_router(habit_logs.router)
 app.include_router(motivation_quotes.router)
 app.include_router(auth.router)
+app.include_router(admin.router)
+if settings.METRICS_ENABLED:
+    app.include_router(metrics.router)
 
 
 @app.get("/")
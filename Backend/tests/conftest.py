@@ -0,0 +1,77 @@
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta
+import pytest
+
+# Test chạy trên Postgres thật (DATABASE_URL trong .env / biến môi trường, giống lúc chạy app)
+# Mỗi test chạy trong 1 transaction bị rollback ở cuối: commit trong code crud chỉ là SAVEPOINT, DB không đổi
+# Chạy từ thư mục Backend:  python -m pytest -q
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def engine():
+    try:
+        from app.database import db_connection
+        with db_connection.engine.connect():
+            pass
+    except Exception as e:
+        pytest.skip(f"Không kết nối được Postgres (DATABASE_URL): {e}")
+    return db_connection.engine
+
+
+@pytest.fixture
+def db(engine):
+    from sqlalchemy.orm import Session
+    connection = engine.connect()
+    transaction = connection.begin()
+    session = Session(bind=connection, autoflush=False, join_transaction_mode="create_savepoint")
+    try:
+        yield session
+    finally:
+        session.close()
+        transaction.rollback()
+        connection.close()
+
+
+@pytest.fixture
+def user(db):
+    from app.database import models
+    suffix = uuid.uuid4().hex[:12]
+    db_user = models.User(
+        username=f"test_{suffix}", full_name="Test", password="x",
+        email=f"test_{suffix}@example.test", role_id=2
+    )
+    db.add(db_user)
+    db.flush()
+    return db_user
+
+
+@pytest.fixture
+def make_habit(db, user):
+    from app.database import models
+
+    def make(frequency=None, days_ago=400, **fields):
+        frequency = frequency or [2, 3, 4, 5, 6, 7, 8]
+        habit = models.Habit(
+            user_id=user.id, category_id=fields.pop("category_id", None) or _any_category_id(db),
+            name=fields.pop("name", "Test habit"), frequency=frequency,
+            weekday_mask=_mask(frequency), created_at=datetime.now() - timedelta(days=days_ago), **fields
+        )
+        db.add(habit)
+        db.flush()
+        return habit
+    return make
+
+
+def _mask(frequency):
+    from app.core import logic
+    return logic.frequency_to_mask(frequency)
+
+def _any_category_id(db):
+    from sqlalchemy import text
+    category_id = db.execute(text("SELECT id FROM habit_categories ORDER BY id LIMIT 1")).scalar()
+    if category_id is None:
+        pytest.skip("Chưa có category, chạy python -m app.database.init_db trước")
+    return category_id
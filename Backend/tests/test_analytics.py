@@ -0,0 +1,56 @@
+from datetime import date, timedelta
+from sqlalchemy import text
+from app.database.crud import crud_analytics
+
+# /admin/analytics: mẫu số là số lượt habit có lịch (habit x ngày), không phải số log
+
+TODAY = date.today()
+FROM_DATE = TODAY - timedelta(days=13)
+
+
+def _totals(db, category_id: int) -> tuple:
+    crud_analytics.analytics_cache.clear()
+    result = crud_analytics.get_completion_rates(db, FROM_DATE, TODAY, "day", today=TODAY)
+    totals = [0, 0, 0]
+    for period in result["periods"]:
+        for category in period["categories"]:
+            if category["category_id"] == category_id:
+                totals[0] += category["scheduled"]
+                totals[1] += category["total_logs"]
+                totals[2] += category["completed"]
+    return tuple(totals)
+
+
+def test_rate_uses_scheduled_habit_days(db, user, make_habit):
+    category_id = db.execute(text("SELECT id FROM habit_categories ORDER BY id LIMIT 1")).scalar()
+    before = _totals(db, category_id)
+    habit = make_habit(frequency=[2], days_ago=20, category_id=category_id)  # Chỉ Thứ 2
+
+    days = [FROM_DATE + timedelta(days=offset) for offset in range(14)]
+    mondays = [d for d in days if d.isoweekday() == 1]
+    other_day = next(d for d in days if d.isoweekday() != 1)
+    for record_date in (mondays[0], other_day):
+        db.execute(
+            text("INSERT INTO habit_logs (habit_id, record_date, status) VALUES (:habit_id, :day, 'COMPLETED')"),
+            {"habit_id": habit.id, "day": record_date}
+        )
+
+    after = _totals(db, category_id)
+    # Thứ 2 không có log vẫn nằm trong mẫu số; check-in ngoài lịch không được tính
+    assert (after[0] - before[0], after[1] - before[1], after[2] - before[2]) == (len(mondays), 1, 1)
+
+
+def test_future_days_are_not_scheduled(db):
+    crud_analytics.analytics_cache.clear()
+    result = crud_analytics.get_completion_rates(db, TODAY, TODAY + timedelta(days=3), "day", today=TODAY)
+    assert all(period["scheduled"] == 0 for period in result["periods"][1:])
+
+
+def test_deleting_user_invalidates_cache(db, user, make_habit):
+    from app.database.crud import crud_user
+    crud_analytics.analytics_cache.clear()
+    crud_analytics.get_completion_rates(db, FROM_DATE, TODAY - timedelta(days=1), "day", today=TODAY)
+    assert crud_analytics.analytics_cache.stats()["size"] > 0
+
+    crud_user.delete_user_by_id(db, user.id)
+    assert crud_analytics.analytics_cache.stats()["size"] == 0
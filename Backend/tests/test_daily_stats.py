@@ -0,0 +1,60 @@
+from datetime import date, timedelta
+from sqlalchemy import text
+from app.database.crud import crud_habit_log, crud_user_daily_stats
+from app.schemas import schemas
+
+# Bảng user_daily_stats: GET chỉ đọc (không tạo dòng), số liệu luôn khớp dữ liệu gốc
+
+TODAY = date.today()
+
+
+def _stored_rows(db, user_id: int) -> int:
+    return db.execute(text("SELECT count(*) FROM user_daily_stats WHERE user_id = :user_id"), {"user_id": user_id}).scalar()
+
+
+def test_read_does_not_write(db, user, make_habit):
+    habit = make_habit()
+    make_habit()
+    db.execute(
+        text("INSERT INTO habit_logs (habit_id, record_date, status) VALUES (:habit_id, :day, 'COMPLETED')"),
+        {"habit_id": habit.id, "day": TODAY - timedelta(days=3)}
+    )
+
+    stats = crud_user_daily_stats.get_user_daily_stats(db, user.id, TODAY - timedelta(days=6), TODAY)
+
+    assert [row.date for row in stats] == [TODAY - timedelta(days=offset) for offset in range(6, -1, -1)]
+    assert all(row.scheduled == 2 for row in stats)
+    assert [row.completed for row in stats] == [0, 0, 0, 1, 0, 0, 0]
+    assert _stored_rows(db, user.id) == 0
+
+
+def test_read_merges_stored_and_missing_days(db, user, make_habit):
+    habit = make_habit()
+    crud_habit_log.create_or_update_habit_log(db, schemas.HabitLogCreate(
+        habit_id=habit.id, record_date=TODAY - timedelta(days=1), status="FAILED"
+    ))
+    assert _stored_rows(db, user.id) == 1
+
+    stats = crud_user_daily_stats.get_user_daily_stats(db, user.id, TODAY - timedelta(days=2), TODAY)
+
+    assert [(row.date, row.failed) for row in stats] == [
+        (TODAY - timedelta(days=2), 0), (TODAY - timedelta(days=1), 1), (TODAY, 0)
+    ]
+    assert _stored_rows(db, user.id) == 1
+
+
+def test_unscheduled_completed_is_counted_separately(db, user, make_habit):
+    # Habit chỉ có lịch T2 (frequency 2); check-in COMPLETED vào ngày khác vẫn là "đã hoàn thành" trên heatmap
+    day = next(TODAY - timedelta(days=offset) for offset in range(1, 8) if (TODAY - timedelta(days=offset)).isoweekday() != 1)
+    habit = make_habit(frequency=[2])
+    crud_habit_log.create_or_update_habit_log(db, schemas.HabitLogCreate(
+        habit_id=habit.id, record_date=day, status="COMPLETED"
+    ))
+
+    stored = crud_user_daily_stats.get_user_daily_stats(db, user.id, day, day)[0]
+    assert (stored.scheduled, stored.completed, stored.completed_unscheduled) == (0, 0, 1)
+    assert crud_user_daily_stats.find_mismatches(db, user_id=user.id) == []
+
+    db.execute(text("DELETE FROM user_daily_stats WHERE user_id = :user_id"), {"user_id": user.id})
+    live = crud_user_daily_stats.get_user_daily_stats(db, user.id, day, day)[0]
+    assert live == stored
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import bindparam, text
+from app.database import models
+from app.database.crud import crud_email_outbox
+
+# Hàng đợi email: body (có thể chứa mật khẩu mới) không được nằm lại trong DB khi tin đã kết thúc
+
+
+def _enqueue(db, body: str = "Mật khẩu mới: abc123") -> models.EmailOutbox:
+    message = crud_email_outbox.enqueue_email(db, "someone@example.test", "Reset", body)
+    db.flush()
+    return message
+
+def _row(db, message_id: int):
+    return db.execute(
+        text("SELECT status, body, last_error FROM email_outbox WHERE id = :id"), {"id": message_id}
+    ).one()
+
+
+def test_retry_keeps_body(db):
+    message = _enqueue(db)
+    crud_email_outbox.mark_failed(db, message.id, "timeout", retry_at=datetime.now(timezone.utc) + timedelta(minutes=1))
+    assert _row(db, message.id) == ("PENDING", "Mật khẩu mới: abc123", "timeout")
+
+
+def test_failed_clears_body(db):
+    message = _enqueue(db)
+    crud_email_outbox.mark_failed(db, message.id, "550 no such user")
+    assert _row(db, message.id) == ("FAILED", "", "550 no such user")
+
+
+def test_expire_stale_clears_old_pending(db):
+    old, fresh = _enqueue(db), _enqueue(db)
+    db.execute(text("UPDATE email_outbox SET created_at = now() - interval '2 days' WHERE id = :id"), {"id": old.id})
+
+    assert crud_email_outbox.expire_stale(db, max_age_seconds=86400) >= 1
+    assert _row(db, old.id)[:2] == ("FAILED", "")
+    assert _row(db, fresh.id)[:2] == ("PENDING", "Mật khẩu mới: abc123")
+
+
+def test_deliver_batch_retries_all_claimed_when_smtp_down(db, monkeypatch):
+    from app.database import db_connection, email_outbox
+
+    def smtp_down():
+        raise OSError("connection refused")
+
+    old, *fresh = _enqueue(db), _enqueue(db), _enqueue(db)
+    db.execute(text("UPDATE email_outbox SET created_at = now() - interval '2 days' WHERE id = :id"), {"id": old.id})
+    db.execute(text("UPDATE email_outbox SET next_attempt_at = now() - interval '1 day' WHERE id IN :ids")
+               .bindparams(bindparam("ids", expanding=True)), {"ids": [m.id for m in fresh]})
+    monkeypatch.setattr(db, "close", lambda: None)  # deliver_batch tự đóng session, test còn cần đọc lại
+    monkeypatch.setattr(db_connection, "SessionLocal", lambda: db)
+    monkeypatch.setattr(email_outbox, "_connect", smtp_down)
+
+    result = email_outbox.deliver_batch(batch_size=1000)
+
+    # Tin hết hạn đếm riêng, không làm lệch vị trí các tin trong lô cần hẹn lại
+    assert result["expired"] >= 1
+    assert result["claimed"] >= len(fresh)
+    assert result["retry"] == result["claimed"] and result["sent"] == result["failed"] == 0
+    assert _row(db, old.id)[:2] == ("FAILED", "")
+    for message in fresh:
+        assert _row(db, message.id) == ("PENDING", "Mật khẩu mới: abc123", "OSError: connection refused")
@@ -0,0 +1,41 @@
+import asyncio
+import os
+import signal
+import pytest
+from app.core import hashing
+from app.core.config import settings
+
+# Pool tiến trình băm mật khẩu: tiến trình con bị kill -> pool được tạo lại, đăng nhập không hỏng vĩnh viễn
+
+
+@pytest.fixture
+def pool_workers(monkeypatch):
+    hashing.shutdown()
+    monkeypatch.setattr(settings, "PASSWORD_HASH_WORKERS", 1)
+    yield
+    hashing.shutdown()
+
+
+def _kill_workers():
+    pool = hashing._pool
+    for process in list(pool._processes.values()):
+        os.kill(process.pid, signal.SIGKILL)
+        process.join()
+    return pool
+
+
+def test_sync_rebuilds_broken_pool(pool_workers):
+    hashed = hashing.hash_password("secret")
+    broken = _kill_workers()
+
+    assert hashing.verify_password("secret", hashed)[0]
+    assert hashing._pool is not broken
+
+
+def test_async_rebuilds_broken_pool(pool_workers):
+    hashed = hashing.hash_password("secret")
+    broken = _kill_workers()
+
+    valid, _ = asyncio.run(hashing.verify_password_async("secret", hashed))
+    assert valid
+    assert hashing._pool is not broken
@@ -0,0 +1,45 @@
+import importlib.util
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+from app.core import http_cache, invalidation
+
+# ETag của dữ liệu tham chiếu phải giống nhau ở mọi worker và sau khi restart (phiên bản lấy từ DB, không phải bộ nhớ)
+
+
+@pytest.fixture
+def load_worker():
+    modules = []
+
+    # Nạp lại http_cache thành module riêng: trạng thái như 1 worker khác / tiến trình vừa restart
+    def load(name: str):
+        spec = importlib.util.spec_from_file_location(name, http_cache.__file__)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        modules.append(module)
+        return module
+
+    yield load
+    for module in modules:
+        event.remove(Session, "after_commit", module._publish_after_commit)
+        event.remove(Session, "after_rollback", module._discard_after_rollback)
+        invalidation._handlers[invalidation.REFERENCE].remove(module._on_reference_changed)
+
+def _request(path: str = "/categories/", query: bytes = b"skip=0") -> Request:
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": query, "headers": []})
+
+
+def test_etag_matches_across_workers_and_restarts(db, load_worker):
+    worker_a, worker_b = load_worker("http_cache_worker_a"), load_worker("http_cache_worker_b")
+    before = worker_a.make_etag(_request(), db, http_cache.CATEGORIES)
+    assert worker_b.make_etag(_request(), db, http_cache.CATEGORIES) == before
+
+    http_cache.bump_version(db, http_cache.CATEGORIES)
+    db.commit()
+
+    after = worker_a.make_etag(_request(), db, http_cache.CATEGORIES)
+    assert after != before
+    assert worker_b.make_etag(_request(), db, http_cache.CATEGORIES) == after
+    assert load_worker("http_cache_restarted").make_etag(_request(), db, http_cache.CATEGORIES) == after
+
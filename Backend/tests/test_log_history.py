@@ -0,0 +1,104 @@
+from contextlib import contextmanager
+from datetime import date, timedelta
+import pytest
+from sqlalchemy import event, text
+from app.database.crud import crud_habit_log
+from app.schemas import schemas
+
+# /logs/user/history: mỗi trang đúng 1 câu SQL (JOIN habits, không lazy-load từng dòng), dù limit bao nhiêu
+
+TODAY = date.today()
+
+
+@contextmanager
+def count_statements(db):
+    statements = []
+    connection = db.connection()
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(connection, "before_cursor_execute", on_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(connection, "before_cursor_execute", on_execute)
+
+
+@pytest.fixture
+def history(db, user, make_habit):
+    # 3 habit x 40 ngày = 120 log
+    for index in range(3):
+        habit = make_habit(name=f"History {index}")
+        db.execute(
+            text("""
+                INSERT INTO habit_logs (habit_id, record_date, status)
+                SELECT :habit_id, CAST(:today AS date) - offs, 'COMPLETED' FROM generate_series(0, 39) AS offs
+            """),
+            {"habit_id": habit.id, "today": TODAY}
+        )
+    return user
+
+
+@pytest.mark.parametrize("limit", [1, 10, 50, 100, 500])
+def test_history_page_is_one_statement(db, history, limit):
+    with count_statements(db) as statements:
+        logs = crud_habit_log.get_all_logs_by_user(db, user_id=history.id, limit=limit)
+
+    assert len(statements) == 1, statements
+    assert len(logs) == min(limit, 120)
+    # Đúng dạng response, mới nhất trước
+    pages = [schemas.HabitLogUserResponse.model_validate(log) for log in logs]
+    assert all(page.habit_name.startswith("History") for page in pages)
+    assert [(log["record_date"], log["id"]) for log in logs] == sorted(
+        ((log["record_date"], log["id"]) for log in logs), reverse=True
+    )
+
+
+@pytest.mark.parametrize("limit", [7, 50])
+def test_history_next_page_is_one_statement(db, history, limit):
+    first = crud_habit_log.get_all_logs_by_user(db, user_id=history.id, limit=limit)
+    after = (first[-1]["record_date"], first[-1]["id"])
+
+    with count_statements(db) as statements:
+        second = crud_habit_log.get_all_logs_by_user(
+            db, user_id=history.id, limit=limit, after=after, from_date=TODAY - timedelta(days=30)
+        )
+
+    assert len(statements) == 1, statements
+    assert second and all((log["record_date"], log["id"]) < after for log in second)
+
+
+def _reference(db, user_id, skip=0, limit=100, from_date=None, to_date=None, habit_id=None, after=None):
+    # Cách đọc đơn giản: JOIN habits, sắp xếp toàn bộ log của user
+    from app.core import pagination
+    from app.database import models
+    query = crud_habit_log.query_logs_by_user(db, user_id, from_date, to_date, habit_id)
+    rows = pagination.keyset_page(query, [models.HabitLog.record_date, models.HabitLog.id], after, skip, limit).all()
+    return [row._asdict() for row in rows]
+
+
+def test_history_matches_full_sort(db, history):
+    habit_ids = [row[0] for row in db.execute(text("SELECT id FROM habits WHERE user_id = :user_id"), {"user_id": history.id})]
+    # Thêm ngày trống ở 1 habit để các habit không chạy song song nhau
+    db.execute(text("DELETE FROM habit_logs WHERE habit_id = :habit_id AND record_date > :day"),
+               {"habit_id": habit_ids[0], "day": TODAY - timedelta(days=25)})
+    cases = [
+        {"limit": 7}, {"limit": 30, "skip": 45}, {"limit": 200},
+        {"limit": 10, "from_date": TODAY - timedelta(days=5)},
+        {"limit": 10, "to_date": TODAY - timedelta(days=20), "skip": 3},
+        {"limit": 10, "habit_id": habit_ids[1], "skip": 12},
+    ]
+    for kwargs in cases:
+        assert crud_habit_log.get_all_logs_by_user(db, history.id, **kwargs) == _reference(db, history.id, **kwargs), kwargs
+
+    # Đi hết các trang bằng cursor: đủ log, không trùng, đúng thứ tự
+    pages, after = [], None
+    while True:
+        page = crud_habit_log.get_all_logs_by_user(db, history.id, limit=13, after=after)
+        assert page == _reference(db, history.id, limit=13, after=after)
+        pages.extend(page)
+        if len(page) < 13:
+            break
+        after = (page[-1]["record_date"], page[-1]["id"])
+    assert pages == _reference(db, history.id, limit=1000)
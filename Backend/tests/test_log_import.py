@@ -0,0 +1,40 @@
+import io
+from datetime import date, timedelta
+import pytest
+from sqlalchemy import text
+from app.database.crud import crud_log_import
+
+# Import CSV: file hỏng (lỗi csv / sai mã UTF-8 giữa chừng) -> ValueError (router trả 400), không ghi gì
+
+TODAY = date.today()
+
+
+def _csv(data: bytes) -> io.TextIOWrapper:
+    return io.TextIOWrapper(io.BytesIO(data), encoding="utf-8-sig", newline="")
+
+def _log_count(db, habit_id: int) -> int:
+    return db.execute(text("SELECT count(*) FROM habit_logs WHERE habit_id = :habit_id"), {"habit_id": habit_id}).scalar()
+
+
+def test_import_valid_file(db, user, make_habit):
+    habit = make_habit()
+    data = f"habit_id,record_date,status,value\n{habit.id},{TODAY - timedelta(days=1)},COMPLETED,1\n{habit.id},oops,COMPLETED,\n"
+
+    summary = crud_log_import.import_logs_from_csv(db, user.id, _csv(data.encode()), today=TODAY)
+
+    assert (summary["total_rows"], summary["inserted"], summary["rejected"]) == (2, 1, 1)
+    assert _log_count(db, habit.id) == 1
+
+
+@pytest.mark.parametrize("bad_line, message", [
+    (b'"' + b"x" * 200000 + b'",2024-01-01,COMPLETED\n', "dòng 3: field larger than field limit"),
+    (b"1,\xff\xfe,COMPLETED\n", "can't decode byte 0xff"),
+])
+def test_import_malformed_file_raises_value_error(db, user, make_habit, bad_line, message):
+    habit = make_habit()
+    data = f"habit_id,record_date,status\n{habit.id},{TODAY - timedelta(days=1)},COMPLETED\n".encode() + bad_line
+
+    with pytest.raises(ValueError, match=message):
+        crud_log_import.import_logs_from_csv(db, user.id, _csv(data), today=TODAY)
+    db.rollback()
+    assert _log_count(db, habit.id) == 0
@@ -0,0 +1,37 @@
+from datetime import date
+from sqlalchemy import event, text
+from app.database.crud import crud_motivation_quote
+
+# Câu nói của ngày: quote bị xóa giữa lúc đọc min / max và lúc tìm quote -> quay vòng, không lỗi
+
+
+class _Digest:
+    def __init__(self, offset: int):
+        self._offset = offset
+
+    def digest(self) -> bytes:
+        return self._offset.to_bytes(8, "big")
+
+
+def test_daily_quote_wraps_around_when_last_quote_is_deleted(db, monkeypatch):
+    db.execute(text("DELETE FROM motivation_quotes"))
+    first = db.execute(text("INSERT INTO motivation_quotes (quote, author) VALUES ('A', 'x') RETURNING id")).scalar()
+    last = db.execute(text("INSERT INTO motivation_quotes (quote, author) VALUES ('B', 'y') RETURNING id")).scalar()
+    crud_motivation_quote.daily_quote_cache.clear()
+
+    # Băm luôn ra id lớn nhất; quote đó bị xóa ngay sau câu min / max (như 1 request xóa chạy xen giữa)
+    monkeypatch.setattr(crud_motivation_quote.hashlib, "sha256", lambda data: _Digest(last - first))
+
+    def delete_last(conn, cursor, statement, parameters, context, executemany):
+        if "max(" in statement:
+            cursor.connection.cursor().execute("DELETE FROM motivation_quotes WHERE id = %s", (last,))
+
+    connection = db.connection()
+    event.listen(connection, "after_cursor_execute", delete_last)
+    try:
+        quote = crud_motivation_quote.get_daily_quote(db, date(2024, 1, 1))
+    finally:
+        event.remove(connection, "after_cursor_execute", delete_last)
+        crud_motivation_quote.daily_quote_cache.clear()
+
+    assert quote.id == first
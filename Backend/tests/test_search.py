@@ -0,0 +1,74 @@
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy import text
+from app.core import search as search_utils
+from app.core.config import settings
+from app.database import models
+from app.routers import habits, users
+
+# Tìm kiếm search_mode=ranked (app/core/search.py): khớp gần đúng bằng pg_trgm, xếp theo word_similarity rồi id
+
+
+@pytest.fixture
+def trgm(db):
+    if db.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first() is None:
+        pytest.skip("Postgres chưa cài extension pg_trgm")
+
+
+def test_ranked_matches_misspelled_term(db, user, make_habit, trgm):
+    meditation = make_habit(name="Meditation")
+    make_habit(name="Read books")
+
+    found = habits.read_all_habit_user(
+        skip=0, limit=100, category_id=None, search="meditaton", search_mode="ranked", db=db, current_user=user
+    )
+    # "meditaton" không phải chuỗi con của "Meditation" (ILIKE trượt), chỉ toán tử %> bắt được
+    assert [habit.id for habit in found] == [meditation.id]
+
+
+def test_ranked_orders_by_word_similarity_then_id(db, trgm):
+    db.execute(text("DELETE FROM motivation_quotes"))
+    rows = [
+        ("Stay hungry, stay foolish", None),      # author NULL vẫn phải được xếp hạng theo cột quote
+        ("Hungry minds learn", "Someone"),
+        ("Hungry minds learn", "Someone"),        # Cùng điểm -> id nhỏ trước
+        ("A quote about hunger", "Other"),
+        ("Nothing in common", "Hungry author"),
+    ]
+    for quote, author in rows:
+        db.execute(text("INSERT INTO motivation_quotes (quote, author) VALUES (:quote, :author)"),
+                   {"quote": quote, "author": author})
+    term = "hungry"
+    expected = db.execute(text("""
+        SELECT id FROM motivation_quotes
+        WHERE quote ILIKE :pattern OR author ILIKE :pattern OR quote %> :term OR author %> :term
+        ORDER BY greatest(word_similarity(:term, quote), word_similarity(:term, author)) DESC, id
+    """), {"term": term, "pattern": f"%{term}%"}).scalars().all()
+
+    columns = [models.MotivationQuote.quote, models.MotivationQuote.author]
+    query = search_utils.ranked_filter(db.query(models.MotivationQuote), columns, term, models.MotivationQuote.id)
+    found = query.all()
+
+    assert [quote.id for quote in found] == expected
+    assert "Stay hungry, stay foolish" in [quote.quote for quote in found]
+    duplicates = [quote.id for quote in found if quote.quote == "Hungry minds learn"]
+    assert duplicates == sorted(duplicates)
+
+
+def test_ranked_rejects_short_term(db):
+    columns = [models.MotivationQuote.quote, models.MotivationQuote.author]
+    with pytest.raises(HTTPException) as error:
+        search_utils.ranked_filter(
+            db.query(models.MotivationQuote), columns, " " + "a" * (settings.SEARCH_MIN_LENGTH - 1) + " ",
+            models.MotivationQuote.id
+        )
+    assert error.value.status_code == 400
+
+
+def test_ranked_users_rejects_cursor(db, user):
+    with pytest.raises(HTTPException) as error:
+        users.read_users(
+            response=Response(), skip=0, limit=100, search="test", search_mode="ranked", role_id=None,
+            cursor="abc", with_total=False, db=db, current_user=user
+        )
+    assert error.value.status_code == 400
@@ -0,0 +1,112 @@
+import random
+from datetime import date, timedelta
+import pytest
+from sqlalchemy import text
+from app.core import logic
+from app.database import models
+from app.database.crud import crud_habit_log, crud_habit_streak
+from app.schemas import schemas
+
+# Đối chiếu streak tính bằng SQL (USER_STREAKS_SQL / STREAK_STATE_SQL) và streak lưu sẵn (apply_check_ins)
+# với bản Python logic.calculate_current_streak trên lịch sử log ngẫu nhiên
+
+STATUSES = ["COMPLETED", "PARTIAL", "SKIPPED", "FAILED"]
+TODAY = date.today()
+
+
+def _random_history(rng: random.Random) -> dict:
+    # Tối đa 20 ngày gần nhất, có ngày trống (gãy chuỗi) và đủ 4 trạng thái
+    days = rng.randint(0, 20)
+    start = rng.randint(0, 3)  # Log mới nhất có thể là hôm nay, hôm qua hoặc cũ hơn (streak = 0)
+    return {
+        TODAY - timedelta(days=start + offset): rng.choice(STATUSES)
+        for offset in range(days)
+        if rng.random() < 0.85
+    }
+
+def _oracle(history: dict) -> int:
+    logs = [models.HabitLog(record_date=d, status=s) for d, s in history.items()]
+    return logic.calculate_current_streak(logs, today=TODAY)
+
+def _insert_logs(db, habit_id: int, history: dict):
+    for record_date, status in history.items():
+        db.execute(
+            text("INSERT INTO habit_logs (habit_id, record_date, status) VALUES (:habit_id, :record_date, :status)"),
+            {"habit_id": habit_id, "record_date": record_date, "status": status}
+        )
+
+def _sql_streaks(db, user_id: int) -> dict:
+    return {row["habit_id"]: row["streak"] for row in crud_habit_streak.get_user_streaks(db, user_id, today=TODAY)}
+
+
+@pytest.mark.parametrize("history, expected", [
+    ({}, 0),
+    ({TODAY: "COMPLETED", TODAY - timedelta(days=1): "COMPLETED"}, 2),
+    # PARTIAL / SKIPPED là cầu nối: không cộng, không gãy
+    ({TODAY: "COMPLETED", TODAY - timedelta(days=1): "SKIPPED", TODAY - timedelta(days=2): "COMPLETED"}, 2),
+    ({TODAY: "PARTIAL", TODAY - timedelta(days=1): "COMPLETED"}, 1),
+    # FAILED làm gãy chuỗi
+    ({TODAY: "COMPLETED", TODAY - timedelta(days=1): "FAILED", TODAY - timedelta(days=2): "COMPLETED"}, 1),
+    # Ngày trống làm gãy chuỗi
+    ({TODAY: "COMPLETED", TODAY - timedelta(days=2): "COMPLETED"}, 1),
+    # Log mới nhất trước hôm qua -> 0
+    ({TODAY - timedelta(days=2): "COMPLETED"}, 0),
+    ({TODAY - timedelta(days=1): "COMPLETED", TODAY - timedelta(days=2): "COMPLETED"}, 2),
+])
+def test_oracle_rules(history, expected):
+    assert _oracle(history) == expected
+
+
+def test_sql_streaks_match_oracle(db, user, make_habit):
+    rng = random.Random(20240601)
+    expected = {}
+    for _ in range(150):
+        habit = make_habit()
+        history = _random_history(rng)
+        _insert_logs(db, habit.id, history)
+        expected[habit.id] = _oracle(history)
+
+    assert _sql_streaks(db, user.id) == expected
+
+    # STREAK_STATE_SQL (recompute, lưu vào cột) cho cùng kết quả
+    for habit_id, streak in expected.items():
+        habit = db.get(models.Habit, habit_id)
+        crud_habit_streak.recompute(db, habit)
+        assert logic.current_streak(habit, today=TODAY) == streak
+
+
+def test_incremental_check_ins_match_oracle(db, user, make_habit):
+    # Check-in theo thứ tự ngẫu nhiên (cả ghi đè, cả ngày quá khứ) qua đúng hàm của API
+    rng = random.Random(7)
+    for _ in range(60):
+        habit = make_habit()
+        history = {}
+        for _ in range(rng.randint(1, 25)):
+            record_date = TODAY - timedelta(days=rng.randint(0, 15))
+            status = rng.choice(STATUSES)
+            history[record_date] = status
+            crud_habit_log.create_or_update_habit_log(db, schemas.HabitLogCreate(
+                habit_id=habit.id, record_date=record_date, status=status
+            ))
+        db.refresh(habit)
+        assert logic.current_streak(habit, today=TODAY) == _oracle(history), history
+        assert habit.log_count == len(history)
+
+
+def test_apply_check_ins_reads_fresh_row(db, user, make_habit):
+    # Router nạp habit trước khi lấy khóa user; request khác đã đổi streak trong DB -> phải dùng giá trị mới
+    habit = make_habit()
+    _insert_logs(db, habit.id, {TODAY - timedelta(days=1): "COMPLETED", TODAY - timedelta(days=2): "COMPLETED"})
+    db.execute(text("""
+        UPDATE habits SET streak_current = 2, streak_base = 1, streak_longest = 2,
+                          streak_last_date = :yesterday, log_count = 2
+        WHERE id = :habit_id
+    """), {"habit_id": habit.id, "yesterday": TODAY - timedelta(days=1)})
+    assert habit.log_count == 0  # Bản trong identity map đã cũ
+
+    _insert_logs(db, habit.id, {TODAY: "COMPLETED"})
+    crud_habit_streak.apply_check_ins(db, habit.id, [(TODAY, "COMPLETED", True)])
+
+    assert habit.log_count == 3
+    assert habit.streak_current == 3
+    assert habit.streak_longest == 3